@@ -0,0 +1,90 @@
+# !/usr/bin/python
+
+# buttons.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Button check for Internet of Pi
+
+Checks that every press of the select button reaches the Arduino without waiting for Parse.  The system is run against
+the simulated Arduino (fakearduino.py) and a stand-in for the Parse Server (fakeparse.py) that takes PARSE_LATENCY
+seconds to answer, then the select button is pressed twice in a row, within one cloud sync, several times over.
+Each press must toggle the appliance the other way from the press before, and its APP message must reach the Arduino
+within PRESS_TIMEOUT seconds - well before the changes could have gone through Parse.
+
+Exits with status 1 (after printing what went wrong) if any press fails.
+
+Usage: python benchmark/buttons.py [--pairs N]  (ParsePy and pyserial must be installed)
+
+"""
+
+import argparse, os, sys, tempfile, threading, time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR) # The dothat stand-ins are used instead of the real library
+sys.path.insert(1, os.path.join(os.path.dirname(BENCHMARK_DIR), 'home_automation_system'))
+
+from fakearduino import FakeArduino
+from fakeparse import FakeParse
+
+PARSE_LATENCY = 1    # Seconds the stand-in Parse Server takes to answer - a cloud sync takes at least twice as long
+PRESS_TIMEOUT = 0.5  # Seconds a press has to reach the Arduino
+SETTLE_TIME = 5      # Seconds to wait after each pair of presses, so the cloud sync replaces the appliances
+CONNECT_TIMEOUT = 60 # Seconds to wait for the system to connect to the Arduino
+
+def check(pairs):
+    """ Function that runs the system and presses the select button twice within one cloud sync, pairs times.
+
+    Returns: list of Strings describing each press that failed
+    """
+    import homeautomationsystem
+    from parse_rest.connection import register
+    import dothat.touch as touch
+    register('buttons', 'buttons')
+
+    directory = tempfile.mkdtemp()
+    arduino = FakeArduino(latency=0.005)
+    arduino.start()
+    homeautomationsystem.SERIAL_PORT = arduino.port
+    homeautomationsystem.UPLOAD_DATABASE = os.path.join(directory, 'sensordata.db')
+    homeautomationsystem.ARCHIVE_DIR = os.path.join(directory, 'archive')
+    homeautomationsystem.ERROR_LOG = os.path.join(directory, 'errorlog.txt')
+    homeautomationsystem.STATE_FILE = os.path.join(directory, 'state.json')
+    homeautomationsystem.METRICS_ENABLED = False
+    homeautomationsystem.LOCAL_API_ENABLED = False
+
+    system = homeautomationsystem.HomeAutomationSystem()
+    started = time.time()
+    thread = threading.Thread(target=system.run)
+    thread.daemon = True
+    thread.start()
+    failures = []
+    if arduino.waitFor('APP', started, CONNECT_TIMEOUT) is None:
+        failures.append('the system did not connect to the fake Arduino')
+    for pair in range(pairs if len(failures) == 0 else 0):
+        for press in range(2):
+            expected = '0' if arduino.appliances[0] == '1' else '1'
+            pressed = time.time()
+            system.handleButton(touch.BUTTON)
+            if arduino.waitFor('APP', pressed, PRESS_TIMEOUT, lambda params: params[0] == expected) is None:
+                failures.append('press %d of pair %d did not turn appliance 0 %s within %g s (appliances: %s)' %
+                                (press + 1, pair + 1, 'on' if expected == '1' else 'off', PRESS_TIMEOUT, ','.join(arduino.appliances)))
+        time.sleep(SETTLE_TIME)
+    system.stop()
+    thread.join(30)
+    arduino.stop()
+    return failures
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that select button presses reach the Arduino without waiting for Parse.')
+    parser.add_argument('--pairs', type=int, default=5, help='pairs of presses to check (default 5)')
+    args = parser.parse_args()
+
+    parse = FakeParse(latency=PARSE_LATENCY)
+    os.environ['PARSE_API_ROOT'] = parse.url # Must be set before ParsePy is imported
+    failures = check(args.pairs)
+    parse.close()
+    for failure in failures:
+        print('FAILED: ' + failure)
+    if len(failures) > 0:
+        sys.exit(1)
+    print('buttons: OK (%d pairs of presses within one cloud sync reached the Arduino)' % args.pairs)
@@ -0,0 +1,11 @@
+# __init__.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Stand-in for Pimoroni's Display-o-Tron HAT library (dothat), used by the benchmark
+
+    The modules record what would have been drawn on the LCD and backlight instead of talking to the HAT.
+    Every call is appended to CALLS as a (module, function, args) tuple.
+
+"""
+
+CALLS = []
@@ -0,0 +1,23 @@
+# backlight.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Stand-in for dothat.backlight - keeps the backlight's colour in memory
+"""
+
+from dothat import CALLS
+
+colour = (0, 0, 0)
+
+def rgb(r, g, b):
+    global colour
+    CALLS.append(('backlight', 'rgb', (r, g, b)))
+    colour = (r, g, b)
+
+def off():
+    rgb(0, 0, 0)
+
+def set_graph(value):
+    CALLS.append(('backlight', 'set_graph', (value,)))
+
+def graph_off():
+    CALLS.append(('backlight', 'graph_off', ()))
@@ -0,0 +1,38 @@
+# lcd.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Stand-in for dothat.lcd - keeps the text written to the 16x3 LCD in memory
+"""
+
+from dothat import CALLS
+
+COLUMNS = 16
+ROWS = 3
+
+_cursor = [0, 0]
+screen = [[' '] * COLUMNS for row in range(ROWS)]
+
+def clear():
+    CALLS.append(('lcd', 'clear', ()))
+    for row in screen:
+        row[:] = [' '] * COLUMNS
+    _cursor[:] = [0, 0]
+
+def set_cursor_position(column, row):
+    CALLS.append(('lcd', 'set_cursor_position', (column, row)))
+    _cursor[:] = [column, row]
+
+def write(value):
+    CALLS.append(('lcd', 'write', (value,)))
+    for character in value:
+        if _cursor[0] < COLUMNS and _cursor[1] < ROWS:
+            screen[_cursor[1]][_cursor[0]] = character
+        _cursor[0] += 1
+
+def set_contrast(contrast):
+    CALLS.append(('lcd', 'set_contrast', (contrast,)))
+
+def text():
+    """ Function that returns the LCD's rows as strings.
+    """
+    return [''.join(row) for row in screen]
@@ -0,0 +1,35 @@
+# touch.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Stand-in for dothat.touch - buttons are "pressed" by calling press
+"""
+
+from dothat import CALLS
+
+# Same channels as dothat/touch.py
+UP = 1
+DOWN = 2
+LEFT = 3
+RIGHT = 4
+BUTTON = 5
+CANCEL = 0
+
+_handlers = {}
+
+def on(buttons, bounce=-1):
+    """ Decorator that registers a function(channel, event) to be called when one of the buttons is pressed.
+    """
+    if not isinstance(buttons, list):
+        buttons = [buttons]
+    def register(handler):
+        for button in buttons:
+            _handlers[button] = handler
+        return handler
+    return register
+
+def press(channel):
+    """ Function that simulates pressing a button.
+    """
+    CALLS.append(('touch', 'press', (channel,)))
+    if channel in _handlers:
+        _handlers[channel](channel, 'press')
@@ -0,0 +1,264 @@
+# fakearduino.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" fakearduino module for the Internet of Pi benchmark
+
+    This module provides the class FakeArduino, which stands in for the Arduino Mega on a pseudo-terminal (pty).
+    SerialComm opens the pty's port like the Arduino's USB serial port, and FakeArduino answers with the serial
+    protocol of home_automation_system.ino ($COMMAND!numParams@param1,param2*CRC).
+
+    Like the sketch, it switches to the binary protocol (see serialcomm.py) when asked with the BAUD command, unless it
+    is simulating an older sketch that only knows the text protocol.
+
+    SUBSCRIBE is answered by pushing sensor messages every interval (deadbands are ignored, since every message's
+    light value differs anyway).
+
+    Replies can be delayed (latency), writes can be paced to a baud rate, and sensor messages can be pushed at a
+    fixed rate.  The light value of each sensor message is its sequence number, so a sample can be followed all the
+    way to Parse.
+
+"""
+
+import os, threading, time, tty, operator
+from functools import reduce
+
+NUM_APPLIANCES = 4
+
+def checksum(sentence):
+    """ Function that returns the XOR of every byte in sentence (a bytearray) - the CRC used by the Arduino.
+    """
+    return reduce(operator.xor, bytearray(sentence), 0)
+
+def encodeMessage(message):
+    """ Function that builds a serial message the way sendSerialMessage in home_automation_system.ino does.
+
+    Parameter: message [String: e.g. 'OK!1@APP']
+    """
+    sentence = message.encode('ascii')
+    return b'$' + sentence + b'*' + ('%X\r\n' % checksum(sentence)).encode('ascii')
+
+class FakeArduino:
+    """ Instance is a simulated Arduino Mega on a pty
+
+    Instance Attributes:
+
+        port          [String: path of the pty to give SerialComm]
+        received      [List of (time, command, params) tuples for every valid message from the Raspberry Pi]
+        sent          [Dictionary: sequence number -> time.time() its sensor message was written]
+        checksumErrors [Int: messages from the Raspberry Pi with a bad checksum]
+        appliances    [List of Strings: the appliance states from the last APP message]
+        _master       [Int: file descriptor of the pty's master side]
+        _slave        [Int: file descriptor of the pty's slave side (kept open so reads don't fail)]
+        _latency      [Number: seconds to wait before answering a command]
+        _baudrate     [Int: bits per second writes are paced to, or None to write as fast as possible]
+        _binarySupported [Boolean: True if the BAUD command switches to the binary protocol]
+        _binary       [Boolean: True once the binary protocol is being used]
+        _decoder      [BinaryFrameDecoder instance, once the binary protocol is being used]
+        _sensorRate   [Number: sensor messages pushed per second, or 0 to only answer GET_SENSOR]
+        _subscribed   [Boolean: True once SUBSCRIBE started pushing sensor messages]
+        _sequence     [Int: sequence number of the next sensor message]
+        _lock         [threading.Lock: guards writes and the recorded messages]
+        _changed      [threading.Condition: notified when a message is received]
+        _stopped      [threading.Event: set when the Arduino should stop]
+    """
+    def __init__(self, latency=0, baudrate=9600, sensorRate=0, binary=True):
+        """ Initializes a new FakeArduino on a new pty.
+
+        Parameter: latency    [Number: seconds to wait before answering a command]
+        Parameter: baudrate   [Int: bits per second to pace writes to (None for no limit)]
+        Parameter: sensorRate [Number: sensor messages to push per second (0 for none)]
+        Parameter: binary     [Boolean: True to support the binary protocol, False to act like an older sketch]
+        """
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.received = []
+        self.sent = {}
+        self.checksumErrors = 0
+        self.appliances = ['0'] * NUM_APPLIANCES
+        self._latency = latency
+        self._baudrate = baudrate
+        self._sensorRate = sensorRate
+        self._binarySupported = binary
+        self._binary = False
+        self._decoder = None
+        self._subscribed = False
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(threading.Lock())
+        self._stopped = threading.Event()
+
+    def start(self):
+        """ Method that starts answering the Raspberry Pi (and pushing sensor messages, if sensorRate is set).
+        """
+        thread = threading.Thread(target=self._read)
+        thread.daemon = True
+        thread.start()
+        if self._sensorRate > 0:
+            self.push(self._sensorRate)
+
+    def push(self, sensorRate):
+        """ Method that starts pushing sensor messages on their own thread.
+
+        Parameter: sensorRate [Number: sensor messages to push per second]
+        """
+        self._sensorRate = sensorRate
+        thread = threading.Thread(target=self._push)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """ Method that stops the Arduino and closes the pty.
+        """
+        self._stopped.set()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def waitFor(self, command, since, timeout, match=None):
+        """ Method that waits for a message received after since.
+
+        Parameter: command [String: the command, e.g. 'APP']
+        Parameter: since   [Float: time.time() - older messages are ignored]
+        Parameter: timeout [Number: seconds to wait]
+        Parameter: match   [Function(params) that returns True for the wanted message, or None for any]
+
+        Returns: time.time() the message was received, or None if it wasn't received in time
+        """
+        deadline = time.time() + timeout
+        with self._changed:
+            while True:
+                for received, name, params in reversed(self.received):
+                    if received < since:
+                        break
+                    if name == command and (match is None or match(params)):
+                        return received
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+
+    def sendSensorData(self):
+        """ Method that writes a sensor message, using the next sequence number as the light value.
+        """
+        with self._lock:
+            sequence = self._sequence
+            self._sequence += 1
+        self.sent[sequence] = time.time()
+        self._write([('SENSOR', ['22.50', '40.00', str(sequence), 'CLOSED', 'RELEASED'])])
+
+    def _write(self, messages):
+        """ Method that writes messages to the pty, taking as long as it would at the baud rate.
+        With the binary protocol, the messages are sent together in one frame.
+
+        Parameter: messages [List of (command, params) tuples]
+        """
+        if self._binary:
+            from serialcomm import encodeBinaryFrames
+            data = encodeBinaryFrames(messages)
+        else:
+            data = b''.join(encodeMessage(command + '!' + str(len(params)) + '@' + ','.join(params)) for command, params in messages)
+        with self._lock:
+            if self._baudrate:
+                time.sleep(len(data) * 10.0 / self._baudrate) # 8 data bits, a start bit and a stop bit per byte
+            try:
+                os.write(self._master, data)
+            except OSError:
+                pass # The pty was closed
+
+    def _read(self):
+        """ Method run on its own thread - reads messages from the Raspberry Pi and answers them.
+        """
+        buffer = bytearray()
+        while not self._stopped.is_set():
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                return
+            if self._binary:
+                self._answer(self._decoder.feed(data))
+                continue
+            buffer.extend(data)
+            end = buffer.find(b'\n')
+            while end != -1 and not self._binary:
+                self._handle(bytes(buffer[:end]).strip())
+                del buffer[:end + 1]
+                end = buffer.find(b'\n')
+            if self._binary and len(buffer) > 0: # Bytes after the BAUD command are binary frames
+                self._answer(self._decoder.feed(bytes(buffer)))
+                del buffer[:]
+
+    def _handle(self, line):
+        """ Method that checks a text message's checksum and answers its command like home_automation_system.ino.
+        """
+        start = line.rfind(b'$')
+        star = line.rfind(b'*')
+        if start == -1 or star < start:
+            self._write([('ERROR', ['Bad message.'])])
+            return
+        try:
+            received = int(line[star + 1:], 16)
+        except ValueError:
+            received = -1
+        if received != checksum(line[start + 1:star]):
+            self.checksumErrors += 1
+            self._write([('ERROR', ['Checksum mismatch.'])])
+            return
+        sentence = line[start + 1:star].decode('ascii')
+        command, separator, rest = sentence.partition('!')
+        params = rest.partition('@')[2].split(',') if int(rest.partition('@')[0] or '0', 16) > 0 else []
+        self._answer([(command, params)])
+
+    def _answer(self, messages):
+        """ Method that records messages from the Raspberry Pi and answers every one of them like home_automation_system.ino.
+
+        Parameter: messages [List of (command, params) tuples]
+        """
+        if len(messages) == 0:
+            return
+        with self._changed:
+            for command, params in messages:
+                self.received.append((time.time(), command, params))
+            self._changed.notify_all()
+        if self._latency > 0:
+            time.sleep(self._latency)
+        replies = []
+        for command, params in messages:
+            if command == 'APP' and len(params) == NUM_APPLIANCES:
+                self.appliances = params
+                replies.append(('OK', ['APP']))
+            elif command == 'GET_SENSOR':
+                with self._lock:
+                    sequence = self._sequence
+                    self._sequence += 1
+                self.sent[sequence] = time.time()
+                replies.append(('SENSOR', ['22.50', '40.00', str(sequence), 'CLOSED', 'RELEASED']))
+            elif command == 'SUBSCRIBE' and len(params) == 4:
+                replies.append(('OK', [command]))
+                if int(params[0]) > 0 and not self._subscribed and self._sensorRate == 0:
+                    self._subscribed = True
+                    self.push(1.0 / int(params[0]))
+            elif command in ('SET_DATE_TIME', 'SET_FORMATTING', 'SET_LIGHT_THRESHOLD', 'ENABLE_MATRIX', 'DISABLE_MATRIX'):
+                replies.append(('OK', [command]))
+            elif command == 'BAUD' and self._binarySupported and not self._binary and params[0] in ('115200', '250000', '500000'):
+                self._write([('OK', ['BAUD'])]) # Sent at the old baud rate, with the text protocol
+                from serialcomm import BinaryFrameDecoder
+                self._decoder = BinaryFrameDecoder()
+                self._binary = True
+                if self._baudrate:
+                    self._baudrate = int(params[0])
+            else:
+                replies.append(('ERROR', ['Bad command or data.'] if not self._binary else ['2']))
+        if len(replies) > 0:
+            self._write(replies)
+
+    def _push(self):
+        """ Method run on its own thread - pushes sensor messages at sensorRate.
+        """
+        interval = 1.0 / self._sensorRate
+        nextSend = time.time()
+        while not self._stopped.is_set():
+            self.sendSensorData()
+            nextSend += interval
+            delay = nextSend - time.time()
+            if delay > 0:
+                time.sleep(delay)
@@ -0,0 +1,234 @@
+# fakeparse.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" fakeparse module for the Internet of Pi benchmark
+
+    This module provides the class FakeParse, an in-process stand-in for the Parse Server's REST API.
+    It keeps objects in memory and supports what the system uses: queries (where, limit, count, order),
+    creating, updating and deleting objects, batches, and the cloud functions in main.js (which only return success).
+
+    Every request is counted by endpoint, and each object created is passed to an optional onCreate function
+    (the benchmark uses this to see when sensor data reaches Parse).
+
+"""
+
+import json, threading, time, datetime, itertools
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler # Python 2
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+
+BASE_PATH = '/parse'
+CLOUD_FUNCTIONS = ('processScheduling', 'processAlarms') # Cloud functions defined in main.js
+
+def _comparable(value):
+    """ Function that turns a Parse value into something that can be compared (dates to their ISO strings, pointers to objectIds).
+    """
+    if isinstance(value, dict):
+        if value.get('__type') == 'Date':
+            return value['iso']
+        if value.get('__type') == 'Pointer':
+            return value['objectId']
+    return value
+
+def _matches(obj, where):
+    """ Function that returns True if an object matches a query's where constraints.
+    """
+    for field, constraint in where.items():
+        value = _comparable(obj.get(field))
+        if isinstance(constraint, dict) and '__type' not in constraint:
+            for operator, operand in constraint.items():
+                operand = _comparable(operand)
+                if isinstance(value, list) and operator in ('$gt', '$gte', '$lt', '$lte'):
+                    values = [_comparable(item) for item in value] # Like Parse, an array matches if any element does
+                else:
+                    values = [value]
+                if operator == '$gt' and not any(item is not None and item > operand for item in values):
+                    return False
+                elif operator == '$gte' and not any(item is not None and item >= operand for item in values):
+                    return False
+                elif operator == '$lt' and not any(item is not None and item < operand for item in values):
+                    return False
+                elif operator == '$lte' and not any(item is not None and item <= operand for item in values):
+                    return False
+                elif operator == '$ne' and value == operand:
+                    return False
+                elif operator == '$in' and value not in [_comparable(item) for item in operand]:
+                    return False
+                elif operator == '$exists' and (field in obj) != operand:
+                    return False
+        elif value != _comparable(constraint):
+            return False
+    return True
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class FakeParse:
+    """ Instance is an in-memory Parse Server listening on localhost
+
+    Instance Attributes:
+
+        url          [String: the API root to use as PARSE_API_ROOT]
+        requests     [Dictionary: endpoint (e.g. 'GET /classes/Appliance') -> number of requests]
+        _classes     [Dictionary: class name -> dictionary of objectId -> object (a dictionary of fields)]
+        _ids         [itertools.count: source of objectIds]
+        _lastDate    [String: the last createdAt/updatedAt given out - dates are kept increasing]
+        _onCreate    [Function(className, fields) called for every object created, or None]
+        _lock        [threading.Lock: requests are handled on several threads]
+        _server      [HTTPServer instance]
+    """
+    def __init__(self, onCreate=None, latency=0):
+        """ Initializes a new FakeParse and starts serving on a free port.
+
+        Parameter: onCreate [Function(className, fields) called for every object created]
+        Parameter: latency  [Number: seconds to wait before answering each request]
+        """
+        self.requests = {}
+        self._classes = {}
+        self._ids = itertools.count(1)
+        self._lastDate = ''
+        self._onCreate = onCreate
+        self._lock = threading.Lock()
+        parse = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive, like the Parse Server
+
+            def _respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length).decode('utf-8')) if length > 0 else {}
+                url = urlparse(self.path)
+                query = dict((name, values[0]) for name, values in parse_qs(url.query).items())
+                if latency > 0:
+                    time.sleep(latency)
+                status, response = parse.handle(self.command, url.path[len(BASE_PATH):], query, body)
+                data = json.dumps(response).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d%s' % (self._server.server_address[1], BASE_PATH)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        """ Method that stops the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def totalRequests(self):
+        """ Method that returns the number of requests handled so far.
+        """
+        with self._lock:
+            return sum(self.requests.values())
+
+    def objects(self, className):
+        """ Method that returns a list of copies of every object of a class.
+        """
+        with self._lock:
+            return [dict(obj) for obj in self._classes.get(className, {}).values()]
+
+    def _now(self):
+        """ Method that returns the current date as a Parse ISO string, later than every date given out before.
+        """
+        now = datetime.datetime.utcnow()
+        date = now.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (now.microsecond // 1000)
+        while date <= self._lastDate: # Two changes in the same millisecond still get different dates
+            now += datetime.timedelta(milliseconds=1)
+            date = now.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (now.microsecond // 1000)
+        self._lastDate = date
+        return date
+
+    def handle(self, method, path, query, body, counted=True):
+        """ Method that handles one request.
+
+        Parameter: method [String: HTTP method]
+        Parameter: path   [String: path after BASE_PATH, e.g. '/classes/Appliance/abc']
+        Parameter: query  [Dictionary: query string parameters]
+        Parameter: body   [Decoded JSON body]
+
+        Returns: (status, response) - response is JSON-serializable
+        """
+        parts = path.strip('/').split('/')
+        if counted:
+            endpoint = method + ' /' + '/'.join(parts[:2]) + ('/:id' if len(parts) > 2 else '')
+            with self._lock:
+                self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if parts[0] == 'batch' and method == 'POST':
+            responses = []
+            for request in body.get('requests', []):
+                status, response = self.handle(request['method'], request['path'][len(BASE_PATH):], {}, request.get('body', {}), False)
+                responses.append({'success': response} if status < 400 else {'error': response})
+            return 200, responses
+        if parts[0] == 'functions' and len(parts) == 2:
+            if parts[1] in CLOUD_FUNCTIONS:
+                return 200, {'result': {}}
+            return 400, {'code': 141, 'error': 'Invalid function.'}
+        if parts[0] != 'classes' or len(parts) < 2:
+            return 404, {'code': 101, 'error': 'Not found.'}
+        className = parts[1]
+        with self._lock:
+            objects = self._classes.setdefault(className, {})
+            if len(parts) == 2 and method == 'GET':
+                return 200, self._query(objects, query)
+            if len(parts) == 2 and method == 'POST':
+                objectId = 'obj%07d' % next(self._ids)
+                date = self._now()
+                obj = dict(body)
+                obj.update({'objectId': objectId, 'createdAt': date, 'updatedAt': date})
+                objects[objectId] = obj
+                created = dict(obj)
+            elif len(parts) == 3 and parts[2] in objects:
+                if method == 'GET':
+                    return 200, dict(objects[parts[2]])
+                if method == 'PUT':
+                    date = self._now()
+                    for field, value in body.items():
+                        if isinstance(value, dict) and value.get('__op') == 'Delete':
+                            objects[parts[2]].pop(field, None)
+                        else:
+                            objects[parts[2]][field] = value
+                    objects[parts[2]]['updatedAt'] = date
+                    return 200, {'updatedAt': date}
+                if method == 'DELETE':
+                    del objects[parts[2]]
+                    return 200, {}
+                return 400, {'code': 107, 'error': 'Bad request.'}
+            else:
+                return 404, {'code': 101, 'error': 'Object not found.'}
+        if self._onCreate is not None:
+            self._onCreate(className, created)
+        return 201, {'objectId': created['objectId'], 'createdAt': created['createdAt']}
+
+    def _query(self, objects, query):
+        """ Method that answers a query for objects of a class.
+        """
+        where = json.loads(query.get('where', '{}'))
+        results = [obj for obj in objects.values() if _matches(obj, where)]
+        for field in reversed(query.get('order', 'createdAt').split(',')):
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            results.sort(key=lambda obj: (obj.get(name) is not None, _comparable(obj.get(name))), reverse=descending)
+        response = {}
+        if query.get('count'):
+            response['count'] = len(results)
+        skip = int(query.get('skip', 0))
+        limit = int(query.get('limit', 100))
+        response['results'] = [dict(obj) for obj in results[skip:skip + limit]]
+        return response
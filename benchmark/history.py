@@ -0,0 +1,71 @@
+# !/usr/bin/python
+
+# history.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Sensor archive benchmark for Internet of Pi
+
+Fills a SensorArchive (see home_automation_system/archive.py) in a temporary directory with simulated readings, then
+reports how long time range queries take: the raw readings of one day, and downsampled series of the whole range at
+several periods.  Run it on the Pi, with --directory on the SD card, to measure the Pi itself.
+
+Usage: python benchmark/history.py [--days N] [--interval SECONDS] [--directory PATH]
+
+"""
+
+import argparse, math, os, sys, tempfile, time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(BENCHMARK_DIR), 'home_automation_system'))
+
+from archive import SensorArchive
+from timeseries import SensorSeries
+
+class Reading:
+    """ Instance is a simulated reading with the fields of SensorData
+    """
+    def __init__(self, timestamp):
+        day = math.sin(timestamp * 2 * math.pi / 86400)
+        self.temperature = 21 + 3 * day
+        self.humidity = 40 - 10 * day
+        self.light = int(500 + 500 * day)
+        self.reedSwitch = 'CLOSED'
+        self.footSwitch = 'RELEASED'
+
+def timed(function, *args):
+    """ Function that calls function and returns (its result, the time it took in milliseconds).
+    """
+    start = time.time()
+    result = function(*args)
+    return result, (time.time() - start) * 1000
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark time range queries of the sensor archive.')
+    parser.add_argument('--days', type=int, default=30, help='days of readings to store (default 30)')
+    parser.add_argument('--interval', type=float, default=4, help='seconds between readings (default 4)')
+    parser.add_argument('--directory', default=None, help='directory for the archive (default: a new temporary directory)')
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp()
+    archive = SensorArchive(directory)
+    series = SensorSeries()
+    end = time.time()
+    start = end - args.days * 86400
+    began = time.time()
+    timestamp = start
+    while timestamp < end:
+        reading = Reading(timestamp)
+        archive.append(timestamp, reading)
+        for rollup in series.append(timestamp, reading)[0]:
+            archive.appendRollup(rollup)
+        timestamp += args.interval
+    archive.flush()
+    print('stored %d days of readings every %g s in %.1f s (%s)' % (args.days, args.interval, time.time() - began, directory))
+
+    values, elapsed = timed(archive.samples, end - 86400, end)
+    print('    %-28s %8d rows  %8.2f ms' % ('readings of the last day', len(values['time']), elapsed))
+    for period in (60, 300, 3600, 86400):
+        values, elapsed = timed(archive.series, start, end, period)
+        print('    %-28s %8d rows  %8.2f ms' % ('series, %d s periods' % period, len(values['start']), elapsed))
+    del values
+    archive.close()
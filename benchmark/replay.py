@@ -0,0 +1,198 @@
+# !/usr/bin/python
+
+# replay.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Trace replay for Internet of Pi
+
+Feeds a trace recorded with TRACE_FILE (see home_automation_system/tracefile.py) back into HomeAutomationSystem:
+
+ - the bytes the Arduino sent are written to a pty that SerialComm reads, at their recorded times
+ - requests to Parse are answered with the recorded responses (in the order they were recorded, for each endpoint),
+   after the recorded latency
+
+Times are divided by --speed (2 replays twice as fast), or with --speed 0 the trace is replayed as fast as possible.
+Afterwards, the time spent in each phase of the system's work (from METRICS) is reported, so a captured workload
+can be used to compare changes.
+
+Usage: python benchmark/replay.py TRACE_FILE [--speed N] [--session N]  (ParsePy and pyserial must be installed)
+
+"""
+
+import argparse, os, sys, socket, tempfile, threading, time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR) # The dothat stand-ins are used instead of the real library
+sys.path.insert(1, os.path.join(os.path.dirname(BENCHMARK_DIR), 'home_automation_system'))
+
+import tty
+from tracefile import *
+
+try:
+    from urlparse import urlparse # Python 2
+except ImportError:
+    from urllib.parse import urlparse
+
+SETTLE_TIME = 10 # Seconds the system keeps running after the last record, so it can finish handling the trace
+
+class TracePlayer:
+    """ Instance writes the bytes the Arduino sent in a trace to a pty, at their recorded times
+
+    Instance Attributes:
+
+        port       [String: path of the pty to give SerialComm]
+        written    [Int: bytes written by the system to the pty]
+        _chunks    [List of (seconds, bytes) tuples from the trace's rx records]
+        _speed     [Number: how many times faster than recorded to replay (0 for as fast as possible)]
+        _master    [Int: file descriptor of the pty's master side]
+        _slave     [Int: file descriptor of the pty's slave side]
+        _done      [threading.Event: set when every chunk has been written]
+    """
+    def __init__(self, records, speed):
+        """ Initializes a new TracePlayer for the rx records of a trace.
+        """
+        self._chunks = [(record[0], traceBytes(record[2])) for record in records if record[1] == TRACE_RX]
+        self._speed = speed
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.written = 0
+        self._done = threading.Event()
+
+    def start(self):
+        """ Method that starts writing the chunks (and reading what the system writes) on their own threads.
+        """
+        for target in (self._play, self._drain):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+
+    def wait(self):
+        """ Method that blocks until every chunk has been written.
+        """
+        while not self._done.wait(0.5):
+            pass
+
+    def close(self):
+        """ Method that closes the pty.
+        """
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _play(self):
+        """ Method that writes each chunk at its recorded time (divided by the speed).
+        """
+        start = time.time()
+        for seconds, data in self._chunks:
+            if self._speed > 0:
+                delay = start + seconds / self._speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            os.write(self._master, data)
+        self._done.set()
+
+    def _drain(self):
+        """ Method that reads (and counts) what the system writes to the Arduino.
+        """
+        while True:
+            try:
+                self.written += len(os.read(self._master, 1024))
+            except OSError:
+                return
+
+def replayTransport(records, speed, apiRoot):
+    """ Function that returns a ParseTransport that answers requests with the responses in a trace instead of sending them.
+
+    Parameter: records [List of records from readTrace]
+    Parameter: speed   [Number: recorded latencies are divided by this (0 for no latency)]
+    Parameter: apiRoot [String: PARSE_API_ROOT from the trace's start record]
+    """
+    from transport import ParseTransport, endpointName
+
+    basePath = urlparse(apiRoot).path.rstrip('/')
+    requests = {}
+    responses = {} # endpoint name -> list of (status, body, latency)
+    for record in records:
+        if record[1] == TRACE_REQUEST:
+            requests[record[2]] = record
+        elif record[1] == TRACE_RESPONSE and record[2] in requests:
+            request = requests.pop(record[2])
+            path = request[4][len(basePath):]
+            body = record[4] if record[3] is None else traceBytes(record[4])
+            responses.setdefault(endpointName(request[3], path), []).append((record[3], body, record[0] - request[0]))
+
+    class ReplayTransport(ParseTransport):
+        """ Instance is a ParseTransport that answers from a trace
+        """
+        unmatched = 0 # Requests to endpoints that are not in the trace
+
+        def _send(self, method, path, data, headers):
+            endpoint = endpointName(method, path[len(self._basePath):])
+            with self._lock:
+                queue = responses.get(endpoint)
+                if not queue:
+                    ReplayTransport.unmatched += 1
+                    return 200, (b'{"results": []}' if method == 'GET' else b'[]' if endpoint.endswith('/batch') else b'{}')
+                status, body, latency = queue.pop(0) if len(queue) > 1 else queue[0] # The last response is reused
+            if speed > 0:
+                time.sleep(latency / speed)
+            if status is None:
+                raise socket.error(body)
+            return status, body
+
+    return ReplayTransport(apiRoot)
+
+def replay(path, speed, session):
+    """ Function that replays a trace into HomeAutomationSystem and reports the time spent in each phase.
+    """
+    start, records = readTrace(path, session)
+    os.environ['PARSE_API_ROOT'] = start['apiRoot'] # Must be set before ParsePy is imported
+
+    import homeautomationsystem
+    from metrics import METRICS
+    from parse_rest.connection import register
+    register('replay', 'replay')
+
+    transport = replayTransport(records, speed, start['apiRoot'])
+    transport.install()
+    homeautomationsystem.transport = transport
+
+    directory = tempfile.mkdtemp()
+    player = TracePlayer(records, speed)
+    homeautomationsystem.SERIAL_PORT = player.port
+    homeautomationsystem.UPLOAD_DATABASE = os.path.join(directory, 'sensordata.db')
+    homeautomationsystem.ARCHIVE_DIR = os.path.join(directory, 'archive')
+    homeautomationsystem.ERROR_LOG = os.path.join(directory, 'errorlog.txt')
+    homeautomationsystem.STATE_FILE = os.path.join(directory, 'state.json')
+    homeautomationsystem.METRICS_ENABLED = False
+    homeautomationsystem.LOCAL_API_ENABLED = False
+    homeautomationsystem.TRACE_FILE = None
+
+    system = homeautomationsystem.HomeAutomationSystem()
+    thread = threading.Thread(target=system.run)
+    thread.daemon = True
+    began = time.time()
+    thread.start()
+    player.start()
+    player.wait()
+    time.sleep(SETTLE_TIME / speed if speed > 0 else 1)
+    system.stop()
+    thread.join(30)
+    player.close()
+
+    recorded = records[-1][0] if len(records) > 0 else 0
+    print('replayed %.1f s of traffic in %.1f s (%d records, %d bytes written to the Arduino, %d unmatched requests)' %
+          (recorded, time.time() - began, len(records), player.written, transport.unmatched))
+    phases = METRICS.series('phase_seconds')
+    for labels in sorted(phases):
+        counts, total, count = phases[labels].values()
+        if count > 0:
+            print('    %-20s n=%-6d mean=%.2f ms  p95<=%s s' % (dict(labels)['phase'], count, total * 1000 / count, phases[labels].quantile(0.95)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a trace recorded by Internet of Pi.')
+    parser.add_argument('trace', help='trace file recorded with TRACE_FILE')
+    parser.add_argument('--speed', type=float, default=1, help='times faster than recorded to replay, or 0 for as fast as possible (default 1)')
+    parser.add_argument('--session', type=int, default=-1, help='session of the trace file to replay (default -1, the last)')
+    args = parser.parse_args()
+    replay(args.trace, args.speed, args.session)
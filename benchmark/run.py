@@ -0,0 +1,154 @@
+# !/usr/bin/python
+
+# run.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" Benchmark for Internet of Pi
+
+Runs the system against a simulated Arduino (fakearduino.py, on a pty), an in-process stand-in for the
+Parse Server (fakeparse.py) and stand-ins for the Display-o-Tron HAT (dothat/), then reports:
+
+ - serial throughput:  sensor messages per second that SerialComm decodes
+ - button-to-APP:      time from a select button press until the Arduino receives the new appliance states
+ - sensor-to-upload:   time from the Arduino sending sensor data until it is saved to Parse
+ - requests per loop:  requests to Parse per cycle of the cloud task
+
+Usage: python benchmark/run.py [--duration SECONDS] [--presses N] ...  (ParsePy and pyserial must be installed)
+
+"""
+
+import argparse, os, sys, tempfile, threading, time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR) # The dothat stand-ins are used instead of the real library
+sys.path.insert(1, os.path.join(os.path.dirname(BENCHMARK_DIR), 'home_automation_system'))
+
+from fakearduino import FakeArduino
+from fakeparse import FakeParse
+
+def percentiles(values):
+    """ Function that formats the count, median, 95th percentile and maximum of a list of seconds as milliseconds.
+    """
+    if len(values) == 0:
+        return 'no samples'
+    values = sorted(values)
+    def at(q):
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+    return 'n=%d  p50=%.1f ms  p95=%.1f ms  max=%.1f ms' % (len(values), at(0.5), at(0.95), values[-1] * 1000)
+
+def benchmarkThroughput(seconds, rate, binary):
+    """ Function that measures how many sensor messages per second SerialComm decodes.
+
+    Parameter: seconds [Number: how long to measure]
+    Parameter: rate    [Number: sensor messages the fake Arduino pushes per second]
+    Parameter: binary  [Boolean: True to use the binary protocol]
+    """
+    from serialcomm import SerialComm, CHECKSUM_ERRORS, BINARY_BAUDRATE
+    errorsBefore = CHECKSUM_ERRORS.value()
+    arduino = FakeArduino(baudrate=None, binary=binary)
+    serialComm = SerialComm(arduino.port)
+    arduino.start()
+    if binary:
+        serialComm.negotiate(BINARY_BAUDRATE)
+    arduino.push(rate)
+    decoded = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        decoded += len(serialComm.readFromSerial())
+    elapsed = time.time() - start
+    arduino.stop()
+    serialComm.close()
+    print('serial throughput:  %.0f messages/s decoded (%.0f/s sent, %d checksum errors, %s protocol)' %
+          (decoded / elapsed, len(arduino.sent) / elapsed, CHECKSUM_ERRORS.value() - errorsBefore, 'binary' if binary else 'text'))
+
+def benchmarkSystem(parse, uploaded, args):
+    """ Function that runs the whole system against the stand-ins and measures its latencies and requests.
+
+    Parameter: parse    [FakeParse instance the system uses]
+    Parameter: uploaded [Dictionary: sensor sequence number -> time.time() it reached the FakeParse]
+    """
+    import homeautomationsystem, uploader
+    from parse_rest.connection import register
+    from metrics import METRICS, PHASE_BUCKETS
+    import dothat.touch as touch
+    register('benchmark', 'benchmark')
+
+    directory = tempfile.mkdtemp()
+    arduino = FakeArduino(latency=args.arduino_latency, baudrate=args.baudrate, binary=args.protocol == 'binary')
+    arduino.start()
+    homeautomationsystem.SERIAL_PORT = arduino.port
+    homeautomationsystem.UPLOAD_DATABASE = os.path.join(directory, 'sensordata.db')
+    homeautomationsystem.ARCHIVE_DIR = os.path.join(directory, 'archive')
+    homeautomationsystem.ERROR_LOG = os.path.join(directory, 'errorlog.txt')
+    homeautomationsystem.STATE_FILE = os.path.join(directory, 'state.json')
+    homeautomationsystem.METRICS_ENABLED = False # The benchmark reads METRICS directly
+    homeautomationsystem.LOCAL_API_ENABLED = False
+    homeautomationsystem.SENSOR_PUSH_INTERVAL = args.push_interval
+    uploader.UPLOAD_INTERVAL = args.upload_interval
+
+    system = homeautomationsystem.HomeAutomationSystem()
+    started = time.time()
+    thread = threading.Thread(target=system.run)
+    thread.daemon = True
+    thread.start()
+    if arduino.waitFor('APP', started, 60) is None:
+        raise Exception('The system did not connect to the fake Arduino')
+    requestsBefore = parse.totalRequests()
+    endpointsBefore = dict(parse.requests)
+    cloudHistogram = METRICS.histogram('phase_seconds', '', {'phase': 'cloud_sync'}, PHASE_BUCKETS)
+    loopsBefore = cloudHistogram.values()[2]
+    measureStart = time.time()
+
+    buttonLatencies = []
+    for x in range(args.presses):
+        expected = '0' if arduino.appliances[0] == '1' else '1'
+        pressed = time.time()
+        system.handleButton(touch.BUTTON)
+        received = arduino.waitFor('APP', pressed, 30, lambda params: params[0] == expected)
+        if received is not None:
+            buttonLatencies.append(received - pressed)
+        time.sleep(0.5)
+
+    remaining = args.duration - (time.time() - measureStart)
+    if remaining > 0:
+        time.sleep(remaining)
+    elapsed = time.time() - measureStart
+    requests = parse.totalRequests() - requestsBefore
+    loops = cloudHistogram.values()[2] - loopsBefore
+    system.stop()
+    thread.join(30)
+    arduino.stop()
+    parse.close()
+
+    uploadLatencies = [uploaded[sequence] - sent for sequence, sent in arduino.sent.items() if sequence in uploaded]
+    print('button-to-APP:      ' + percentiles(buttonLatencies) + ('  (%d presses timed out)' % (args.presses - len(buttonLatencies)) if len(buttonLatencies) < args.presses else ''))
+    print('sensor-to-upload:   ' + percentiles(uploadLatencies) + '  (%d of %d samples uploaded)' % (len(uploadLatencies), len(arduino.sent)))
+    print('requests per loop:  %.1f  (%d requests, %d cloud loops in %.0f s)' % (requests / float(max(loops, 1)), requests, loops, elapsed))
+    for endpoint in sorted(parse.requests):
+        count = parse.requests[endpoint] - endpointsBefore.get(endpoint, 0)
+        if count > 0:
+            print('    %-32s %d' % (endpoint, count))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Internet of Pi against a simulated Arduino and Parse Server.')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to run the system for (default 60)')
+    parser.add_argument('--presses', type=int, default=5, help='select button presses to time (default 5)')
+    parser.add_argument('--arduino-latency', type=float, default=0.005, help='seconds the fake Arduino takes to answer (default 0.005)')
+    parser.add_argument('--baudrate', type=int, default=9600, help='baud rate the fake Arduino writes at (default 9600)')
+    parser.add_argument('--protocol', choices=('binary', 'text'), default='binary', help='serial protocol the fake Arduino supports (default binary)')
+    parser.add_argument('--push-interval', type=int, default=None, help='SENSOR_PUSH_INTERVAL - seconds between sensor data the fake Arduino pushes (default: poll every SENSOR_INTERVAL)')
+    parser.add_argument('--parse-latency', type=float, default=0.05, help='seconds the fake Parse Server takes to answer (default 0.05)')
+    parser.add_argument('--upload-interval', type=float, default=10, help='UPLOAD_INTERVAL for the uploader (default 10)')
+    parser.add_argument('--throughput-seconds', type=float, default=5, help='seconds to measure serial throughput for (default 5)')
+    parser.add_argument('--throughput-rate', type=float, default=2000, help='sensor messages per second pushed for the throughput test (default 2000)')
+    args = parser.parse_args()
+
+    uploaded = {}
+    def onCreate(className, fields):
+        if className == 'SensorData':
+            uploaded[fields['light']] = time.time()
+    parse = FakeParse(onCreate, args.parse_latency)
+    os.environ['PARSE_API_ROOT'] = parse.url # Must be set before ParsePy is imported
+
+    benchmarkThroughput(args.throughput_seconds, args.throughput_rate, args.protocol == 'binary')
+    benchmarkSystem(parse, uploaded, args)
@@ -0,0 +1,102 @@
+# !/usr/bin/python
+
+# warmstart.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" State file check for Internet of Pi
+
+Checks that the system works the same from its state file (see ObjectCache.save and load in
+home_automation_system/cache.py) as it does from Parse.  An Appliance, Settings, a Schedule that is due and an Action
+are created on the in-process stand-in for the Parse Server (fakeparse.py), then:
+
+ - an ObjectCache is synced from Parse and saved to a state file
+ - a new ObjectCache is loaded from the state file only
+ - the loaded Schedule is fired by a Scheduler, and its appliance is looked up the way the control task does it
+ - the loaded Action is linked to its appliance by ActionRules and run with sensor data that meets its criteria
+
+Exits with status 1 (after printing what went wrong) if any step fails.
+
+Usage: python benchmark/warmstart.py  (ParsePy must be installed)
+
+"""
+
+import os, sys, tempfile, threading, time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(BENCHMARK_DIR), 'home_automation_system'))
+
+from fakeparse import FakeParse
+
+FIRE_TIMEOUT = 5 # Seconds to wait for the Scheduler to fire the loaded Schedule
+
+def create(parse, className, fields):
+    """ Function that creates an object on the FakeParse.
+
+    Returns: Pointer dictionary to the new object
+    """
+    status, response = parse.handle('POST', '/classes/' + className, {}, fields, False)
+    return {'__type': 'Pointer', 'className': className, 'objectId': response['objectId']}
+
+def check(parse, directory):
+    """ Function that saves the objects on the FakeParse to a state file, loads them again and uses them.
+
+    Returns: list of Strings describing each step that failed
+    """
+    from parse_rest.connection import register
+    from cache import ObjectCache
+    from mutations import MutationQueue
+    from parseclasses import SensorData
+    from rules import ActionRules, EVENT_DOOR_OPENED
+    from scheduler import Scheduler, toParseDate
+    register('warmstart', 'warmstart')
+
+    now = time.time()
+    appliance = create(parse, 'Appliance', {'applianceId': 0, 'name': 'Lamp', 'state': 0, 'enabled': True})
+    create(parse, 'Settings', {'systemFlag': 'running', 'lightThreshold': 500, 'temperatureThreshold': 25, 'humidityThreshold': 50})
+    create(parse, 'Schedule', {'appliance': appliance, 'enabled': True, 'recurring': True,
+                               'start': [toParseDate(now - 1)], 'end': [toParseDate(now + 3600)]})
+    create(parse, 'Action', {'appliance': appliance, 'enabled': True, 'event': EVENT_DOOR_OPENED, 'state': 1})
+
+    path = os.path.join(directory, 'state.json')
+    cache = ObjectCache(MutationQueue())
+    cache.sync()
+    cache.save(path)
+    cache = ObjectCache(MutationQueue())
+    if not cache.load(path):
+        return ['the state file could not be loaded']
+    snapshot = cache.snapshot()
+    failures = []
+    appliancesById = dict((obj.objectId, obj) for obj in snapshot.appliances)
+
+    started = []
+    fired = threading.Event()
+    def onScheduleStart(schedule, dates):
+        started.append(schedule)
+        fired.set()
+    scheduler = Scheduler(onScheduleStart, lambda schedule, dates: None, lambda alarm, dates: None)
+    scheduler.load(snapshot.schedules, snapshot.alarms)
+    scheduler.start()
+    fired.wait(FIRE_TIMEOUT)
+    scheduler.stop()
+    if len(started) == 0:
+        failures.append('the loaded schedule did not fire')
+    elif getattr(started[0].appliance, 'objectId', None) not in appliancesById:
+        failures.append('the appliance of the schedule that fired was not found: %r' % (started[0].appliance,))
+
+    rules = ActionRules()
+    rules.update(snapshot.actions, snapshot.appliances, snapshot.config)
+    changes = rules.evaluate(SensorData(temperature=20.0, humidity=40.0, light=100, reedSwitch='OPENED', footSwitch='RELEASED'), time.time())
+    if [(obj.objectId, state) for obj, state in changes] != [(appliance['objectId'], 1)]:
+        failures.append('the loaded action did not switch its appliance on (changes: %r)' % (changes,))
+    return failures
+
+if __name__ == '__main__':
+    parse = FakeParse()
+    os.environ['PARSE_API_ROOT'] = parse.url # Must be set before ParsePy is imported
+    failures = check(parse, tempfile.mkdtemp())
+    parse.close()
+    for failure in failures:
+        print('FAILED: ' + failure)
+    if len(failures) > 0:
+        sys.exit(1)
+    print('warm start: OK (save -> load -> schedule fire -> action lookup)')
@@ -21,6 +21,17 @@
           - Protocol is based on MTK NMEA protocol: http://www.hhhh.org/wiml/proj/nmeaxor.html
           - Arduino implementation of the protocol adapted from: http://elimelecsarduinoprojects.blogspot.com/2013/07/nmea-checksum-calculator.html
 
+    BINARY SERIAL PROTOCOL: after the Raspberry Pi sends $BAUD!1@115200 (or 250000, 500000) and gets an OK back
+         [0xA5][payload length][payload][CRC-16 high byte][CRC-16 low byte]
+          - The payload holds one or more commands, each a command ID byte followed by its fields (see the BIN_ constants)
+          - The CRC-16 (CCITT-FALSE) covers the length and payload bytes
+          - Replies to every command in a frame are sent back together in one frame
+          - If no valid frame arrives for BINARY_TIMEOUT, the Arduino goes back to the text protocol at 9600 baud
+
+    SUBSCRIBE MODE: after the Raspberry Pi sends SUBSCRIBE (interval in seconds, temperature and humidity deadbands in
+    hundredths, light deadband), sensor data is pushed without being asked for - every interval, as soon as a value moves
+    by more than its deadband since it was last sent, and right away when the door or foot switch changes
+
     Parts Used:
     - Raspberry Pi 2 Model B
     - Pimoroni Display-o-Tron HAT (https://www.adafruit.com/products/2694)
@@ -167,11 +178,48 @@ byte serEnd = 0;
 byte serCRC = 0;
 boolean serDataEnd = false;
 
+// Variables used for the binary serial protocol
+#define BINARY_SYNC 0xA5
+#define BINARY_MAX_PAYLOAD 60
+#define BINARY_TIMEOUT 30000 // Milliseconds without a valid binary frame before going back to the text protocol
+byte binBuffer[BINARY_MAX_PAYLOAD + 4]; // Sync byte, length, payload, CRC-16
+byte binIndex = 0;
+byte binOut[BINARY_MAX_PAYLOAD + 1];    // Length, payload (of the reply being built)
+boolean binaryMode = false;
+unsigned long lastBinaryFrame = 0;
+
+// Binary command IDs - the fields of each command follow its ID (multi-byte fields are little-endian)
+#define BIN_APP 0x01                 // Number of appliances, bit n set if appliance n is on
+#define BIN_SET_DATE_TIME 0x02       // Year (2 bytes), month, day, hour, minute, second
+#define BIN_SET_FORMATTING 0x03      // Bit 0 use12HourFormat, bit 1 useFahrenheit
+#define BIN_SET_LIGHT_THRESHOLD 0x04 // Light threshold
+#define BIN_ENABLE_MATRIX 0x05       // Light sensor mode: 0 IGNORE, 1 CLEAR_WHEN_DARK, 2 DISABLE_WHEN_DARK
+#define BIN_DISABLE_MATRIX 0x06
+#define BIN_GET_SENSOR 0x07
+#define BIN_SUBSCRIBE 0x08           // Interval in seconds (0 to stop), temperature deadband x100, humidity deadband x100, light deadband (2 bytes each)
+#define BIN_SENSOR 0x81              // Temperature x100 (2 bytes, signed), humidity x100 (2 bytes), light (2 bytes), bit 0 door opened, bit 1 foot switch pressed
+#define BIN_OK 0x82                  // ID of the command that succeeded
+#define BIN_ERROR 0x83               // Error code
+#define BIN_ERROR_CHECKSUM 1
+#define BIN_ERROR_BAD_COMMAND 2
+const String LIGHT_SENSOR_MODES[] = {"IGNORE", "CLEAR_WHEN_DARK", "DISABLE_WHEN_DARK"};
+
 // EEPROM Storage Address List
 const byte addrUse12HourFormat = 0;
 const byte addrUseFahrenheit = addrUse12HourFormat + 1;
 const byte addrLightThreshold = addrUse12HourFormat + 2;
 
+// Variables used for subscribe mode
+unsigned long subscribeInterval = 0; // Milliseconds between sensor data pushes, 0 if sensor data is only sent when asked for
+int tempDeadband = 0;                // Change in temperature (x100) that is pushed right away
+int humDeadband = 0;                 // Change in humidity (x100) that is pushed right away
+int lightDeadband = 0;               // Change in visible light that is pushed right away
+unsigned long lastPush = 0;
+int pushedTemp = 0;                  // Values sent by the last push
+int pushedHum = 0;
+int pushedLight = 0;
+byte pushedSwitches = 0xFF;          // Bit 0 door opened, bit 1 foot switch pressed (0xFF forces the next push)
+
 boolean footSwitchPressed = false; // True if the foot switch is pressed (low signal)
 boolean doorOpen = false; // True if the door is open (Reed switch reads high signal
 
@@ -214,8 +262,10 @@ void setup() {
 void loop() {
   // Retrieve the latest temperature and humidity sensor data
   
-  newTemp = useFahrenheit ? (int) (max.temperature(100, RREF) * 1.8000 + 32.50) : (int) (max.temperature(100, RREF) + 0.5); // Adding 0.5 to either result to round to 0 decimal places
-  newHum = (int) (sht31.readHumidity() + 0.5);
+  float celsius = max.temperature(100, RREF);
+  float humidity = sht31.readHumidity();
+  newTemp = useFahrenheit ? (int) (celsius * 1.8000 + 32.50) : (int) (celsius + 0.5); // Adding 0.5 to either result to round to 0 decimal places
+  newHum = (int) (humidity + 0.5);
 
   // Retrieve the latest light sensor data - (full-ir) is the amount of visible light
   uint32_t lum = tsl.getFullLuminosity();
@@ -252,8 +302,15 @@ void loop() {
     doorOpen = true;
   }
 
+  pushSensorIfNeeded(celsius, humidity, visible);
+
+  if (binaryMode) { // After baud negotiation, the Raspberry Pi uses the binary protocol
+    handleBinarySerial(visible);
+    return;
+  }
+
   // Handle new serial communication
-  while (Serial.available() > 0) {
+  while (Serial.available() > 0 && !binaryMode) {
     char inChar = Serial.read();
     serBuffer[serIndex] = inChar;
     if (inChar == '$') serStart = serIndex; // Check for start and end characters
@@ -314,23 +371,7 @@ void loop() {
               clearMatrix();
               sendOKMessage(commandString);
             } else if (commandString == "SET_FORMATTING" && numParams == 2) { // Command to update the stored format preferences - 12 hour format, Fahrenheit
-              if (dataArray[0] == "1") { // A "1" means that the preference should be true
-                use12HourFormat = true;
-                EEPROM.write(addrUse12HourFormat, 1);
-              } else {
-                use12HourFormat = false;
-                EEPROM.write(addrUse12HourFormat, 0);
-              }
-
-              if (dataArray[1] == "1") {
-                useFahrenheit = true;
-                EEPROM.write(addrUseFahrenheit, 1);
-              } else {
-                useFahrenheit = false;
-                EEPROM.write(addrUseFahrenheit, 0);
-              }
-
-              clearMatrix();
+              setFormatting(dataArray[0] == "1", dataArray[1] == "1"); // A "1" means that the preference should be true
               sendOKMessage(commandString);
             } else if (commandString == "SET_LIGHT_THRESHOLD" && numParams == 1) { // Command to update the light threshold (can be between 0 and 255)
               lightThreshold = strtoul(dataArray[0].c_str(), NULL, 16);
@@ -361,19 +402,22 @@ void loop() {
               message += ',' + String(clock.dateFormat("U", new_dt));
               sendSerialMessage(message);
             } else if (commandString == "GET_SENSOR" && numParams == 0) {
-              byte numParams = 5;
-              char tempString[6];
-              char humString[6];
-              dtostrf(max.temperature(100, RREF), 3, 2, tempString);
-              dtostrf(sht31.readHumidity(), 3, 2, humString);
-              String message = "SENSOR!" + String(numParams) + '@';
-              message += String(tempString) + ',';
-              message += String(humString) + ',' + String(visible) + ',';
-              if (doorOpen) message += "OPENED,";
-              else message += "CLOSED,";
-              if (footSwitchPressed) message += "PRESSED";
-              else message += "RELEASED";
-              sendSerialMessage(message);
+              sendSensorMessage(max.temperature(100, RREF), sht31.readHumidity(), visible);
+            } else if (commandString == "SUBSCRIBE" && numParams == 4) { // Command to push sensor data - interval in seconds (0 to stop), temperature, humidity and light deadbands
+              subscribe(strtoul(dataArray[0].c_str(), NULL, 10), strtoul(dataArray[1].c_str(), NULL, 10),
+                        strtoul(dataArray[2].c_str(), NULL, 10), strtoul(dataArray[3].c_str(), NULL, 10));
+              sendOKMessage(commandString);
+            } else if (commandString == "BAUD" && numParams == 1) { // Command to switch to the binary protocol at a higher baud rate
+              unsigned long baud = strtoul(dataArray[0].c_str(), NULL, 10);
+              if (baud == 115200 || baud == 250000 || baud == 500000) {
+                sendOKMessage(commandString);
+                Serial.flush(); // Finish sending the OK at the old baud rate
+                Serial.end();
+                Serial.begin(baud);
+                binaryMode = true;
+                binIndex = 0;
+                lastBinaryFrame = millis();
+              } else sendErrorMessage("Bad baud rate.");
             } else sendErrorMessage("Bad command or data.");
           } else sendErrorMessage("Command or size was not sent.");
         } else sendErrorMessage("Checksum mismatch.");
@@ -410,7 +454,59 @@ void clearMatrix() {
   matrix.fillScreen(0);
 }
 
+// Helper method to update the stored format preferences
+void setFormatting(boolean use12Hour, boolean fahrenheit) {
+  use12HourFormat = use12Hour;
+  EEPROM.write(addrUse12HourFormat, use12Hour ? 1 : 0);
+  useFahrenheit = fahrenheit;
+  EEPROM.write(addrUseFahrenheit, fahrenheit ? 1 : 0);
+  clearMatrix();
+}
+
+// Helper methods for subscribe mode
+void subscribe(unsigned int interval, int temperature, int humidity, int light) {
+  subscribeInterval = interval * 1000UL;
+  tempDeadband = temperature;
+  humDeadband = humidity;
+  lightDeadband = light;
+  pushedSwitches = 0xFF; // Send the current values right away
+}
+
+void pushSensorIfNeeded(float celsius, float humidity, int visible) {
+  if (subscribeInterval == 0) return;
+  int temperature = (int) (celsius * 100);
+  int hum = (int) (humidity * 100);
+  byte switches = (doorOpen ? 1 : 0) | (footSwitchPressed ? 2 : 0);
+  if (switches != pushedSwitches || millis() - lastPush >= subscribeInterval || abs(temperature - pushedTemp) > tempDeadband ||
+      abs(hum - pushedHum) > humDeadband || abs(visible - pushedLight) > lightDeadband) {
+    if (binaryMode) {
+      addBinarySensor(celsius, humidity, visible);
+      sendBinaryFrame();
+    } else sendSensorMessage(celsius, humidity, visible);
+    lastPush = millis();
+    pushedTemp = temperature;
+    pushedHum = hum;
+    pushedLight = visible;
+    pushedSwitches = switches;
+  }
+}
+
 // Helper methods for serial communication
+void sendSensorMessage(float celsius, float humidity, int visible) {
+  char tempString[6];
+  char humString[6];
+  dtostrf(celsius, 3, 2, tempString);
+  dtostrf(humidity, 3, 2, humString);
+  String message = "SENSOR!5@";
+  message += String(tempString) + ',';
+  message += String(humString) + ',' + String(visible) + ',';
+  if (doorOpen) message += "OPENED,";
+  else message += "CLOSED,";
+  if (footSwitchPressed) message += "PRESSED";
+  else message += "RELEASED";
+  sendSerialMessage(message);
+}
+
 void sendErrorMessage(String error) {
   sendSerialMessage("ERROR!1@"+error);
 }
@@ -621,3 +717,118 @@ void printBottomLineIfNeeded() {
   }
 }
 
+// Helper methods for the binary serial protocol
+uint16_t crc16(byte *data, byte length) { // CRC-16/CCITT-FALSE (polynomial 0x1021, initial value 0xFFFF)
+  uint16_t crc = 0xFFFF;
+  for (byte i = 0; i < length; i++) {
+    crc ^= (uint16_t) data[i] << 8;
+    for (byte j = 0; j < 8; j++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+void handleBinarySerial(int visible) {
+  while (Serial.available() > 0) {
+    byte inByte = Serial.read();
+    if (binIndex == 0 && inByte != BINARY_SYNC) continue; // Wait for the start of a frame
+    binBuffer[binIndex++] = inByte;
+    if (binIndex == 2 && binBuffer[1] > BINARY_MAX_PAYLOAD) { // Not a frame - look for the next sync byte
+      binIndex = 0;
+    } else if (binIndex > 2 && binIndex == binBuffer[1] + 4) { // Sync byte, length, payload and CRC-16 received
+      uint16_t receivedCRC = ((uint16_t) binBuffer[binIndex - 2] << 8) | binBuffer[binIndex - 1];
+      binOut[0] = 0;
+      if (crc16(binBuffer + 1, binBuffer[1] + 1) == receivedCRC) {
+        lastBinaryFrame = millis();
+        handleBinaryPayload(binBuffer + 2, binBuffer[1], visible);
+      } else addBinaryReply(BIN_ERROR, BIN_ERROR_CHECKSUM);
+      sendBinaryFrame();
+      binIndex = 0;
+    }
+  }
+
+  if (millis() - lastBinaryFrame > BINARY_TIMEOUT) { // The Raspberry Pi stopped sending binary frames (or restarted)
+    Serial.end();
+    Serial.begin(9600);
+    binaryMode = false;
+  }
+}
+
+void handleBinaryPayload(byte *payload, byte length, int visible) {
+  byte i = 0;
+  while (i < length) {
+    byte command = payload[i++];
+    if (command == BIN_APP && i + 2 <= length && payload[i] == NUM_APPLIANCES) {
+      for (int z = 0; z < NUM_APPLIANCES; z++) {
+        digitalWrite(APPLIANCE_PINS[z], bitRead(payload[i+1], z) ? HIGH : LOW);
+      }
+      i += 2;
+      addBinaryReply(BIN_OK, command);
+    } else if (command == BIN_SET_DATE_TIME && i + 7 <= length) {
+      clock.setDateTime(payload[i] | (payload[i+1] << 8), payload[i+2], payload[i+3], payload[i+4], payload[i+5], payload[i+6]);
+      i += 7;
+      clearMatrix();
+      addBinaryReply(BIN_OK, command);
+    } else if (command == BIN_SET_FORMATTING && i + 1 <= length) {
+      setFormatting(bitRead(payload[i], 0), bitRead(payload[i], 1));
+      i++;
+      addBinaryReply(BIN_OK, command);
+    } else if (command == BIN_SET_LIGHT_THRESHOLD && i + 1 <= length) {
+      lightThreshold = payload[i++];
+      EEPROM.write(addrLightThreshold, lightThreshold);
+      addBinaryReply(BIN_OK, command);
+    } else if (command == BIN_ENABLE_MATRIX && i + 1 <= length && payload[i] < 3) {
+      matrixEnabled = true;
+      lightSensorMode = LIGHT_SENSOR_MODES[payload[i++]];
+      addBinaryReply(BIN_OK, command);
+    } else if (command == BIN_DISABLE_MATRIX) {
+      matrixEnabled = false;
+      clearMatrix();
+      addBinaryReply(BIN_OK, command);
+    } else if (command == BIN_GET_SENSOR) {
+      addBinarySensor(max.temperature(100, RREF), sht31.readHumidity(), visible);
+    } else if (command == BIN_SUBSCRIBE && i + 8 <= length) {
+      subscribe(payload[i] | (payload[i+1] << 8), payload[i+2] | (payload[i+3] << 8),
+                payload[i+4] | (payload[i+5] << 8), payload[i+6] | (payload[i+7] << 8));
+      i += 8;
+      addBinaryReply(BIN_OK, command);
+    } else { // The rest of the payload can't be read without knowing this command's fields
+      addBinaryReply(BIN_ERROR, BIN_ERROR_BAD_COMMAND);
+      break;
+    }
+  }
+}
+
+void addBinarySensor(float celsius, float humidity, int visible) {
+  int temperature = (int) (celsius * 100);
+  uint16_t hum = (uint16_t) (humidity * 100);
+  if (binOut[0] + 8 > BINARY_MAX_PAYLOAD) sendBinaryFrame();
+  byte *reply = binOut + 1 + binOut[0];
+  reply[0] = BIN_SENSOR;
+  reply[1] = temperature & 0xFF;
+  reply[2] = (temperature >> 8) & 0xFF;
+  reply[3] = hum & 0xFF;
+  reply[4] = hum >> 8;
+  reply[5] = visible & 0xFF;
+  reply[6] = (visible >> 8) & 0xFF;
+  reply[7] = (doorOpen ? 1 : 0) | (footSwitchPressed ? 2 : 0);
+  binOut[0] += 8;
+}
+
+void addBinaryReply(byte command, byte value) {
+  if (binOut[0] + 2 > BINARY_MAX_PAYLOAD) sendBinaryFrame();
+  binOut[1 + binOut[0]] = command;
+  binOut[2 + binOut[0]] = value;
+  binOut[0] += 2;
+}
+
+void sendBinaryFrame() {
+  if (binOut[0] == 0) return;
+  uint16_t crc = crc16(binOut, binOut[0] + 1);
+  Serial.write(BINARY_SYNC);
+  Serial.write(binOut, binOut[0] + 1);
+  Serial.write((byte) (crc >> 8));
+  Serial.write((byte) (crc & 0xFF));
+  binOut[0] = 0;
+}
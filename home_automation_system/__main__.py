@@ -10,8 +10,24 @@ in a folder with the following files:
 
  - homeautomationsystem.py (Handles the system's operation - interfacing with each component)
  - serialcomm.py (Handles serial communication with the Arduino Mega)
+ - controllers.py (Drives one or more Arduino boards and maps appliances to their relays)
  - controls.py (Manages button input and LCD output - Display-o-Tron HAT)
+ - display.py (Writes only what changed to the LCD and backlight)
  - parseclasses.py (Provides skeleton code for custom Parse classes)
+ - rules.py (Checks sensor data against the system's actions)
+ - scheduler.py (Starts and ends schedules and sounds alarms on time)
+ - runtime.py (Runs each part of the system as its own task)
+ - uploader.py (Stores sensor data on disk and uploads it to Parse in batches)
+ - timeseries.py (Keeps recent sensor data in a ring buffer, with per-minute and per-hour rollups)
+ - archive.py (Stores every sensor reading and rollup in memory-mapped column files for time range queries)
+ - cache.py (Keeps a local copy of the Parse objects, fetching only what changed)
+ - mutations.py (Collects changes to Parse objects and saves them in batches)
+ - transport.py (Sends requests to Parse over keep-alive connections and records their latency)
+ - breaker.py (Stops requests to Parse while it is down, probing until it is back)
+ - errorlog.py (Writes the tasks' errors to the error log without blocking them)
+ - localapi.py (Serves the system's state and takes commands over HTTP and WebSocket on the home network)
+ - tracefile.py (Records the serial and Parse traffic to a trace file that can be replayed)
+ - metrics.py (Counters and histograms for measurements such as latency, served at /metrics)
  - alarm.mp3 (NOTE: You need to provide this file, can be any mp3 song
 
 The following Python libraries must be installed for the code to run:
@@ -31,10 +47,10 @@ if __name__ == '__main__':
     system = HomeAutomationSystem()
 
     # Button presses are handled by controls.py, but need to go through the HomeAutomationSystem class,
-    # so the system waits to run its main loop again once the button presses are processed.
+    # which queues them for its display task (so presses are handled in order and none are dropped).
     # Also, the @touch.on decorator does not allow for a class method to be used, so this handleButton method
     # calls the handleButton method in HomeAutomationSystem.
-    @touch.on([touch.BUTTON, touch.LEFT, touch.RIGHT, touch.DOWN, touch.CANCEL])
+    @touch.on([touch.BUTTON, touch.UP, touch.LEFT, touch.RIGHT, touch.DOWN, touch.CANCEL])
     def handleButton(channel, event):
         """ Method that tells the HomeAutomationSystem instance of a button press.
 
@@ -0,0 +1,296 @@
+# archive.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" archive module for Internet of Pi
+
+    This module provides the class SensorArchive, which keeps every sensor reading (and the per-minute and per-hour
+    rollups from SensorSeries) on the Pi, so charts of any time range can be drawn without paging through Parse.
+
+    Each column (time, temperature, humidity, light, switches, ...) is a file of fixed-width values, memory-mapped with
+    ColumnTable.  Rows are appended in time order, so the time column is its own index: a time range is found with a
+    binary search, and its values are returned as memoryviews of the mapped files - nothing is copied, and
+    numpy.frombuffer (if NumPy is installed) or array.array can use them directly.  Files grow ARCHIVE_CHUNK rows at a
+    time, and the number of rows is found again when the archive is opened (rows past the end have a time of 0).
+
+    series returns a downsampled series for a time range from the stored rollups, so a month of data is read from
+    about 720 hourly rows instead of hundreds of thousands of samples.
+
+    On Python 2, where mmap doesn't support memoryview, the values are returned as copies in array.array objects.
+
+"""
+
+import bisect, mmap, operator, os, struct, threading
+from array import array
+from timeseries import *
+
+ARCHIVE_DIR = '/home/pi/home_automation_system/archive' # Directory of the column files
+ARCHIVE_CHUNK = 21600 # Rows each column file grows by (one day of samples taken every 4 seconds)
+
+# Columns of the sample table and of each rollup table - (name, array/struct typecode) tuples, the first column is the time
+SAMPLE_COLUMNS = (('time', 'd'), ('temperature', 'f'), ('humidity', 'f'), ('light', 'i'), ('switches', 'B'))
+ROLLUP_COLUMNS = (('start', 'd'), ('count', 'I'),
+                  ('temperatureMin', 'f'), ('temperatureMax', 'f'), ('temperatureMean', 'f'),
+                  ('humidityMin', 'f'), ('humidityMax', 'f'), ('humidityMean', 'f'),
+                  ('lightMin', 'f'), ('lightMax', 'f'), ('lightMean', 'f'))
+SENSOR_NAMES = ('temperature', 'humidity', 'light')
+
+class ColumnTable:
+    """ Instance is a table of fixed-width columns, each in its own memory-mapped file, with rows in order of the first column
+
+    Instance Attributes:
+
+        _columns   [Tuple of (name, typecode) tuples]
+        _sizes     [Dictionary: column name -> bytes per value]
+        _files     [Dictionary: column name -> open file]
+        _maps      [Dictionary: column name -> mmap of the file]
+        _capacity  [Int: rows the files have room for]
+        _count     [Int: rows stored]
+        _chunk     [Int: rows the files grow by when they are full]
+        _lock      [threading.Lock: rows are appended by the control task while other threads query them]
+    """
+    def __init__(self, directory, columns, chunk=ARCHIVE_CHUNK):
+        """ Initializes a ColumnTable, creating its directory and files if they don't exist.
+
+        Parameter: directory [String: directory of the column files (one <name>.col file per column)]
+        Parameter: columns   [Tuple of (name, typecode) tuples - the first column must only ever increase, and not be 0]
+        Parameter: chunk     [Int: rows the files grow by]
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._columns = columns
+        self._sizes = {}
+        self._files = {}
+        self._maps = {}
+        self._chunk = chunk
+        self._lock = threading.Lock()
+        capacity = None
+        for name, typecode in columns:
+            self._sizes[name] = struct.calcsize(typecode)
+            path = os.path.join(directory, name + '.col')
+            self._files[name] = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+            self._files[name].seek(0, os.SEEK_END)
+            rows = self._files[name].tell() // self._sizes[name]
+            capacity = rows if capacity is None else min(capacity, rows)
+        self._capacity = 0
+        self._grow(max(capacity, chunk))
+        self._count = self._firstIndex(lambda value: value == 0, self._capacity) # Rows past the end have never been written
+
+    def _grow(self, capacity):
+        """ Method that extends every column file to capacity rows (with zeros) and maps it again.
+        Old maps are not closed - memoryviews of them that were returned by column stay valid.
+        """
+        for name, typecode in self._columns:
+            size = capacity * self._sizes[name]
+            self._files[name].truncate(size)
+            self._maps[name] = mmap.mmap(self._files[name].fileno(), size)
+        self._capacity = capacity
+
+    def _firstIndex(self, test, count):
+        """ Method that binary searches the first column for the first of count rows whose value passes test
+        (test must fail for every row before it and pass for every row after it).
+
+        Returns: index of the row, or count if there is none
+        """
+        name, typecode = self._columns[0]
+        data = self._maps[name]
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if test(struct.unpack_from(typecode, data, middle * self._sizes[name])[0]):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def __len__(self):
+        """ Method that returns the number of rows stored.
+        """
+        return self._count
+
+    def last(self):
+        """ Method that returns the first column's value in the last row, or None if the table is empty.
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            name, typecode = self._columns[0]
+            return struct.unpack_from(typecode, self._maps[name], (self._count - 1) * self._sizes[name])[0]
+
+    def append(self, row):
+        """ Method that adds a row - its first column is written last, so a row that was cut short by a crash is not counted.
+
+        Parameter: row [Tuple of values, one per column]
+        """
+        with self._lock:
+            if self._count == self._capacity:
+                self._grow(self._capacity + self._chunk)
+            for index in range(len(self._columns) - 1, -1, -1):
+                name, typecode = self._columns[index]
+                struct.pack_into(typecode, self._maps[name], self._count * self._sizes[name], row[index])
+            self._count += 1
+
+    def find(self, start, end):
+        """ Method that finds the rows whose first column is in the range [start, end).
+
+        Returns: (first, last) tuple - indexes of the first row in the range and of the row after the range
+        """
+        with self._lock:
+            count = self._count
+        return (self._firstIndex(lambda value: value >= start, count), self._firstIndex(lambda value: value >= end, count))
+
+    def column(self, name, first, last):
+        """ Method that returns the values of a column in rows first to last - 1, without copying them.
+
+        Returns: memoryview of the values (array.array on Python 2)
+        """
+        typecode = dict(self._columns)[name]
+        size = self._sizes[name]
+        with self._lock:
+            data = self._maps[name]
+        try:
+            return memoryview(data)[first * size:last * size].cast(typecode)
+        except TypeError: # Python 2 - mmap doesn't support memoryview
+            return array(typecode, data[first * size:last * size])
+
+    def flush(self):
+        """ Method that writes the rows appended so far to the files.
+        """
+        with self._lock:
+            for name in self._maps:
+                self._maps[name].flush()
+
+    def close(self):
+        """ Method that writes the rows to the files and closes them.  Memoryviews returned by column keep their map open.
+        """
+        self.flush()
+        with self._lock:
+            for name in self._maps:
+                try:
+                    self._maps[name].close()
+                except BufferError: # A memoryview of the map is still in use
+                    pass
+                self._files[name].close()
+
+class SensorArchive:
+    """ Instance stores every sensor reading and rollup in ColumnTables, and answers time range queries from them
+
+    Instance Attributes:
+
+        _samples   [ColumnTable of the readings (SAMPLE_COLUMNS)]
+        _rollups   [Dictionary: period in seconds -> ColumnTable of its rollups (ROLLUP_COLUMNS), one for each of ROLLUP_PERIODS]
+    """
+    def __init__(self, directory=ARCHIVE_DIR):
+        """ Initializes a SensorArchive, opening (or creating) its tables.
+
+        Parameter: directory [String: directory of the archive]
+        """
+        self._samples = ColumnTable(os.path.join(directory, 'samples'), SAMPLE_COLUMNS)
+        self._rollups = {}
+        for period in ROLLUP_PERIODS:
+            self._rollups[period] = ColumnTable(os.path.join(directory, 'rollups-%d' % period), ROLLUP_COLUMNS, max(86400 // period, 1)) # A day of rollups at a time
+
+    def append(self, timestamp, sensorData):
+        """ Method that stores a reading.  If the clock went back, the reading is stored at the time of the last one,
+        so the time column stays in order.
+
+        Parameter: timestamp  [Number: time.time() when the reading was received]
+        Parameter: sensorData [SensorData object from SerialComm]
+        """
+        last = self._samples.last()
+        self._samples.append((max(timestamp, last or 0), sensorData.temperature, sensorData.humidity, int(sensorData.light),
+                              switchBits(sensorData.reedSwitch, sensorData.footSwitch)))
+
+    def appendRollup(self, rollup):
+        """ Method that stores a finished Rollup from SensorSeries (rollups older than the last one stored are skipped).
+
+        Parameter: rollup [Rollup object for one of ROLLUP_PERIODS]
+        """
+        table = self._rollups[rollup.period]
+        last = table.last()
+        if last is not None and rollup.start <= last:
+            return
+        mean = rollup.mean()
+        row = [rollup.start, rollup.count]
+        for index in range(3):
+            row.extend((rollup.minimum[index], rollup.maximum[index], mean[index]))
+        table.append(row)
+
+    def samples(self, start, end):
+        """ Method that returns the readings in a time range, without copying them.
+
+        Parameter: start [Number: time.time() of the start of the range]
+        Parameter: end   [Number: time.time() of the end of the range (not included)]
+
+        Returns: dictionary of column name (see SAMPLE_COLUMNS) -> memoryview of the values
+        """
+        first, last = self._samples.find(start, end)
+        return dict((name, self._samples.column(name, first, last)) for name, typecode in SAMPLE_COLUMNS)
+
+    def series(self, start, end, period):
+        """ Method that returns the minimum, maximum and mean of each sensor value over every period in a time range.
+
+        The largest of ROLLUP_PERIODS that period is a multiple of is read - if period is one of ROLLUP_PERIODS, the
+        rollups are returned without copying them.  Otherwise they (or the readings, for periods under a minute) are
+        merged into periods.  Rollups are only stored once their period ends, so the latest period may be missing.
+
+        Parameter: start  [Number: time.time() of the start of the range]
+        Parameter: end    [Number: time.time() of the end of the range (not included)]
+        Parameter: period [Int: seconds covered by each value]
+
+        Returns: dictionary of column name (see ROLLUP_COLUMNS) -> memoryview or array of the values
+        """
+        levels = [level for level in ROLLUP_PERIODS if period % level == 0]
+        if len(levels) == 0:
+            samples = self.samples(start, end)
+            return _merge(samples['time'], None, [(samples[name],) * 3 for name in SENSOR_NAMES], period)
+        table = self._rollups[max(levels)]
+        first, last = table.find(start, end)
+        columns = dict((name, table.column(name, first, last)) for name, typecode in ROLLUP_COLUMNS)
+        if period == max(levels):
+            return columns
+        return _merge(columns['start'], columns['count'],
+                      [(columns[name + 'Min'], columns[name + 'Max'], columns[name + 'Mean']) for name in SENSOR_NAMES], period)
+
+    def flush(self):
+        """ Method that writes the stored readings and rollups to the SD card.
+        """
+        self._samples.flush()
+        for table in self._rollups.values():
+            table.flush()
+
+    def close(self):
+        """ Method that writes the stored readings and rollups to the SD card and closes the archive.
+        """
+        self._samples.close()
+        for table in self._rollups.values():
+            table.close()
+
+def _merge(times, counts, values, period):
+    """ Function that merges rows (readings or rollups) into one row per period.
+    The rows of each period are found with a binary search, and merged with min, max and sum over slices of the columns.
+
+    Parameter: times  [Sequence of Numbers: time of each row, in order]
+    Parameter: counts [Sequence of Ints: samples in each row, or None for readings (one sample each)]
+    Parameter: values [List of (minimum, maximum, mean) tuples of sequences, for temperature, humidity and light]
+    Parameter: period [Int: seconds covered by each merged row]
+
+    Returns: dictionary of column name (see ROLLUP_COLUMNS) -> array of the values
+    """
+    columns = dict((name, array(typecode)) for name, typecode in ROLLUP_COLUMNS)
+    first = 0
+    while first < len(times):
+        start = times[first] - times[first] % period
+        last = bisect.bisect_left(times, start + period, first)
+        count = last - first if counts is None else sum(counts[first:last])
+        columns['start'].append(start)
+        columns['count'].append(count)
+        for name, (minimum, maximum, mean) in zip(SENSOR_NAMES, values):
+            columns[name + 'Min'].append(min(minimum[first:last]))
+            columns[name + 'Max'].append(max(maximum[first:last]))
+            if counts is None:
+                total = sum(mean[first:last])
+            else:
+                total = sum(map(operator.mul, mean[first:last], counts[first:last]))
+            columns[name + 'Mean'].append(total / float(count))
+        first = last
+    return columns
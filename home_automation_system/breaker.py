@@ -0,0 +1,130 @@
+# breaker.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" breaker module for Internet of Pi
+
+    This module provides the class CircuitBreaker, which stops requests to a backend (the Parse Server) that keeps
+    failing, so the tasks that use it don't each wait for a timeout on every request while it is down.
+
+    The breaker is closed while requests succeed.  After FAILURE_THRESHOLD failures in a row it opens, and requests are
+    refused (with a CircuitOpenError) without being sent.  Once the breaker has been open for OPEN_TIME seconds it is
+    half-open: one request is let through as a probe.  If the probe succeeds the breaker closes, otherwise it opens
+    again for twice as long (up to MAX_OPEN_TIME).
+
+"""
+
+import threading, time
+from metrics import *
+
+FAILURE_THRESHOLD = 3 # Failures in a row that open the breaker
+OPEN_TIME = 5         # Seconds the breaker stays open the first time
+MAX_OPEN_TIME = 300   # The time doubles each time a probe fails, up to this many seconds
+
+# States of a CircuitBreaker
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+class CircuitOpenError(Exception):
+    """ Exception raised instead of sending a request while a CircuitBreaker is open
+    """
+    pass
+
+class CircuitBreaker:
+    """ Instance tracks the failures of one backend and decides whether requests to it are sent
+
+    Instance Attributes:
+
+        name        [String: name of the backend, used as the label of the breaker's metrics]
+        _threshold  [Int: failures in a row that open the breaker]
+        _minOpenTime [Number: seconds the breaker stays open the first time]
+        _openTime   [Number: seconds the breaker stays open the next time it opens]
+        _maxOpenTime [Number: longest time the breaker stays open]
+        _state      [String: CLOSED, OPEN or HALF_OPEN]
+        _failures   [Int: failures in a row while closed]
+        _retryAt    [Float: time.time() when an open breaker becomes half-open]
+        _lock       [threading.Lock: requests come from several tasks]
+        _opened     [Counter: times the breaker opened]
+        _rejected   [Counter: requests refused while the breaker was open]
+    """
+    def __init__(self, name, threshold=FAILURE_THRESHOLD, openTime=OPEN_TIME, maxOpenTime=MAX_OPEN_TIME):
+        """ Initializes a new, closed CircuitBreaker.
+
+        Parameter: name        [String: name of the backend]
+        Parameter: threshold   [Int: failures in a row that open the breaker]
+        Parameter: openTime    [Number: seconds the breaker stays open the first time]
+        Parameter: maxOpenTime [Number: longest time the breaker stays open]
+        """
+        self.name = name
+        self._threshold = threshold
+        self._minOpenTime = openTime
+        self._openTime = openTime
+        self._maxOpenTime = maxOpenTime
+        self._state = CLOSED
+        self._failures = 0
+        self._retryAt = 0
+        self._lock = threading.Lock()
+        self._opened = METRICS.counter('circuit_breaker_opened_total', 'Times a circuit breaker opened', {'breaker': name})
+        self._rejected = METRICS.counter('circuit_breaker_rejected_total', 'Requests refused while a circuit breaker was open', {'breaker': name})
+
+    def allow(self):
+        """ Method that decides whether a request can be sent.  When an open breaker's time is up, the request that
+        asks first is the probe - it must be followed by a call to success or failure.
+
+        Returns: True if the request can be sent
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.time() >= self._retryAt:
+                self._state = HALF_OPEN
+                return True
+        self._rejected.inc()
+        return False
+
+    def success(self):
+        """ Method that records a request that succeeded - the breaker closes.
+        """
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._openTime = self._minOpenTime
+
+    def failure(self):
+        """ Method that records a request that failed - the breaker opens after enough failures in a row, or when a probe fails.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self._threshold):
+                self._state = OPEN
+                self._retryAt = time.time() + self._openTime
+                self._openTime = min(self._openTime * 2, self._maxOpenTime)
+                self._opened.inc()
+
+    def state(self):
+        """ Method that returns the breaker's state: CLOSED, OPEN or HALF_OPEN.
+        """
+        return self._state
+
+    def delay(self):
+        """ Method that returns the number of seconds until a request would be let through (0 unless the breaker is open).
+        """
+        with self._lock:
+            if self._state != OPEN:
+                return 0
+            return max(0, self._retryAt - time.time())
+
+    def call(self, function, *args):
+        """ Method that calls a function that makes a request, recording whether it succeeded.
+
+        Returns: what the function returns - raises CircuitOpenError without calling it if the breaker is open
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name + ' is unavailable (circuit breaker open)')
+        try:
+            result = function(*args)
+        except Exception:
+            self.failure()
+            raise
+        self.success()
+        return result
@@ -0,0 +1,220 @@
+# cache.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" cache module for Internet of Pi
+
+    This module provides the class ObjectCache, which keeps a local copy of the system's Appliances, Settings,
+    Schedules, Alarms and Actions.  After the first full fetch, only objects whose updatedAt is newer than the newest
+    one already cached are fetched, so a sync where nothing changed only transfers a few bytes per class.
+
+    The cached objects are handed out as a Snapshot, which is rebuilt only when something changes.
+    Changes in the system's MutationQueue that have not been flushed yet are applied to fetched objects.
+
+    The cached objects can be saved to a local state file and loaded from it when the system starts, so the system can
+    control the appliances before (or without) reaching Parse.  Classes loaded from the file are still fetched in full
+    by the first sync.  The changes in the MutationQueue that have not reached Parse yet are saved with them.
+
+"""
+
+import json, os
+
+from parseclasses import *
+from parse_rest.datatypes import ParseType
+
+QUERY_LIMIT = 1000 # Most objects Parse returns for one query
+
+# Classes kept in the cache, and whether objects of that class can be deleted (checked by counting them every sync)
+CACHED_CLASSES = [(Appliance, False), (Settings, False), (Schedule, True), (Alarm, True), (Action, True)]
+
+STATE_FORMAT = 2 # Version of the state file's format - files with another version are ignored
+
+def _isoDate(value):
+    """ Function that formats a datetime the way Parse returns createdAt and updatedAt.
+    """
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (value.microsecond // 1000)
+
+def _toJSON(obj):
+    """ Function that returns the fields of a Parse object as Parse would return them for a query.
+    Fields that hold other objects (like a Schedule's appliance) are written as Pointers, so they load as objects again.
+    """
+    fields = dict((name, ParseType.convert_to_parse(value, as_pointer=True)) for name, value in obj._editable_attrs.items())
+    fields['objectId'] = obj.objectId
+    for name in ('createdAt', 'updatedAt'):
+        if getattr(obj, name, None) is not None:
+            fields[name] = _isoDate(getattr(obj, name))
+    return fields
+
+class Snapshot:
+    """ Instance is a read-only view of the cached objects at one point in time
+
+    Instance Attributes:
+
+        version     [Int: incremented every time the cache changes]
+        appliances  [Tuple of Appliance objects, ordered by applianceId]
+        config      [Settings object, or None if there is none yet]
+        schedules   [Tuple of enabled Schedule objects]
+        alarms      [Tuple of enabled Alarm objects]
+        actions     [Tuple of enabled Action objects]
+    """
+    __slots__ = ('version', 'appliances', 'config', 'schedules', 'alarms', 'actions')
+
+    def __init__(self, version, objects):
+        """ Initializes a new Snapshot from the cache's objects.
+
+        Parameter: version [Int: the cache's version]
+        Parameter: objects [Dictionary: class -> dictionary of objectId -> object]
+        """
+        self.version = version
+        self.appliances = tuple(sorted(objects[Appliance].values(), key=lambda appliance: appliance.applianceId))
+        settings = list(objects[Settings].values())
+        self.config = settings[0] if len(settings) > 0 else None
+        self.schedules = tuple(schedule for schedule in objects[Schedule].values() if schedule.enabled)
+        self.alarms = tuple(alarm for alarm in objects[Alarm].values() if alarm.enabled)
+        self.actions = tuple(action for action in objects[Action].values() if action.enabled)
+
+class ObjectCache:
+    """ Instance is a local copy of the Parse objects the system uses, kept current with delta queries
+
+    Instance Attributes:
+
+        _objects      [Dictionary: class -> dictionary of objectId -> object]
+        _lastUpdated  [Dictionary: class -> newest updatedAt (datetime) cached for that class, or None if it has no objects]
+        _loaded       [Set of classes that have been fetched in full at least once]
+        _version      [Int: incremented every time the cache changes]
+        _snapshot     [Snapshot of the current version]
+        _mutations    [MutationQueue instance with changes that have not reached Parse yet]
+        _run          [Function that takes a list of functions, calls them (possibly concurrently) and returns their results]
+    """
+    def __init__(self, mutations, run=None):
+        """ Initializes a new, empty ObjectCache.
+
+        Parameter: mutations [MutationQueue instance]
+        Parameter: run       [Function used to make the queries of a sync, e.g. ParseTransport.concurrent - by default they are made one at a time]
+        """
+        self._objects = {}
+        self._lastUpdated = {}
+        for cls, deletable in CACHED_CLASSES:
+            self._objects[cls] = {}
+            self._lastUpdated[cls] = None
+        self._loaded = set()
+        self._version = 0
+        self._snapshot = Snapshot(self._version, self._objects)
+        self._mutations = mutations
+        self._run = run or (lambda functions: [function() for function in functions])
+
+    def sync(self):
+        """ Method that fetches the objects that changed since the last sync.
+        Classes whose objects can be deleted are also counted, and fetched in full if the count no longer matches the cache.
+        The queries for every class are made together (see the run parameter of __init__).
+
+        Returns: True if anything changed
+        """
+        queries = []
+        for cls, deletable in CACHED_CLASSES:
+            queries.append(self._fetchFunction(cls))
+            if deletable and cls in self._loaded:
+                queries.append(cls.Query.all().count)
+        results = self._run(queries)
+        changed = False
+        for cls, deletable in CACHED_CLASSES:
+            full = cls not in self._loaded
+            objects = results.pop(0)
+            if full:
+                self._loaded.add(cls)
+            if full or len(objects) > 0:
+                self._store(cls, objects, full)
+                changed = True
+            if deletable and not full and results.pop(0) != len(self._objects[cls]):
+                self._reload(cls)
+                changed = True
+        if changed:
+            self._version += 1
+            self._snapshot = Snapshot(self._version, self._objects)
+        return changed
+
+    def _fetchFunction(self, cls):
+        """ Method that returns a function that fetches every object of a class (the first time), or the objects that changed.
+        """
+        if cls not in self._loaded or self._lastUpdated[cls] is None:
+            query = cls.Query.all()
+        else:
+            query = cls.Query.filter(updatedAt__gt=self._lastUpdated[cls])
+        return lambda: list(query.limit(QUERY_LIMIT))
+
+    def _reload(self, cls):
+        """ Method that replaces the cached objects of one class with a full fetch.
+        """
+        self._store(cls, cls.Query.all().limit(QUERY_LIMIT), True)
+        self._loaded.add(cls)
+
+    def _store(self, cls, objects, replace=False):
+        """ Method that adds or replaces cached objects of one class and moves its updatedAt forward.
+        Objects waiting to be deleted are left out.
+
+        Parameter: replace [Boolean: True if objects are every object of the class, replacing the cached ones]
+        """
+        if replace:
+            self._lastUpdated[cls] = None
+        cached = {} if replace else dict(self._objects[cls]) # Copied so a Snapshot (or save) that is reading it is never changed
+        for obj in objects:
+            if self._lastUpdated[cls] is None or obj.updatedAt > self._lastUpdated[cls]:
+                self._lastUpdated[cls] = obj.updatedAt
+            if self._mutations.applyTo(obj):
+                cached[obj.objectId] = obj
+            elif obj.objectId in cached:
+                del cached[obj.objectId]
+        self._objects[cls] = cached
+
+    def save(self, path):
+        """ Method that writes the cached objects, and the changes that have not reached Parse yet, to a state file.
+        The file is written under a temporary name and then renamed, so a crash never leaves a partly written file.
+
+        Parameter: path [String: location of the state file]
+        """
+        state = {'format': STATE_FORMAT, 'classes': {}, 'mutations': self._mutations.toJSON()}
+        for cls, deletable in CACHED_CLASSES:
+            state['classes'][cls.__name__] = [_toJSON(obj) for obj in self._objects[cls].values()]
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as stateFile:
+            json.dump(state, stateFile, separators=(',', ':'))
+            stateFile.flush()
+            os.fsync(stateFile.fileno())
+        os.rename(temporary, path)
+
+    def load(self, path):
+        """ Method that fills the cache with the objects in a state file written by save, and records the changes
+        that were saved with them in the MutationQueue again.
+
+        Parameter: path [String: location of the state file]
+
+        Returns: True if the objects were loaded, False if the file doesn't exist or can't be read
+        """
+        try:
+            with open(path) as stateFile:
+                state = json.load(stateFile)
+        except (IOError, OSError, ValueError):
+            return False
+        if not isinstance(state, dict) or state.get('format') != STATE_FORMAT:
+            return False
+        classes = dict((cls.__name__, cls) for cls, deletable in CACHED_CLASSES)
+        objects = {}
+        for cls, deletable in CACHED_CLASSES:
+            for fields in state['classes'].get(cls.__name__, []):
+                objects[(cls.__name__, fields['objectId'])] = cls(**fields)
+        def find(className, objectId, fields):
+            if className not in classes:
+                return None
+            if objectId is None: # A new object
+                return classes[className](**fields)
+            return objects.get((className, objectId)) or classes[className](objectId=objectId)
+        self._mutations.restore(state.get('mutations', []), find)
+        for cls, deletable in CACHED_CLASSES: # Stored after the changes are restored, so objects waiting to be deleted are left out
+            self._store(cls, [obj for (className, objectId), obj in objects.items() if className == cls.__name__], True)
+        self._version += 1
+        self._snapshot = Snapshot(self._version, self._objects)
+        return True
+
+    def snapshot(self):
+        """ Method that returns a Snapshot of the cached objects - the same Snapshot is returned until something changes.
+        """
+        return self._snapshot
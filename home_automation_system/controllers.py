@@ -0,0 +1,281 @@
+# controllers.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" controllers module for Internet of Pi
+
+    This module provides the class ControllerManager, which drives one or more Arduino boards, each with its own
+    SerialComm (and its own serial input and output tasks, so one slow link doesn't hold up the others).
+
+    Appliances are spread over the boards in order of applianceId: the first board's relays are appliances
+    0 to n-1, the next board's relays follow, and so on.  Each board is only sent the appliance states of its own
+    relays, and only when one of them changed.  Sensor data from every board is merged into one stream.
+
+    A board that is unplugged, or stops responding (nothing received from it for SILENCE_TIMEOUT seconds, or twice the
+    push interval if that is longer), is closed, and connect opens it again once it is back, so the rest of the system
+    keeps running in the meantime.  When more than one board is found by USB ids alone, the order
+    of the boards follows their ports - give each board's USB serial number to fix which board is which.
+
+"""
+
+import os, threading, time, serial
+from serialcomm import *
+from metrics import *
+
+RECONNECT_INTERVAL = 0.5 # Seconds between attempts to connect the boards that are not connected
+SILENCE_TIMEOUT = 30     # Seconds without any message from a connected board before it is closed and connected again
+
+SERIAL_RETRIES = METRICS.counter('serial_connect_retries_total', 'Failed attempts to connect to an Arduino')
+SERIAL_DISCONNECTS = METRICS.counter('serial_disconnects_total', 'Times an Arduino was unplugged or stopped responding')
+
+class ControllerManager:
+    """ Instance drives the Arduino boards of the system
+
+    Instance Attributes:
+
+        _boards      [List of (port, relays) tuples: each board's serial port (or USB serial number, or None to find any Arduino) and number of relays]
+        _comms       [List of SerialComm instances, one per board (None while the board is not connected)]
+        _connected   [List of threading.Event objects, one per board: set while the board is connected]
+        _lock        [threading.Lock: guards _comms, which the serial tasks and connect change]
+        _offsets     [List of Ints: applianceId of each board's first relay]
+        _latestSensorData [SensorData object: the most recent sensor data from any board]
+        _silenceTimeout [Number: seconds without any message from a board before it is treated as not responding]
+        trace        [TraceRecorder instance that the first board's traffic is recorded to, or None]
+    """
+    def __init__(self, boards):
+        """ Initializes a new ControllerManager instance.  The boards are not connected until connect is called.
+
+        Parameter: boards [List of (port, relays) tuples, one per board]
+        """
+        self._boards = list(boards)
+        self._comms = [None] * len(self._boards)
+        self._connected = [threading.Event() for board in self._boards]
+        self._lock = threading.Lock()
+        self._offsets = []
+        offset = 0
+        for port, relays in self._boards:
+            self._offsets.append(offset)
+            offset += relays
+        self._latestSensorData = None
+        self._silenceTimeout = SILENCE_TIMEOUT
+        self.trace = None
+
+
+    def __len__(self):
+        """ Method that returns the number of boards.
+        """
+        return len(self._boards)
+
+
+    def numAppliances(self):
+        """ Method that returns the total number of relays on every board.
+        """
+        return sum(relays for port, relays in self._boards)
+
+
+    def locate(self, applianceId):
+        """ Method that finds the relay of an appliance.
+
+        Parameter: applianceId [Int: the appliance's applianceId]
+
+        Returns: (board, relay) tuple of Ints, or None if no board has a relay for the appliance
+        """
+        for board in range(len(self._boards)):
+            relay = applianceId - self._offsets[board]
+            if 0 <= relay < self._boards[board][1]:
+                return board, relay
+        return None
+
+
+    def connect(self, baudrate=BINARY_BAUDRATE):
+        """ Method that connects every board that isn't connected yet and is plugged in.
+        Each board is switched to the binary protocol if its sketch supports it.
+
+        Parameter: baudrate [Int: baud rate of the binary protocol, or None to keep the text protocol]
+
+        Returns: list of the Ints of the boards that were connected (they should be sent the system's state with resync)
+        """
+        connected = []
+        for board in range(len(self._boards)):
+            if self._comms[board] is not None:
+                continue
+            port = self._findPort(board)
+            if port is None:
+                SERIAL_RETRIES.inc()
+                continue
+            try:
+                comm = SerialComm(port)
+            except Exception:
+                SERIAL_RETRIES.inc()
+                continue
+            try:
+                comm.waitUntilReady()
+                comm.negotiate(baudrate)
+            except (serial.SerialException, OSError): # Unplugged again
+                comm.close()
+                SERIAL_RETRIES.inc()
+                continue
+            if board == 0:
+                comm.trace = self.trace
+            with self._lock:
+                self._comms[board] = comm
+            self._connected[board].set()
+            connected.append(board)
+        return connected
+
+
+    def _findPort(self, board):
+        """ Method that returns the serial port of a board if it is plugged in, or None.
+        """
+        port = self._boards[board][0]
+        if port is not None and port.startswith('/'):
+            return port if os.path.exists(port) else None
+        with self._lock:
+            inUse = [comm.port for comm in self._comms if comm is not None]
+        for found in findArduinoPorts(port):
+            if found not in inUse:
+                return found
+        return None
+
+
+    def _disconnect(self, board, comm):
+        """ Method that closes a board's serial connection after it failed, so connect can open it again.
+        """
+        with self._lock:
+            if self._comms[board] is not comm: # Another task already closed it
+                return
+            self._comms[board] = None
+            self._connected[board].clear()
+        SERIAL_DISCONNECTS.inc()
+        try:
+            comm.close()
+        except Exception:
+            pass
+
+
+    def resync(self, board, appliances, settings):
+        """ Method that sends a board that was just connected its appliance states, the time and every setting.
+
+        Parameter: board      [Int: index of the board]
+        Parameter: appliances [Tuple of type Appliance, ordered by applianceId]
+        Parameter: settings   [Parse Class - Settings: the newest settings]
+        """
+        comm = self._comms[board]
+        if comm is not None:
+            comm.updateAppliances(self._relays(appliances)[board])
+            comm.syncTime()
+            comm.syncSettings(settings, True)
+
+
+    def readFromSerial(self, board):
+        """ Method that handles serial messages coming from one board (see SerialComm.readFromSerial).
+        If the board isn't connected, waits up to a second for it to be connected.
+        A board that hasn't sent anything for too long is disconnected, so connect opens it again and it is resynced.
+
+        Parameter: board [Int: index of the board]
+
+        Returns: list of SensorData objects, one for each sensor message received
+        """
+        comm = self._comms[board]
+        if comm is None:
+            self._connected[board].wait(1)
+            return []
+        try:
+            sensorData = comm.readFromSerial()
+        except (serial.SerialException, OSError):
+            self._disconnect(board, comm)
+            return []
+        if time.time() - comm.lastReceived > self._silenceTimeout: # Still plugged in, but not responding
+            self._disconnect(board, comm)
+            return []
+        if len(sensorData) > 0:
+            self._latestSensorData = sensorData[-1]
+        return sensorData
+
+
+    def writePending(self, board):
+        """ Method that writes every queued serial message to one board (see SerialComm.writePending).
+        If the board isn't connected, waits up to a second for it to be connected.
+
+        Parameter: board [Int: index of the board]
+        """
+        comm = self._comms[board]
+        if comm is None:
+            self._connected[board].wait(1)
+            return
+        try:
+            comm.writePending()
+        except (serial.SerialException, OSError):
+            self._disconnect(board, comm)
+
+
+    def _relays(self, appliances):
+        """ Method that splits the appliances by board.
+
+        Returns: list with a list of Appliance objects for each board, ordered by relay
+        """
+        relays = [[] for board in self._boards]
+        for appliance in appliances:
+            location = self.locate(appliance.applianceId)
+            if location is not None:
+                relays[location[0]].append(appliance)
+        return relays
+
+
+    def updateAppliances(self, appliances):
+        """ Method that sends each board the states of its own relays, if any of them changed.
+
+        Parameter: appliances [Tuple of type Appliance, ordered by applianceId]
+        """
+        relays = self._relays(appliances)
+        for board in range(len(self._boards)):
+            comm = self._comms[board]
+            if comm is not None and len(relays[board]) > 0:
+                comm.updateAppliances(relays[board])
+
+
+    def syncSettings(self, settings):
+        """ Method that sends new system settings to every connected board (see SerialComm.syncSettings).
+        """
+        for comm in self._comms:
+            if comm is not None:
+                comm.syncSettings(settings)
+
+
+    def setDisplayMode(self, mode):
+        """ Method that changes the display mode of every connected board (see SerialComm.setDisplayMode).
+        """
+        for comm in self._comms:
+            if comm is not None:
+                comm.setDisplayMode(mode)
+
+
+    def requestSensorData(self, pushInterval=None, deadbands=(0, 0, 0)):
+        """ Method that asks every connected board for its latest sensor data, or to push it (see SerialComm.requestSensorData).
+        A board that pushes may stay quiet for the push interval, so boards are given twice as long before they count as not responding.
+        """
+        self._silenceTimeout = max(SILENCE_TIMEOUT, 2 * pushInterval) if pushInterval else SILENCE_TIMEOUT
+        for comm in self._comms:
+            if comm is not None:
+                comm.requestSensorData(pushInterval, deadbands)
+
+
+    def getLastSensorData(self):
+        """ Method that returns the latest sensor data from any board.
+        """
+        return self._latestSensorData
+
+
+    def syncTime(self):
+        """ Method that updates the real time clock of every connected board with the system time.
+        """
+        for comm in self._comms:
+            if comm is not None:
+                comm.syncTime()
+
+
+    def close(self):
+        """ Method that closes the serial connection of every connected board.
+        """
+        for comm in self._comms:
+            if comm is not None:
+                comm.close()
@@ -8,15 +8,35 @@
 
     In addition, this class also handles audio playback for the alarm feature.
 
+    The LCD shows one of several screens (the up button moves to the next one): an appliance and its state, the
+    latest sensor readings, and the alarm's status.  Screens are drawn into a FrameBuffer (see display.py), so only
+    the characters that changed are written to the LCD.
+
 """
 
-import dothat.backlight as backlight
-import dothat.lcd as lcd
 import dothat.touch as touch
 import subprocess, time
+from display import *
 
 ALARM_FILE = '/home/pi/home_automation_system/alarm.mp3' # Alarm mp3 file
 
+# Screens shown on the LCD, in the order the up button moves through them
+SCREEN_APPLIANCES = 'APPLIANCES'
+SCREEN_SENSORS = 'SENSORS'
+SCREEN_ALARM = 'ALARM'
+SCREENS = (SCREEN_APPLIANCES, SCREEN_SENSORS, SCREEN_ALARM)
+
+# Alarm actions (from the down button, or the local API - see alarmAction)
+ALARM_STOP = 'stop'           # Stop the alarm that is playing
+ALARM_SILENCE = 'silence'     # Silence the next alarm
+ALARM_UNSILENCE = 'unsilence' # Let the next alarm play again
+ALARM_ACTIONS = (ALARM_STOP, ALARM_SILENCE, ALARM_UNSILENCE)
+
+# Alarm statuses (see alarmState)
+ALARM_PLAYING = 'PLAYING'
+ALARM_SILENCED = 'SILENCED'
+ALARM_OFF = 'OFF'
+
 class Controls:
     """ Instance is the main form of input and output for the system
 
@@ -24,22 +44,28 @@ class Controls:
 
     Instance Attributes:
 
-        _appliances          [Queryset of all the appliances in the system - Parse custom class: Appliance]
+        _appliances          [Tuple of all the appliances in the system (from a cache Snapshot) - Parse custom class: Appliance]
+        _frameBuffer         [FrameBuffer instance: the text on the LCD]
+        _backlight           [Backlight instance: the backlight's colour]
+        _screen              [String: Screen Constant (see top of file) of the screen shown on the LCD]
         _currentApplianceID  [Int, ID number of the appliance displayed on the LCD]
         _alarmProcess        [Popen object of the process that plays the alarm mp3 file, or None if no alarm is playing]
         _alarmFinished       [Boolean, True if alarm has been dismissed, False otherwise ]
         _forceDisplayOn      [Boolean, True if button pressed (desire for time display to be on regardless of light level), False otherwise]
         _ignoreNextAlarm     [Boolean, True if button pressed (desire for next alarm to be silenced), False otherwise]
+        _online              [Boolean, True while Parse can be reached, False while the system runs in degraded mode]
 
     _alarmFinished, _forceDisplayOn, _displayIsForcedOn have getter methods used by HomeAutomationSystem
     """
     def __init__(self, appliances):
         """ Initializes a new Controls object
 
-        Parameter: appliances [Queryset to which self._appliances is set]
+        Parameter: appliances [Tuple of Appliance objects to which self._appliances is set]
         """
-        lcd.set_cursor_position(0, 0)
-        backlight.rgb(0, 255, 0)
+        self._frameBuffer = FrameBuffer()
+        self._backlight = Backlight()
+        self._backlight.rgb(0, 255, 0)
+        self._screen = SCREEN_APPLIANCES
         self._appliances = appliances
         self._currentApplianceID = 0
         self._alarmProcess = None
@@ -48,84 +74,152 @@ class Controls:
         self._forceDisplayOnTime = time.time()
         self._displayIsForcedOn = False
         self._ignoreNextAlarm = False
+        self._online = True
 
-    def update(self, appliances, sensorData, config):
-        """ Method that displays information on the LCD - one appliance and it's state, and whether alarm is silenced
+    def update(self, appliances, sensorData, config, online=True):
+        """ Method that displays information on the LCD - the current screen, whether alarm is going off or silenced,
+        and whether Parse can be reached
+        Only the characters that changed are written, so calling this when nothing changed costs nothing.
 
-        Parameter: appliances [Queryset to which self._appliances is set]
+        Parameter: appliances [Tuple of Appliance objects to which self._appliances is set]
         Parameter: sensorData [SensorData object with latest info]
         Parameter: config     [Settings object with latest configuration info]
+        Parameter: online     [Boolean, False to show OFFLINE while Parse can't be reached]
         """
         self._appliances = appliances
-        lcd.set_cursor_position(0, 0)
-        name = self._appliances[self._currentApplianceID].name[0:16]
-        state = '[ON] ' if self._appliances[self._currentApplianceID].state == 1 else '[OFF]'
-        lcd.write(name + ' '*(16-len(name)))
-        lcd.set_cursor_position(0, 1)
-        lcd.write(state)
-        if self._ignoreNextAlarm:
-            lcd.set_cursor_position(0, 2)
-            lcd.write('ALARM SILENCED')
+        self._online = online
+        if self._screen == SCREEN_SENSORS:
+            self._drawSensors(sensorData, config)
+        elif self._screen == SCREEN_ALARM:
+            self._drawAlarm()
+        else:
+            self._drawAppliance()
+        self._frameBuffer.flush()
         # If alarm is not going off and light sensor value is below threshold, shut backlight off
         if config is not None and sensorData is not None and sensorData.light < config.lightThreshold and not self._displayIsForcedOn and self._alarmProcess is None:
-            backlight.rgb(0, 0, 0)
+            self._backlight.rgb(0, 0, 0)
         elif self._alarmProcess is None: # Otherwise, set backlight to green (if alarm isn't going off)
-            backlight.rgb(0, 255, 0)
+            self._backlight.rgb(0, 255, 0)
+
+    def _status(self):
+        """ Method that returns the status for the bottom row of the LCD - the alarm's, or OFFLINE while Parse can't be reached.
+        """
+        if self._alarmProcess is not None:
+            return 'ALARM'
+        if self._ignoreNextAlarm:
+            return 'ALARM SILENCED'
+        if not self._online:
+            return 'OFFLINE'
+        return ''
+
+    def _drawAppliance(self):
+        """ Method that draws the appliance screen - the current appliance's name and state.
+        """
+        appliance = self._appliances[self._currentApplianceID]
+        self._frameBuffer.write(0, appliance.name)
+        self._frameBuffer.write(1, '[ON] ' if appliance.state == 1 else '[OFF]')
+        self._frameBuffer.write(2, self._status())
+
+    def _drawSensors(self, sensorData, config):
+        """ Method that draws the sensor screen - the latest temperature, humidity and light level, and whether the door is open.
+        """
+        if sensorData is None:
+            self._frameBuffer.write(0, 'No sensor data')
+            self._frameBuffer.write(1, '')
+        else:
+            if config is not None and config.useFahrenheit:
+                temperature = '%.1fF' % (sensorData.temperature * 9 / 5 + 32)
+            else:
+                temperature = '%.1fC' % sensorData.temperature
+            self._frameBuffer.write(0, temperature + '  ' + '%.0f%% RH' % sensorData.humidity)
+            self._frameBuffer.write(1, 'Light %d' % sensorData.light + (' OPEN' if sensorData.reedSwitch == 'OPENED' else ''))
+        self._frameBuffer.write(2, self._status())
+
+    def _drawAlarm(self):
+        """ Method that draws the alarm screen - the alarm's status and what the down button does.
+        """
+        if self._alarmProcess is not None:
+            self._frameBuffer.write(0, 'Alarm: PLAYING')
+            self._frameBuffer.write(1, 'Down: stop')
+        elif self._ignoreNextAlarm:
+            self._frameBuffer.write(0, 'Alarm: SILENCED')
+            self._frameBuffer.write(1, 'Down: unsilence')
+        else:
+            self._frameBuffer.write(0, 'Alarm: ON')
+            self._frameBuffer.write(1, 'Down: silence')
+        self._frameBuffer.write(2, '')
 
     def handleButton(self, channel):
         """ Method that handles button presses.
         Backlight changes to red after button press while loading.
 
+        The select button doesn't change the appliance here: _appliances may be older than the control task's, so the
+        control task toggles the appliance with the applianceId that is returned.
+
         Parameter: channel [Int, what button was pressed - constants from dothat/touch.py]
+
+        Returns: applianceId of the appliance to turn on or off if the select button was pressed, None otherwise
         """
-        backlight.rgb(255, 0, 0)
+        self._backlight.rgb(255, 0, 0)
         if channel == touch.BUTTON: # Select button pressed: turn current appliance on or off
-            currentAppliance = self._appliances[self._currentApplianceID]
-            if currentAppliance.state == 0 and currentAppliance.enabled:
-                currentAppliance.state = 1
-                currentAppliance.save()
-            else:
-                currentAppliance.state = 0
-                currentAppliance.save()
+            return self._appliances[self._currentApplianceID].applianceId
+        elif channel == touch.UP: # Up button pressed: go to the next screen
+            self._screen = SCREENS[(SCREENS.index(self._screen) + 1) % len(SCREENS)]
         elif channel == touch.LEFT and self._currentApplianceID > 0: # Left button pressed: go to previous appliance
             self._currentApplianceID -= 1
+            self._screen = SCREEN_APPLIANCES
         elif channel == touch.RIGHT and self._currentApplianceID < len(self._appliances)-1: # Right button pressed: go to next appliance
             self._currentApplianceID += 1
+            self._screen = SCREEN_APPLIANCES
         elif channel == touch.DOWN: # Down button pressed: turn off alarm or silence the next alarm
             if self._alarmProcess is not None:
-                self._alarmProcess.terminate()
-                self._alarmProcess = None
-                self._alarmFinished = True
-                lcd.set_cursor_position(0, 2)
-                lcd.write('     ')
-                backlight.rgb(0, 255, 0)
+                self.alarmAction(ALARM_STOP)
             elif not self._ignoreNextAlarm:
-                self._ignoreNextAlarm = True
+                self.alarmAction(ALARM_SILENCE)
             else:
-                self._ignoreNextAlarm = False
-                lcd.set_cursor_position(0, 2)
-                lcd.write('              ')
+                self.alarmAction(ALARM_UNSILENCE)
         elif channel == touch.CANCEL: # Cancel button pressed: force display on for 10 seconds
             if not self._displayIsForcedOn:
                 self._forceDisplayOn = True
                 self._displayIsForcedOn = True
                 self._forceDisplayOnTime = time.time()
-                backlight.rgb(0, 255, 0)
+                self._backlight.rgb(0, 255, 0)
+        return None
+
+    def alarmAction(self, action):
+        """ Method that stops the alarm that is playing, or silences (or unsilences) the next alarm.
+
+        Parameter: action [String: Alarm action constant (see top of file)]
+        """
+        if action == ALARM_STOP and self._alarmProcess is not None:
+            self._alarmProcess.terminate()
+            self._alarmProcess = None
+            self._alarmFinished = True
+            self._backlight.rgb(0, 255, 0)
+        elif action == ALARM_SILENCE:
+            self._ignoreNextAlarm = True
+        elif action == ALARM_UNSILENCE:
+            self._ignoreNextAlarm = False
+
+    def alarmState(self):
+        """ Method that returns the alarm's status: ALARM_PLAYING, ALARM_SILENCED or ALARM_OFF.
+        """
+        if self._alarmProcess is not None:
+            return ALARM_PLAYING
+        if self._ignoreNextAlarm:
+            return ALARM_SILENCED
+        return ALARM_OFF
 
     def playAlarm(self):
         """ Method that starts a process to play an mp3 file for the alarm.
-        Adds an alarm message to the LCD, and sets the backlight blue.
+        Sets the backlight blue - the alarm message is shown on the LCD by the next update.
         """
         if self._alarmProcess is None and not self._ignoreNextAlarm:
             self._alarmProcess = subprocess.Popen(['mpg123', ALARM_FILE, '--loop', '-1'])
-            lcd.set_cursor_position(0, 2)
-            lcd.write('ALARM')
-            backlight.rgb(0, 0, 255)
+            self._backlight.rgb(0, 0, 255)
         else:
             self._alarmFinished = True
             self._ignoreNextAlarm = False
-            lcd.set_cursor_position(0,2)
-            lcd.write('              ')
 
     def checkAlarmFinished(self):
         """ Method that allows HomeAutomationSystem to see if the alarm finished.
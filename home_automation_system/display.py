@@ -0,0 +1,97 @@
+# display.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" display module for Internet of Pi
+
+    This module provides the classes FrameBuffer and Backlight, which sit in front of the Display-o-Tron HAT's LCD and
+    backlight.  Every call to the HAT is a transaction on the Raspberry Pi's bus, so the text and colour the HAT is
+    showing are remembered: FrameBuffer only writes the characters that changed, and Backlight only sets a colour that
+    is different from the current one.  Redrawing a screen that didn't change costs no bus transactions.
+
+"""
+
+import dothat.backlight as backlight
+import dothat.lcd as lcd
+from metrics import *
+
+LCD_WIDTH = 16  # Characters per row
+LCD_HEIGHT = 3  # Rows
+MERGE_GAP = 2   # Runs of changed characters this close together are written in one run (moving the cursor costs about as much)
+
+LCD_WRITES = METRICS.counter('lcd_characters_written_total', 'Characters written to the LCD')
+
+class FrameBuffer:
+    """ Instance is a copy of the LCD's text that writes only what changed
+
+    Instance Attributes:
+
+        _shown   [List of Strings: the text of each row on the LCD, or None for a row whose text isn't known]
+        _next    [List of Strings: the text of each row to show on the next flush]
+    """
+    def __init__(self):
+        """ Initializes a new FrameBuffer - the LCD's rows are written in full on the first flush.
+        """
+        self._shown = [None] * LCD_HEIGHT
+        self._next = [' ' * LCD_WIDTH] * LCD_HEIGHT
+
+    def write(self, row, text):
+        """ Method that sets the text of a row (cut or padded with spaces to LCD_WIDTH).
+
+        Parameter: row  [Int: 0 to LCD_HEIGHT - 1]
+        Parameter: text [String: the text]
+        """
+        self._next[row] = text[0:LCD_WIDTH] + ' ' * (LCD_WIDTH - len(text))
+
+    def flush(self):
+        """ Method that writes the characters that changed since the last flush to the LCD.
+
+        Returns: number of characters written
+        """
+        written = 0
+        for row in range(LCD_HEIGHT):
+            shown = self._shown[row]
+            text = self._next[row]
+            if shown == text:
+                continue
+            for start, end in self._changedRuns(shown, text):
+                lcd.set_cursor_position(start, row)
+                lcd.write(text[start:end])
+                written += end - start
+            self._shown[row] = text
+        LCD_WRITES.inc(written)
+        return written
+
+    def _changedRuns(self, shown, text):
+        """ Method that finds the runs of characters that differ between two versions of a row.
+
+        Returns: list of (start, end) tuples
+        """
+        if shown is None:
+            return [(0, LCD_WIDTH)]
+        runs = []
+        for column in range(LCD_WIDTH):
+            if shown[column] != text[column]:
+                if len(runs) > 0 and column - runs[-1][1] <= MERGE_GAP:
+                    runs[-1] = (runs[-1][0], column + 1)
+                else:
+                    runs.append((column, column + 1))
+        return runs
+
+class Backlight:
+    """ Instance sets the backlight's colour, skipping colours it already has
+
+    Instance Attributes:
+
+        _colour  [Tuple of Ints: (red, green, blue) of the backlight, or None if it isn't known]
+    """
+    def __init__(self):
+        """ Initializes a new Backlight - the first colour is always set.
+        """
+        self._colour = None
+
+    def rgb(self, red, green, blue):
+        """ Method that sets the backlight's colour if it is different from the current one.
+        """
+        if self._colour != (red, green, blue):
+            backlight.rgb(red, green, blue)
+            self._colour = (red, green, blue)
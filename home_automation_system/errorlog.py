@@ -0,0 +1,115 @@
+# errorlog.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" errorlog module for Internet of Pi
+
+    This module provides the class ErrorLog, which appends the errors raised by the system's tasks to a file.
+
+    Logging an error never blocks the task it came from: errors are queued and written by the log's own thread, which
+    keeps the file open.  The same error from the same task is written at most once every ERROR_LOG_INTERVAL seconds -
+    repeats in between are counted, and the count is written with the error the next time it is logged.  If errors come
+    faster than they can be written, the ones that don't fit in the queue are dropped.
+
+"""
+
+import datetime, threading, time
+from metrics import *
+
+try:
+    import Queue as queue # Python 2
+except ImportError:
+    import queue
+
+ERROR_LOG_INTERVAL = 60 # Seconds before the same error is written again
+ERROR_QUEUE_SIZE = 100  # Errors waiting to be written - more are dropped
+MAX_ERROR_KEYS = 256    # Errors whose last write time is remembered (older ones are forgotten first)
+
+SUPPRESSED_ERRORS = METRICS.counter('error_log_suppressed_total', 'Errors not written to the error log because the same error was written recently')
+DROPPED_ERRORS = METRICS.counter('error_log_dropped_total', 'Errors not written to the error log because its queue was full or the file could not be written')
+
+class ErrorLog:
+    """ Instance writes errors to the error log on its own thread
+
+    Instance Attributes:
+
+        _path        [String: path of the error log]
+        _queue       [Queue of (time, task, message, repeats) tuples waiting to be written - a tuple of Nones stops the thread]
+        _lock        [threading.Lock: guards _lastWritten and _repeats, since errors come from every task]
+        _lastWritten [Dictionary: (task, message) -> time.time() the error was last queued]
+        _repeats     [Dictionary: (task, message) -> times the error was raised since it was last queued]
+        _thread      [threading.Thread that writes the queued errors]
+    """
+    def __init__(self, path):
+        """ Initializes a new ErrorLog and starts its thread.
+
+        Parameter: path [String: path of the file errors are appended to]
+        """
+        self._path = path
+        self._queue = queue.Queue(ERROR_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._lastWritten = {}
+        self._repeats = {}
+        self._thread = threading.Thread(target=self._write, name='error-log')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def log(self, err):
+        """ Method that queues an error to be written, unless the same error from the same task was written recently.
+        The error is counted in METRICS under the task (thread) it was raised in.
+
+        Parameter: err [Exception that occurred]
+        """
+        task = threading.current_thread().name
+        METRICS.counter('task_errors_total', 'Errors raised by each task', {'task': task}).inc()
+        key = (task, type(err).__name__ + ': ' + str(err))
+        now = time.time()
+        with self._lock:
+            if now - self._lastWritten.get(key, 0) < ERROR_LOG_INTERVAL:
+                self._repeats[key] = self._repeats.get(key, 0) + 1
+                SUPPRESSED_ERRORS.inc()
+                return
+            if key not in self._lastWritten and len(self._lastWritten) >= MAX_ERROR_KEYS:
+                oldest = min(self._lastWritten, key=self._lastWritten.get)
+                del self._lastWritten[oldest]
+                self._repeats.pop(oldest, None)
+            self._lastWritten[key] = now
+            repeats = self._repeats.pop(key, 0)
+        try:
+            self._queue.put_nowait((now, task, key[1], repeats))
+        except queue.Full:
+            DROPPED_ERRORS.inc()
+
+    def close(self):
+        """ Method that writes the errors still queued, then stops the log's thread.
+        """
+        self._queue.put((None, None, None, None))
+        self._thread.join(5)
+
+    def _write(self):
+        """ Method run on the log's thread - appends each queued error (and the date/time it occurred) to the file.
+        """
+        logFile = None
+        while True:
+            when, task, message, repeats = self._queue.get()
+            if when is None:
+                break
+            try:
+                if logFile is None:
+                    logFile = open(self._path, 'a')
+                logFile.write(datetime.datetime.fromtimestamp(when).strftime('%c'))
+                logFile.write('\n')
+                logFile.write(task + ': ' + message)
+                if repeats > 0:
+                    logFile.write(' (and %d times since it was last logged)' % repeats)
+                logFile.write('\n')
+                logFile.flush()
+            except (IOError, OSError): # The file is reopened for the next error
+                DROPPED_ERRORS.inc()
+                try:
+                    if logFile is not None:
+                        logFile.close()
+                except (IOError, OSError):
+                    pass
+                logFile = None
+        if logFile is not None:
+            logFile.close()
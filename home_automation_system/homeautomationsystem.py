@@ -5,43 +5,163 @@
 
     This file contains the main controller for the system, including code to connect to the Parse Open Source backend
 
+    The system runs as several tasks (see runtime.py) that talk to each other through queues:
+     - serial input:  reads messages from an Arduino and passes sensor data to the control task (one per board)
+     - serial output: writes queued messages to an Arduino (one per board)
+     - serial supervisor: connects the boards, and reconnects any that are unplugged and plugged back in
+     - sensor:        asks the Arduino for new sensor data
+     - cloud:         flushes the MutationQueue to Parse and fetches changes to the appliances, settings, schedules, alarms and actions
+     - upload:        uploads sensor data or its rollups (stored on disk by SensorUploader) to Parse in batches
+     - control:       owns the system's state - runs actions, schedules and alarms, applies changes from Parse and writes the state file
+     - display:       handles button presses and updates the LCD
+    The Scheduler runs on its own thread and passes schedules and alarms that fire to the control task.
+
+    While the Parse Server is down, the transport's circuit breaker (see breaker.py) is open and the system runs in
+    degraded mode: the cloud and upload tasks wait for the breaker instead of sending requests, changes and sensor data
+    are kept until Parse is back, and the serial, control and display tasks (schedules, actions and buttons) carry on
+    from the local copy of the Parse objects.  The LCD shows OFFLINE meanwhile.
+    Each phase of the tasks' work is timed in METRICS (see metrics.py), which is served over HTTP by MetricsServer.
+    LocalAPIServer (see localapi.py) serves the system's state on the home network and hands its commands to the
+    control and display tasks, which publish every change back to its WebSocket clients.
+
 """
 
-import time, os, datetime
+import time, os, datetime, threading
 
-os.environ["PARSE_API_ROOT"] = ''
+os.environ.setdefault("PARSE_API_ROOT", '') # URL of the Parse Server's API (can also be set in the environment) - ParseTransport refuses to start without it
 
 from serialcomm import *
+from controllers import *
 from controls import *
 from parseclasses import *
+from rules import *
+from scheduler import *
+from runtime import *
+from uploader import *
+from timeseries import *
+from cache import *
+from mutations import *
+from transport import *
+from metrics import *
+from tracefile import *
+from breaker import *
+from errorlog import *
+from localapi import *
+from archive import *
 
 from parse_rest.connection import register
-from parse_rest.datatypes import Function
 from parse_rest.connection import ParseBatcher
 
+try:
+    import Queue as queue # Python 2
+except ImportError:
+    import queue
+
 APPLICATION_ID = ''
 
 register(APPLICATION_ID, '')
 
-# Cloud Code Functions
-processScheduling = Function('processScheduling')
-processAlarms = Function('processAlarms')
+# Requests to Parse are sent over keep-alive connections, and their latency is recorded
+transport = ParseTransport(os.environ["PARSE_API_ROOT"])
+transport.install()
 
 NUM_APPLIANCES = 4
 
+# List of (serial port, number of relays) tuples, one per Arduino board (see controllers.py),
+# or None for one board on SERIAL_PORT with NUM_APPLIANCES relays
+CONTROLLERS = None
+
+# When enabled, each phase of the system's work is timed and every metric is served at http://<METRICS_ADDRESS>:METRICS_PORT/metrics
+# (see metrics.py - only on the Pi itself by default)
+METRICS_ENABLED = True
+METRICS.enabled = METRICS_ENABLED
+
+# When enabled, the state is served and commands are taken at http://<LOCAL_API_ADDRESS>:LOCAL_API_PORT/api/ (see localapi.py -
+# serving the home network requires LOCAL_API_TOKEN)
+LOCAL_API_ENABLED = True
+
+# Path of a trace file to record the serial and Parse traffic to (see tracefile.py and benchmark/replay.py), or None
+TRACE_FILE = None
+
+ERROR_LOG = '/home/pi/home_automation_system/errorlog.txt'
+
+# The cached Parse objects are saved here after every change, so the system can start without waiting for Parse
+STATE_FILE = '/home/pi/home_automation_system/state.json'
+
+# Seconds between runs of the periodic tasks
+SENSOR_INTERVAL = 4
+CLOUD_INTERVAL = 4
+CLOUD_MAX_INTERVAL = 16 # When a sync finds nothing new, the cloud task waits twice as long (up to this) before the next one
+DISPLAY_INTERVAL = 1
+DISPLAY_REFRESH = 4 # The LCD is redrawn at least this often
+
+# The Arduino pushes sensor data at least every SENSOR_PUSH_INTERVAL seconds, as soon as a value moves by more than its
+# deadband, and right away when the door or foot switch changes.  None asks for sensor data every SENSOR_INTERVAL seconds.
+SENSOR_PUSH_INTERVAL = 60
+SENSOR_DEADBANDS = (0.2, 1.0, 5) # Temperature (degrees), humidity (%), light
+
+# UPLOAD_RAW uploads every sample, UPLOAD_ROLLUPS uploads per-minute/per-hour rollups and reed/foot switch changes instead
+UPLOAD_MODE = UPLOAD_RAW
+
+# Events handled by the control task
+EVENT_SENSOR = 'SENSOR'
+EVENT_SCHEDULE_START = 'SCHEDULE_START'
+EVENT_SCHEDULE_END = 'SCHEDULE_END'
+EVENT_ALARM = 'ALARM'
+EVENT_CLOUD = 'CLOUD'
+EVENT_APPLIANCES = 'APPLIANCES' # The select button was pressed - data is the applianceId to toggle
+EVENT_CONNECTED = 'CONNECTED' # A board was connected
+EVENT_LOCAL_APPLIANCE = 'LOCAL_APPLIANCE' # An appliance was changed with the local API
+
+# Phase each event is timed as
+CONTROL_PHASES = {
+    EVENT_SENSOR: 'sensor_rules',
+    EVENT_SCHEDULE_START: 'schedules',
+    EVENT_SCHEDULE_END: 'schedules',
+    EVENT_ALARM: 'alarms',
+    EVENT_CLOUD: 'apply_cloud_state',
+    EVENT_APPLIANCES: 'button_appliances',
+    EVENT_CONNECTED: 'resync_board',
+    EVENT_LOCAL_APPLIANCE: 'local_appliance',
+}
+
+# Commands handled by the display task
+DISPLAY_BUTTON = 'BUTTON'
+DISPLAY_ALARM = 'ALARM'
+DISPLAY_ALARM_ACTION = 'ALARM_ACTION' # An alarm action from the local API
+DISPLAY_REDRAW = 'REDRAW' # The control task changed an appliance - the LCD is redrawn
+
 class HomeAutomationSystem:
     """ Instance is the primary controller for Internet of Pi
 
     Instance Attributes:
 
-        _batcher    [ParseBatcher instance: allows saving of multiple objects at once.]
-        _handlingButton [Boolean: True if a button press is being handled (to prevent main loop from executing again until done), False otherwise.]
-        _appliances     [Queryset of Appliance objects, ordered by applianceId.]
+        _batcher        [ParseBatcher instance: allows saving of multiple objects at once.]
+        _cache          [ObjectCache instance: local copy of the Parse objects, kept current by the cloud task.]
+        _snapshot       [Snapshot of the cache most recently applied by the control task.]
+        _appliances     [Tuple of Appliance objects, ordered by applianceId.]
         _config         [Settings object: Settings store in Parse.]
-        _serialComm     [SerialComm instance: for communication with Arduino.]
-        _loopCounter    [Int: 0 if new sensor data should be requested from Arduino, 3 if cloud functions should run. Increments every iteration of loop (0-3).]
+        _rules          [ActionRules instance: checks sensor data against the actions locally.]
+        _scheduler      [Scheduler instance: starts/ends schedules and sounds alarms on time.]
+        _controllers    [ControllerManager instance: for communication with the Arduino boards.]
+        _controls       [Controls instance: for the buttons and LCD, or None until the system runs.]
+        _runtime        [Runtime instance: runs the system's tasks.]
+        _errorLog       [ErrorLog instance: writes the tasks' errors to ERROR_LOG.]
+        _events         [Queue of (event, data) tuples for the control task.]
+        _displayQueue   [Queue of (command, data) tuples for the display task.]
+        _mutations      [MutationQueue instance: changes to Parse objects (made only by the control task), flushed in batches by the cloud task.]
+        _savedVersion   [Tuple: the cache's and the MutationQueue's versions when STATE_FILE was last written.]
+        _uploader       [SensorUploader instance: stores sensor data until it is uploaded to Parse.]
+        _series         [SensorSeries instance: recent sensor data and its per-minute and per-hour rollups.]
+        _archive        [SensorArchive instance: every sensor reading and rollup, stored on the Pi.]
+        _lastDisplayUpdate [Float: time.time() when the LCD was last redrawn.]
+        _cloudWakeup    [threading.Event: set to start the cloud task's next cycle without waiting.]
+        _cloudInterval  [Number: seconds the cloud task waits before its next cycle.]
+        _metricsServer  [MetricsServer instance: serves the system's metrics, or None if METRICS_ENABLED is False.]
+        _localApi       [LocalAPIServer instance: serves the state on the home network, or None if LOCAL_API_ENABLED is False.]
+        _alarmState     [String: the alarm status last published to the local API.]
+        _trace          [TraceRecorder instance: records the serial and Parse traffic, or None if TRACE_FILE is None.]
         _lastTime       [time object: Used to check if daylight savings time change has occurred.]
-        _running        [Boolean: Flag used to determine if system should keep running (True), False otherwise.]
     """
 
     def __init__(self):
@@ -50,121 +170,405 @@ class HomeAutomationSystem:
         Sets initial states for instance attributes.
 
         """
+        self._trace = None
+        if TRACE_FILE is not None:
+            self._trace = TraceRecorder(TRACE_FILE, os.environ["PARSE_API_ROOT"])
+            transport.trace = self._trace
         self._batcher = ParseBatcher()
-        self._handlingButton = False
-        self._appliances = Appliance.Query.all().order_by('applianceId')
-        config = Settings.Query.all()
-        if len(config) == 0: # When the system is run for the first time, initialize the configuration
-            self._config = Settings(useFahrenheit=True, use12HourFormat=True, lightThreshold=5, temperatureThreshold=22.2, humidityThreshold=33, systemFlag="running", actionLastRan=datetime.datetime.now())
-            self._config.save()
-        else:
-            self._config = config[0]
-        self._serialComm = None
-        self._loopCounter = 0
-        self._lastTime = time.localtime()
-        self._running = True
-        if len(self._appliances) == 0: # When the system is run for the first time, initialize the appliances
-            appliances = []
-            for x in range(NUM_APPLIANCES):
+        self._mutations = MutationQueue()
+        self._cache = ObjectCache(self._mutations, transport.concurrent)
+        if not self._cache.load(STATE_FILE): # Without a state file, wait for Parse - otherwise the cloud task catches up
+            self._cache.sync()
+        if self._cache.snapshot().config is None: # When the system is run for the first time, initialize the configuration
+            Settings(useFahrenheit=True, use12HourFormat=True, lightThreshold=5, temperatureThreshold=22.2, humidityThreshold=33, systemFlag="running", actionLastRan=datetime.datetime.now()).save()
+            self._cache.sync()
+        self._controllers = ControllerManager(CONTROLLERS if CONTROLLERS is not None else [(SERIAL_PORT, NUM_APPLIANCES)])
+        # When the system is run for the first time (or a board is added), initialize the appliances
+        applianceIds = set(appliance.applianceId for appliance in self._cache.snapshot().appliances)
+        appliances = []
+        for x in range(self._controllers.numAppliances()):
+            if x not in applianceIds:
                 appliances.append(Appliance(applianceId=x, name='Appliance '+str(x), enabled=1, state=0))
+        if len(appliances) > 0:
             self._batcher.batch_save(appliances)
-            self._appliances = Appliance.Query.all().order_by('applianceId')
+            self._cache.sync()
+        self._cache.save(STATE_FILE)
+        self._savedVersion = (self._cache.snapshot().version, self._mutations.version())
+        self._snapshot = self._cache.snapshot()
+        self._appliances = self._snapshot.appliances
+        self._config = self._snapshot.config
+        self._controls = None
+        self._lastTime = time.localtime()
+        self._events = queue.Queue()
+        self._displayQueue = queue.Queue()
+        self._lastDisplayUpdate = 0
+        self._cloudWakeup = threading.Event()
+        self._cloudInterval = CLOUD_INTERVAL
+        self._metricsServer = None
+        self._localApi = None
+        self._alarmState = ALARM_OFF
+        self._uploader = SensorUploader(UPLOAD_DATABASE)
+        self._series = SensorSeries()
+        self._archive = SensorArchive(ARCHIVE_DIR)
+        self._rules = ActionRules()
+        self._rules.update(self._snapshot.actions, self._appliances, self._config)
+        self._scheduler = Scheduler(self.startSchedule, self.endSchedule, self.soundAlarm)
+        self._scheduler.load(self._snapshot.schedules, self._snapshot.alarms)
+        self._errorLog = ErrorLog(ERROR_LOG)
+        self._runtime = Runtime(self._errorLog.log)
+        self._runtime.addTask('serial-supervisor', self._serialSupervisorTask, RECONNECT_INTERVAL)
+        for board in range(len(self._controllers)):
+            self._runtime.addTask('serial-input-%d' % board, self._serialInputTask, args=(board,))
+            self._runtime.addTask('serial-output-%d' % board, self._serialOutputTask, args=(board,))
+        self._runtime.addTask('sensor', self._sensorTask, SENSOR_INTERVAL)
+        self._runtime.addTask('cloud', self._cloudTask)
+        self._runtime.addTask('upload', self._uploadTask)
+        self._runtime.addTask('control', self._controlTask)
+        self._runtime.addTask('display', self._displayTask)
 
 
     def run(self):
         """ Method that starts the system.
 
-        Establishes serial connection instance, runs main loop, and handles errors by logging to error file.
+        Runs the system's tasks until the system is shut down - the serial supervisor task connects the boards.
+        Errors are logged to the error file by the task they occur in.
         """
-        while self._serialComm == None:
-            try:  # Try establishing serial connection
-                self._serialComm = SerialComm()
-                time.sleep(5)
-            except Exception as err:
-                time.sleep(10)  # Wait ten seconds before trying to connect to Arduino again
+        self._controllers.trace = self._trace
         self._controls = Controls(self._appliances)
 
-        while self._running:
-            try:
-                if not self._handlingButton:
-                    self.mainLoop()
-            except KeyboardInterrupt:
-                self._running = False
-            except Exception as err:
-                with open("/home/pi/home_automation_system/errorlog.txt", "a") as myfile:
-                    myfile.write(datetime.datetime.today().strftime('%c'))
-                    myfile.write('\n')
-                    myfile.write(str(err))
-                    myfile.write('\n')
-                    myfile.close()
-                time.sleep(5)
+        if METRICS_ENABLED:
+            self._metricsServer = MetricsServer()
+        if LOCAL_API_ENABLED:
+            self._localApi = LocalAPIServer(self.localState, self.localCommand, self._archive.series)
+        self._scheduler.start()
+        self._runtime.start()
+        try:
+            self._runtime.join()
+        except KeyboardInterrupt:
+            self._runtime.stop()
 
         # Script will stop
-        self._serialComm.close()
+        self._scheduler.stop()
+        self._uploader.close()
+        self._archive.close()
+        self._controllers.close()
+        if self._metricsServer is not None:
+            self._metricsServer.close()
+        if self._localApi is not None:
+            self._localApi.close()
+        if self._trace is not None:
+            transport.trace = None
+            self._trace.close()
+        self._errorLog.close()
+
+    def stop(self):
+        """ Method that tells the system to stop - run returns once every task has finished.
+        """
+        self._runtime.stop()
+        self._cloudWakeup.set()
 
     def handleButton(self, channel):
         """ Method that tells the Controls instance of a button press.
+        Presses are queued for the display task, so none are dropped while one is being handled.
 
         Parameter: channel [Int, what button was pressed - constants from dothat/touch.py]
         """
-        if not self._handlingButton:
-            self._handlingButton = True
-            if self._controls is not None:
-                self._controls.handleButton(channel)
-            self._handlingButton = False
+        self._displayQueue.put((DISPLAY_BUTTON, channel))
 
-    def mainLoop(self):
-        """ Main segment of code that runs repeatedly.
+    def localState(self):
+        """ Method called by the LocalAPIServer (on its own threads) for the system's state.
 
-        Runs cloud code to determine if schedules are starting or ending (and update appliance states accordingly).
-        Requests and reads serial data (SerialComm instance).
-        Checks if alarms should go off (Controls instance) or system settings have changed.
-        Can sync Arduino and Raspberry Pi's clocks, or shutdown/reboot pi if instructed to from Parse.
+        Returns: dictionary of the appliances, settings, latest sensor data, alarm status and whether Parse can be reached
         """
-        self._serialComm.readFromSerial()
-        if self._loopCounter == 0: # Request data every 4 iterations of the loop
-            self._serialComm.requestSensorData()
-            self._loopCounter += 1
-        elif self._loopCounter != 3:
-            self._loopCounter += 1
-        else: # self._loopCounter == 3
-            self._loopCounter = 0
-            processScheduling()
-            self._appliances = Appliance.Query.all().order_by('applianceId')
-            self._serialComm.updateAppliances(self._appliances)
-            processAlarms()
-            alarms = Alarm.Query.filter(soundAlarm=True)
-            for alarm in alarms:
-                alarm.soundAlarm = False
-                alarm.save()
-                if not alarm.repeats:
-                    alarm.delete()
-                self._controls.playAlarm()
-                self._serialComm.setDisplayMode(DISPLAY_IGNORE)
-            self._config = Settings.Query.all()[0]
-            newTime = time.localtime()
-            # Detect daylight savings change and update Arduino clock if needed
-            if self._lastTime.tm_isdst != newTime.tm_isdst or self._config.systemFlag == 'updateDateTime':
-                self._serialComm.syncTime()
-                if self._config.systemFlag == 'updateDateTime':
-                    self._config.systemFlag = 'running'
-                    self._config.save()
-            self._lastTime = newTime
-            self._serialComm.syncSettings(self._config)
-            if self._config.systemFlag == 'shutdownPi':
-                self._config.systemFlag = 'running' # When the script runs again, the script knows to run
-                self._config.save()
-                self._running = False
-                os.system('/sbin/shutdown -h now')
-            elif self._config.systemFlag == 'rebootPi':
-                self._config.systemFlag = 'running'  # When the script runs again, the script knows to run
-                self._config.save()
-                self._running = False
-                os.system('/sbin/shutdown -r now')
-            self._controls.update(self._appliances, self._serialComm.getLastSensorData(), self._config)
+        return {
+            'appliances': [objectJSON(appliance, APPLIANCE_FIELDS) for appliance in self._appliances],
+            'settings': objectJSON(self._config, SETTINGS_FIELDS),
+            'sensor': objectJSON(self._controllers.getLastSensorData(), SENSOR_FIELDS),
+            'alarm': self._controls.alarmState() if self._controls is not None else ALARM_OFF,
+            'online': transport.breaker.state() == CLOSED,
+        }
+
+    def localCommand(self, command, params):
+        """ Method called by the LocalAPIServer (on its own threads) with a command - appliance changes are queued
+        for the control task, alarm actions for the display task.
+
+        Parameter: command [String: COMMAND_APPLIANCE or COMMAND_ALARM]
+        Parameter: params  [Dictionary: applianceId and state (0, 1, or missing to toggle), or action (an Alarm action constant)]
+
+        Returns: False if there is no appliance with the applianceId - raises ValueError if the parameters are invalid
+        """
+        if command == COMMAND_APPLIANCE:
+            if params.get('state') not in (0, 1, None):
+                raise ValueError('state must be 0 or 1')
+            if not any(appliance.applianceId == params['applianceId'] for appliance in self._appliances):
+                return False
+            self._events.put((EVENT_LOCAL_APPLIANCE, (params['applianceId'], params.get('state'))))
+        elif command == COMMAND_ALARM:
+            if params.get('action') not in ALARM_ACTIONS:
+                raise ValueError('action must be one of ' + ', '.join(ALARM_ACTIONS))
+            self._displayQueue.put((DISPLAY_ALARM_ACTION, params['action']))
+        return True
+
+    def _publish(self, kind, data):
+        """ Method that sends a change to the local API's WebSocket clients, if the local API is running.
+        """
+        if self._localApi is not None:
+            self._localApi.publish(kind, data)
+
+    def _publishAppliances(self):
+        """ Method that sends the appliance states to the local API's WebSocket clients.
+        """
+        if self._localApi is not None:
+            self._localApi.publish('appliances', [objectJSON(appliance, APPLIANCE_FIELDS) for appliance in self._appliances])
+
+    def startSchedule(self, schedule, dates):
+        """ Method called by the Scheduler when a schedule starts.
+
+        Parameter: schedule [Schedule object that started]
+        Parameter: dates    [List of the schedule's start dates, moved ahead - applied by the control task]
+        """
+        self._events.put((EVENT_SCHEDULE_START, (schedule, dates)))
+
+    def endSchedule(self, schedule, dates):
+        """ Method called by the Scheduler when a schedule ends.
+
+        Parameter: schedule [Schedule object that ended]
+        Parameter: dates    [List of the schedule's end dates, moved ahead - applied by the control task]
+        """
+        self._events.put((EVENT_SCHEDULE_END, (schedule, dates)))
+
+    def soundAlarm(self, alarm, dates):
+        """ Method called by the Scheduler when an alarm goes off.
+
+        Parameter: alarm [Alarm object that went off]
+        Parameter: dates [List of the alarm's dates, moved ahead - applied by the control task]
+        """
+        self._events.put((EVENT_ALARM, (alarm, dates)))
+
+    def _serialSupervisorTask(self):
+        """ Task that connects the boards that are plugged in but not connected, then has the control task send them the system's state.
+        Boards switch to the binary protocol if their sketch supports it.
+        """
+        for board in self._controllers.connect(BINARY_BAUDRATE):
+            self._events.put((EVENT_CONNECTED, board))
+
+    def _serialInputTask(self, board):
+        """ Task that reads serial messages from a board and passes sensor data to the control task.
+        """
+        for sensorData in self._controllers.readFromSerial(board):
+            self._events.put((EVENT_SENSOR, sensorData))
+
+    def _serialOutputTask(self, board):
+        """ Task that writes queued serial messages to a board.
+        """
+        self._controllers.writePending(board)
+
+    def _sensorTask(self):
+        """ Task that asks every board for new sensor data (or to keep pushing it).
+        """
+        with METRICS.timer('request_sensor_data'):
+            self._controllers.requestSensorData(SENSOR_PUSH_INTERVAL, SENSOR_DEADBANDS)
+
+    def _cloudTask(self):
+        """ Task that flushes every change made since the last cycle in one batch, then fetches changes from Parse into the cache.
+        Changes are flushed before the fetch, so changes made on the Pi are not overwritten by older data from Parse.
+        A cycle starts every CLOUD_INTERVAL seconds (backing off to CLOUD_MAX_INTERVAL while nothing changes),
+        or right away after an appliance is changed with the buttons.
+        While the circuit breaker is open, the task waits for it - changes stay in the MutationQueue until Parse is back.
+        """
+        if self._cloudWakeup.wait(self._cloudInterval):
+            self._cloudInterval = CLOUD_INTERVAL
+        self._cloudWakeup.clear()
+        if self._runtime.wait(transport.breaker.delay()):
+            return
+        try:
+            with METRICS.timer('cloud_flush'):
+                self._mutations.flush()
+            with METRICS.timer('cloud_sync'):
+                if self._cache.sync():
+                    self._cloudInterval = CLOUD_INTERVAL
+                else:
+                    self._cloudInterval = min(self._cloudInterval * 2, CLOUD_MAX_INTERVAL)
+        except CircuitOpenError: # Parse went down (or another request is probing it) - not an error of this task
+            return
+        self._events.put((EVENT_CLOUD, self._cache.snapshot()))
+
+    def _uploadTask(self):
+        """ Task that uploads stored sensor data to Parse, waiting between batches (and backing off after errors),
+        and while the circuit breaker is open.
+        """
+        if not self._runtime.wait(max(self._uploader.delay(), transport.breaker.delay())):
+            with METRICS.timer('upload'):
+                try:
+                    self._uploader.upload()
+                except CircuitOpenError: # The data stays on disk until Parse is back
+                    pass
+
+    def _controlTask(self):
+        """ Task that handles events from the other tasks and the Scheduler.
+        """
+        try:
+            event, data = self._events.get(timeout=1)
+        except queue.Empty:
+            return
+        with METRICS.timer(CONTROL_PHASES[event]):
+            if event == EVENT_SENSOR:
+                self.handleSensorData(data)
+            elif event == EVENT_SCHEDULE_START: # The Scheduler's new dates are applied here, through the MutationQueue
+                schedule, dates = data
+                self._setApplianceState(schedule.appliance, 1)
+                self._mutations.update(schedule, start=dates)
+            elif event == EVENT_SCHEDULE_END: # One-time schedules are deleted when they end
+                schedule, dates = data
+                self._setApplianceState(schedule.appliance, 0)
+                if schedule.recurring:
+                    self._mutations.update(schedule, end=dates)
+                else:
+                    self._mutations.delete(schedule)
+            elif event == EVENT_ALARM: # Alarms that don't repeat are deleted once they go off
+                alarm, dates = data
+                self._displayQueue.put((DISPLAY_ALARM, None))
+                self._controllers.setDisplayMode(DISPLAY_IGNORE)
+                if alarm.repeats:
+                    self._mutations.update(alarm, when=dates)
+                else:
+                    self._mutations.delete(alarm)
+            elif event == EVENT_CLOUD:
+                self.applyCloudState(data)
+            elif event == EVENT_APPLIANCES:
+                self._switchAppliance(data, None)
+            elif event == EVENT_LOCAL_APPLIANCE: # Like a button press - without a state, the appliance is toggled
+                self._switchAppliance(*data)
+            elif event == EVENT_CONNECTED:
+                self._controllers.resync(data, self._appliances, self._config)
+        self._saveState()
+
+    def _saveState(self):
+        """ Method that writes the cache and the changes waiting to be flushed to STATE_FILE, if either changed since
+        it was last written - so changes made on the Pi (buttons, the local API, schedules and alarms) survive a restart
+        even if Parse is unreachable.  Only the control task writes the file.
+        """
+        version = (self._cache.snapshot().version, self._mutations.version())
+        if version != self._savedVersion:
+            with METRICS.timer('save_state'):
+                self._cache.save(STATE_FILE)
+            self._savedVersion = version
+
+    def _displayTask(self):
+        """ Task that handles button presses and alarms on the Display-o-Tron HAT and keeps the LCD up to date.
+        """
+        try:
+            command, data = self._displayQueue.get(timeout=DISPLAY_INTERVAL)
+        except queue.Empty:
+            command = None
+        if command == DISPLAY_BUTTON: # The select button's appliance is toggled by the control task, which owns the appliances
+            applianceId = self._controls.handleButton(data)
+            if applianceId is not None:
+                self._events.put((EVENT_APPLIANCES, applianceId))
+        elif command == DISPLAY_ALARM:
+            self._controls.playAlarm()
+        elif command == DISPLAY_ALARM_ACTION:
+            self._controls.alarmAction(data)
+        if command is not None or time.time() - self._lastDisplayUpdate >= DISPLAY_REFRESH:
+            with METRICS.timer('controls_update'):
+                self._controls.update(self._appliances, self._controllers.getLastSensorData(), self._config,
+                                      transport.breaker.state() == CLOSED)
+            self._lastDisplayUpdate = time.time()
         if self._controls.checkAlarmFinished():
-            self._serialComm.setDisplayMode(DISPLAY_CLEAR_WHEN_DARK)
+            self._controllers.setDisplayMode(DISPLAY_CLEAR_WHEN_DARK)
         if self._controls.checkForceDisplayOn():
-            self._serialComm.setDisplayMode(DISPLAY_IGNORE)
+            self._controllers.setDisplayMode(DISPLAY_IGNORE)
         elif self._controls.checkForceDisplayOff():
-            self._serialComm.setDisplayMode(DISPLAY_CLEAR_WHEN_DARK)
\ No newline at end of file
+            self._controllers.setDisplayMode(DISPLAY_CLEAR_WHEN_DARK)
+        if self._controls.alarmState() != self._alarmState:
+            self._alarmState = self._controls.alarmState()
+            self._publish('alarm', self._alarmState)
+
+    def _switchAppliance(self, applianceId, state):
+        """ Method that turns an appliance on or off for the select button or the local API.
+        The appliance is found in the current _appliances, so a change from Parse that just replaced them is not undone.
+        The new state goes to the Arduino now, and to Parse on the cloud task.
+
+        Parameter: applianceId [Int: the appliance's applianceId]
+        Parameter: state       [Int: 1 for on, 0 for off, or None to toggle - disabled appliances are always turned off]
+        """
+        for appliance in self._appliances:
+            if appliance.applianceId == applianceId:
+                if state is None:
+                    state = 0 if appliance.state == 1 else 1
+                self._mutations.update(appliance, state=state if appliance.enabled else 0)
+        self._controllers.updateAppliances(self._appliances)
+        self._cloudWakeup.set()
+        self._publishAppliances()
+        self._displayQueue.put((DISPLAY_REDRAW, None))
+
+    def _setApplianceState(self, pointer, state):
+        """ Method that changes an appliance's state, tells its board, then records the change to be saved to Parse.
+
+        Parameter: pointer [Appliance pointer (from a Schedule or Action)]
+        Parameter: state   [Int: 1 for on, 0 for off]
+        """
+        for appliance in self._appliances:
+            if appliance.objectId == pointer.objectId:
+                self._mutations.update(appliance, state=state)
+                self._controllers.updateAppliances(self._appliances)
+                self._publishAppliances()
+
+    def handleSensorData(self, sensorData):
+        """ Method that runs the actions whose criteria are met by new sensor data, then adds the data to the SensorSeries
+        and the SensorArchive, and stores it (or its rollups, depending on UPLOAD_MODE) to be uploaded to Parse.
+        The Arduino is told of new appliance states before anything is saved to Parse.
+
+        Parameter: sensorData [SensorData object from SerialComm]
+        """
+        now = time.time()
+        for appliance, state in self._rules.evaluate(sensorData, now):
+            self._setApplianceState(appliance, state)
+        self._publish('sensor', objectJSON(sensorData, SENSOR_FIELDS))
+        rollups, switched = self._series.append(now, sensorData)
+        self._archive.append(now, sensorData)
+        for rollup in rollups:
+            self._archive.appendRollup(rollup)
+        if UPLOAD_MODE == UPLOAD_RAW or switched:
+            self._uploader.enqueue(sensorData, now)
+        if UPLOAD_MODE == UPLOAD_ROLLUPS:
+            for rollup in rollups:
+                self._uploader.enqueueRollup(rollup)
+
+    def applyCloudState(self, snapshot):
+        """ Method that applies the latest state fetched from Parse.
+
+        If the snapshot changed, sends the appliance states to the Arduino and reloads the actions and the Scheduler.
+        Checks if system settings have changed.
+        Can sync Arduino and Raspberry Pi's clocks, or shutdown/reboot pi if instructed to from Parse.
+
+        Parameter: snapshot [Snapshot of the ObjectCache]
+        """
+        if snapshot is not self._snapshot:
+            self._snapshot = snapshot
+            self._appliances = snapshot.appliances
+            self._config = snapshot.config
+            self._controllers.updateAppliances(self._appliances)
+            self._scheduler.load(snapshot.schedules, snapshot.alarms)
+            self._rules.update(snapshot.actions, self._appliances, self._config)
+            self._publishAppliances()
+            self._publish('settings', objectJSON(self._config, SETTINGS_FIELDS))
+        newTime = time.localtime()
+        # Detect daylight savings change and update Arduino clock if needed
+        if self._lastTime.tm_isdst != newTime.tm_isdst or self._config.systemFlag == 'updateDateTime':
+            self._controllers.syncTime()
+            if self._config.systemFlag == 'updateDateTime':
+                self._mutations.update(self._config, systemFlag='running')
+        self._lastTime = newTime
+        with METRICS.timer('sync_settings'):
+            self._controllers.syncSettings(self._config)
+        if self._config.systemFlag == 'shutdownPi':
+            self._mutations.update(self._config, systemFlag='running') # When the script runs again, the script knows to run
+            self._mutations.flush()
+            self._runtime.stop()
+            os.system('/sbin/shutdown -h now')
+        elif self._config.systemFlag == 'rebootPi':
+            self._mutations.update(self._config, systemFlag='running')  # When the script runs again, the script knows to run
+            self._mutations.flush()
+            self._runtime.stop()
+            os.system('/sbin/shutdown -r now')
@@ -0,0 +1,443 @@
+# localapi.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" localapi module for Internet of Pi
+
+    This module provides the class LocalAPIServer, which serves the system's state over HTTP (JSON) and WebSocket on
+    the home network, so an app on the same network can control the appliances without going through Parse.
+
+    HTTP (every response is JSON):
+     - GET  /api/state                    the appliances, settings, latest sensor data, alarm status and whether Parse is online
+     - GET  /api/appliances, /api/settings, /api/sensor    one part of the state
+     - GET  /api/history?start=&end=&period=   minimum, maximum and mean sensor values over each period (in seconds, 3600
+                                          by default) from start to end (times in seconds since 1970, the last day by default)
+     - POST /api/appliances/<applianceId> {"state": 0 or 1} turns an appliance off or on (without "state", toggles it)
+     - POST /api/alarm                    {"action": "stop", "silence" or "unsilence"} controls the alarm
+    Commands are handed straight to the system's tasks (the appliance's board is told right away, Parse is updated
+    afterwards), and are answered with 202 Accepted.
+
+    WebSocket (GET /api/events): the whole state is sent when the client connects, then a message whenever part of it
+    changes - {"type": "appliances", "settings", "sensor" or "alarm", "data": ...}.  Clients can also send commands
+    as {"type": "appliance", "applianceId": 0, "state": 1} or {"type": "alarm", "action": "stop"}.
+
+    If LOCAL_API_TOKEN is set, every request must include it (an "Authorization: Bearer <token>" header, or
+    ?token=<token> for WebSocket clients that can't set headers).  By default the server only listens on the Pi itself
+    (LOCAL_API_ADDRESS); to serve the home network, set LOCAL_API_ADDRESS to '' (or the Pi's address) and set
+    LOCAL_API_TOKEN - the server refuses to start on any other address without a token.
+
+"""
+
+import base64, hashlib, json, re, socket, struct, threading, time
+from metrics import *
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler # Python 2
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+    import Queue as queue
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+    import queue
+
+LOCAL_API_ADDRESS = '127.0.0.1' # Address LocalAPIServer listens on - '' for every interface (requires LOCAL_API_TOKEN)
+LOCAL_API_PORT = 8080   # Port LocalAPIServer listens on
+LOCAL_API_TOKEN = None  # Token every request must include, or None to allow any client (only on a loopback address)
+MAX_BODY = 4096         # Largest request body (or WebSocket message) accepted, in bytes
+MAX_HISTORY_POINTS = 10000 # Most periods /api/history returns
+CLIENT_QUEUE_SIZE = 64  # Messages waiting to be sent to a WebSocket client - a client that falls this far behind is disconnected
+
+# Commands passed to the command function
+COMMAND_APPLIANCE = 'appliance'
+COMMAND_ALARM = 'alarm'
+
+# Fields of the Parse objects included in the state
+APPLIANCE_FIELDS = ('objectId', 'applianceId', 'name', 'state', 'enabled')
+SETTINGS_FIELDS = ('useFahrenheit', 'use12HourFormat', 'lightThreshold', 'temperatureThreshold', 'humidityThreshold', 'systemFlag')
+SENSOR_FIELDS = ('temperature', 'humidity', 'light', 'reedSwitch', 'footSwitch')
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11' # From RFC 6455
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+LOCAL_API_REQUESTS = METRICS.counter('local_api_requests_total', 'HTTP requests and WebSocket commands handled by the local API')
+LOCAL_API_DISCONNECTS = METRICS.counter('local_api_slow_clients_total', 'WebSocket clients disconnected for falling behind')
+
+def objectJSON(obj, fields):
+    """ Function that returns the fields of a Parse object (or SensorData) as a dictionary, or None if obj is None.
+
+    Parameter: obj    [Parse object]
+    Parameter: fields [Tuple of Strings: names of the fields to include]
+    """
+    if obj is None:
+        return None
+    return dict((name, getattr(obj, name, None)) for name in fields)
+
+def encodeFrame(payload, opcode=OP_TEXT):
+    """ Function that builds a WebSocket frame sent by the server (final, not masked).
+
+    Parameter: payload [bytes: the frame's data]
+    Parameter: opcode  [Int: OP_TEXT, OP_CLOSE, OP_PONG, ...]
+    """
+    header = bytearray([0x80 | opcode])
+    if len(payload) < 126:
+        header.append(len(payload))
+    elif len(payload) < 65536:
+        header.append(126)
+        header.extend(struct.pack('>H', len(payload)))
+    else:
+        header.append(127)
+        header.extend(struct.pack('>Q', len(payload)))
+    return bytes(header) + payload
+
+def readFrame(rfile):
+    """ Function that reads a WebSocket frame sent by a client (clients always mask their frames).
+
+    Parameter: rfile [file object of the connection]
+
+    Returns: (opcode, payload) tuple, or None if the connection closed or the frame is too large
+    """
+    header = bytearray(rfile.read(2))
+    if len(header) < 2:
+        return None
+    opcode = header[0] & 0x0F
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', rfile.read(8))[0]
+    if length > MAX_BODY:
+        return None
+    mask = bytearray(rfile.read(4)) if header[1] & 0x80 else bytearray(4)
+    payload = bytearray(rfile.read(length))
+    if len(payload) < length:
+        return None
+    for index in range(length):
+        payload[index] ^= mask[index % 4]
+    return opcode, bytes(payload)
+
+def _isLoopback(address):
+    """ Function that returns True if an address only accepts connections from the Pi itself.
+    """
+    return address == 'localhost' or address == '::1' or address.startswith('127.')
+
+class LocalAPIServer:
+    """ Instance serves the system's state and takes its commands over HTTP and WebSocket, on its own threads
+
+    Instance Attributes:
+
+        _state      [Function that returns the system's state as a dictionary]
+        _command    [Function(command, params) that hands a command to the system - returns False if its target doesn't exist
+                     and raises ValueError if its parameters are invalid]
+        _history    [Function(start, end, period) that returns a downsampled series of the sensor data, or None]
+        _token      [String: token every request must include, or None]
+        _clients    [List of _Client instances: the connected WebSocket clients]
+        _lock       [threading.Lock: guards _clients]
+        _server     [HTTPServer instance]
+        _thread     [threading.Thread running the server]
+    """
+    def __init__(self, state, command, history=None, address=LOCAL_API_ADDRESS, port=LOCAL_API_PORT, token=LOCAL_API_TOKEN):
+        """ Initializes a new LocalAPIServer and starts listening.
+        Raises ValueError without a token unless address is a loopback address, so the API is never open to the network.
+
+        Parameter: state   [Function that returns the system's state (see HomeAutomationSystem.localState)]
+        Parameter: command [Function(command, params) that hands a command to the system (see HomeAutomationSystem.localCommand)]
+        Parameter: history [Function(start, end, period) that returns a downsampled series (see SensorArchive.series), or None]
+        Parameter: address [String: address to listen on ('' for every interface, which requires a token)]
+        Parameter: port    [Int: port to listen on]
+        Parameter: token   [String: token every request must include, or None]
+        """
+        if not token and not _isLoopback(address):
+            raise ValueError('LOCAL_API_TOKEN must be set to serve the local API on %s' % (address or 'every interface'))
+        self._state = state
+        self._command = command
+        self._history = history
+        self._token = token
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer((address, port), _Handler)
+        self._server.api = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='local-api')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def publish(self, kind, data):
+        """ Method that sends a change to every WebSocket client.  It doesn't wait for the clients - each has its own
+        queue and thread, and a client whose queue is full is disconnected.
+
+        Parameter: kind [String: 'appliances', 'settings', 'sensor' or 'alarm']
+        Parameter: data [JSON-serializable data of the part of the state that changed]
+        """
+        with self._lock:
+            clients = list(self._clients)
+        if len(clients) == 0:
+            return
+        message = json.dumps({'type': kind, 'data': data}).encode('utf-8')
+        for client in clients:
+            if not client.send(message):
+                LOCAL_API_DISCONNECTS.inc()
+                client.close()
+
+    def close(self):
+        """ Method that stops the server and disconnects every WebSocket client.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.close()
+
+    def _authorized(self, handler, query):
+        """ Method that checks a request's token.
+        """
+        if self._token is None:
+            return True
+        return (handler.headers.get('Authorization') == 'Bearer ' + self._token or
+                query.get('token', [None])[0] == self._token)
+
+    def _addClient(self, client):
+        """ Method that adds a WebSocket client that changes are published to.
+        """
+        with self._lock:
+            self._clients.append(client)
+
+    def _removeClient(self, client):
+        """ Method that removes a WebSocket client once its connection closed.
+        """
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """ Instance is an HTTPServer that handles each connection on its own thread
+    """
+    daemon_threads = True
+
+class _Client:
+    """ Instance sends queued messages to one WebSocket client on its own thread
+
+    Instance Attributes:
+
+        _connection [socket of the client's connection]
+        _wfile    [file object the frames are written to]
+        _queue    [Queue of frames (bytes) to send, or None to stop]
+        _lock     [threading.Lock: frames are written by this thread and the client's handler (pongs, close)]
+        _closed   [threading.Event: set once the connection should close]
+        _thread   [threading.Thread that writes the queued frames]
+    """
+    def __init__(self, connection, wfile):
+        """ Initializes a new _Client and starts its thread.
+
+        Parameter: connection [socket of the client's connection]
+        Parameter: wfile      [file object of the connection to write frames to]
+        """
+        self._connection = connection
+        self._wfile = wfile
+        self._queue = queue.Queue(CLIENT_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._write, name='local-api-client')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send(self, message):
+        """ Method that queues a text message.
+
+        Returns: False if the client's queue is full
+        """
+        try:
+            self._queue.put_nowait(encodeFrame(message))
+        except queue.Full:
+            return False
+        return True
+
+    def sendNow(self, frame):
+        """ Method that writes a frame right away (from the client's handler thread).
+        """
+        with self._lock:
+            self._wfile.write(frame)
+            self._wfile.flush()
+
+    def close(self):
+        """ Method that tells the client's thread to close the connection (right away if messages are still waiting),
+        which also ends the handler's read.
+        """
+        if not self._closed.is_set():
+            self._closed.set()
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                self._shutdown()
+
+    def join(self, timeout):
+        """ Method that waits for the client's thread to finish (and send the close frame).
+        """
+        self._thread.join(timeout)
+
+    def _shutdown(self):
+        """ Method that shuts the connection's socket down.
+        """
+        try:
+            self._connection.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+
+    def _write(self):
+        """ Method run on the client's thread - writes each queued frame.
+        """
+        while not self._closed.is_set():
+            frame = self._queue.get()
+            if frame is None:
+                break
+            try:
+                self.sendNow(frame)
+            except (IOError, OSError):
+                break
+        self._closed.set()
+        try:
+            self.sendNow(encodeFrame(b'', OP_CLOSE))
+        except (IOError, OSError):
+            pass
+        self._shutdown()
+
+class _Handler(BaseHTTPRequestHandler):
+    """ Instance handles one HTTP request (or WebSocket connection) to the LocalAPIServer in self.server.api
+    """
+    protocol_version = 'HTTP/1.1' # Keep-alive, so a client's commands don't each open a connection
+    disable_nagle_algorithm = True # Headers and body are written separately - don't hold the body back for an ACK
+
+    def do_GET(self):
+        api = self.server.api
+        url = urlparse(self.path)
+        if not api._authorized(self, parse_qs(url.query)):
+            self._reply(401, {'error': 'Unauthorized'})
+            return
+        LOCAL_API_REQUESTS.inc()
+        if url.path == '/api/events' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self._webSocket(api)
+            return
+        if url.path == '/api/state':
+            self._reply(200, api._state())
+        elif url.path in ('/api/appliances', '/api/settings', '/api/sensor'):
+            self._reply(200, api._state()[url.path[len('/api/'):]])
+        elif url.path == '/api/history' and api._history is not None:
+            self._historyReply(api, parse_qs(url.query))
+        else:
+            self._reply(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        api = self.server.api
+        url = urlparse(self.path)
+        if not api._authorized(self, parse_qs(url.query)):
+            self._reply(401, {'error': 'Unauthorized'})
+            return
+        LOCAL_API_REQUESTS.inc()
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            self._reply(413, {'error': 'Request body too large'})
+            return
+        try:
+            params = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+            if not isinstance(params, dict):
+                raise ValueError('The body must be a JSON object')
+            match = re.match(r'^/api/appliances/(\d+)$', url.path)
+            if match is not None:
+                params['applianceId'] = int(match.group(1))
+                accepted = api._command(COMMAND_APPLIANCE, params)
+            elif url.path == '/api/alarm':
+                accepted = api._command(COMMAND_ALARM, params)
+            else:
+                self._reply(404, {'error': 'Not found'})
+                return
+        except ValueError as err:
+            self._reply(400, {'error': str(err)})
+            return
+        if accepted:
+            self._reply(202, params)
+        else:
+            self._reply(404, {'error': 'Not found'})
+
+    def _historyReply(self, api, query):
+        """ Method that sends a downsampled series of the sensor data (see SensorArchive.series).
+        """
+        try:
+            end = float(query.get('end', [time.time()])[0])
+            start = float(query.get('start', [end - 86400])[0])
+            period = int(query.get('period', [3600])[0])
+            if period <= 0 or end < start:
+                raise ValueError('period must be positive, and start before end')
+            if (end - start) / period > MAX_HISTORY_POINTS:
+                raise ValueError('Too many periods - use a longer period or a shorter range')
+        except ValueError as err:
+            self._reply(400, {'error': str(err)})
+            return
+        series = api._history(start, end, period)
+        self._reply(200, dict((name, values.tolist()) for name, values in series.items()))
+
+    def _reply(self, status, data):
+        """ Method that sends a JSON response.
+        """
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _webSocket(self, api):
+        """ Method that accepts a WebSocket connection, sends the state, then handles the client's frames until it closes.
+        Changes are sent by the client's own thread (see LocalAPIServer.publish).
+        """
+        key = self.headers.get('Sec-WebSocket-Key')
+        if key is None:
+            self._reply(400, {'error': 'Missing Sec-WebSocket-Key'})
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        client = _Client(self.connection, self.wfile)
+        client.send(json.dumps({'type': 'state', 'data': api._state()}).encode('utf-8'))
+        api._addClient(client)
+        try:
+            while True:
+                frame = readFrame(self.rfile)
+                if frame is None or frame[0] == OP_CLOSE:
+                    break
+                if frame[0] == OP_PING:
+                    client.sendNow(encodeFrame(frame[1], OP_PONG))
+                elif frame[0] == OP_TEXT:
+                    self._webSocketCommand(api, client, frame[1])
+        except (IOError, OSError, struct.error):
+            pass
+        finally:
+            api._removeClient(client)
+            client.close()
+            client.join(1)
+
+    def _webSocketCommand(self, api, client, payload):
+        """ Method that hands a command sent over a WebSocket to the system - errors are sent back to the client.
+        """
+        LOCAL_API_REQUESTS.inc()
+        try:
+            params = json.loads(payload.decode('utf-8'))
+            if not isinstance(params, dict) or params.get('type') not in (COMMAND_APPLIANCE, COMMAND_ALARM):
+                raise ValueError('Unknown command')
+            if params['type'] == COMMAND_APPLIANCE:
+                params['applianceId'] = int(params.get('applianceId'))
+            if not api._command(params.pop('type'), params):
+                raise ValueError('Not found')
+        except (ValueError, TypeError) as err:
+            client.send(json.dumps({'type': 'error', 'data': str(err)}).encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass # Requests are not logged
@@ -0,0 +1,272 @@
+# metrics.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" metrics module for Internet of Pi
+
+    This module provides the class Histogram, which counts how many measurements (e.g. request latencies in seconds)
+    fall into each of a fixed set of buckets, and the class Counter.
+
+    Histograms and counters are kept in a Registry (the module's METRICS instance is shared by the whole system),
+    which times each phase of the system's work and can be served over HTTP in the Prometheus text format by MetricsServer.
+    By default MetricsServer only listens on the Pi itself (METRICS_ADDRESS).
+
+"""
+
+import threading, time
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler # Python 2
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10) # Upper bounds, in seconds
+PHASE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5) # Upper bounds for phases of the system's work
+
+METRICS_ADDRESS = '127.0.0.1' # Address MetricsServer listens on - '' for every interface
+METRICS_PORT = 9100 # Port MetricsServer listens on
+
+class Histogram:
+    """ Instance is a histogram of measurements with fixed bucket bounds
+
+    Instance Attributes:
+
+        buckets   [Tuple of Numbers: the upper bound of each bucket, in increasing order]
+        _counts   [List of Ints: number of measurements in each bucket, plus one for measurements above the last bound]
+        _sum      [Number: total of every measurement]
+        _count    [Int: number of measurements]
+        _lock     [threading.Lock: measurements can come from several tasks]
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """ Initializes a new, empty Histogram.
+
+        Parameter: buckets [Tuple of Numbers: upper bounds of the buckets]
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """ Method that adds a measurement to the histogram.
+        """
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def values(self):
+        """ Method that returns the histogram's current values.
+
+        Returns: (counts, sum, count) - counts is a list with the number of measurements in each bucket
+        """
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def quantile(self, q):
+        """ Method that estimates a quantile (e.g. 0.95) as the upper bound of the bucket it falls in.
+
+        Returns: Number, or None if there are no measurements (or the quantile is above the last bound)
+        """
+        counts, total, count = self.values()
+        if count == 0:
+            return None
+        seen = 0
+        for index in range(len(self.buckets)):
+            seen += counts[index]
+            if seen >= q * count:
+                return self.buckets[index]
+        return None
+
+class Counter:
+    """ Instance is a count that only goes up (e.g. serial messages received)
+
+    Instance Attributes:
+
+        _value   [Number: the count]
+        _lock    [threading.Lock: counts can come from several tasks]
+    """
+    def __init__(self):
+        """ Initializes a new Counter at zero.
+        """
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """ Method that adds amount to the count.
+        """
+        with self._lock:
+            self._value += amount
+
+    def value(self):
+        """ Method that returns the count.
+        """
+        return self._value
+
+class _Timer:
+    """ Instance times a with block and adds the time to a Histogram
+    """
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.time()
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.time() - self._start)
+
+class _NullTimer:
+    """ Instance is used in place of a _Timer when the Registry is disabled - it does nothing
+    """
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_TIMER = _NullTimer()
+
+def _labelString(labels):
+    """ Function that formats a tuple of (name, value) labels for the Prometheus text format, e.g. '{phase="cloud_sync"}'.
+    """
+    if len(labels) == 0:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in labels) + '}'
+
+class Registry:
+    """ Instance holds the system's counters and histograms, each identified by a name and labels
+
+    Instance Attributes:
+
+        enabled     [Boolean: when False, timer does not time anything (counters still count)]
+        _metrics    [Dictionary: name -> (type, help, dictionary of labels tuple -> Counter or Histogram)]
+        _order      [List of names, in the order they were first used]
+        _lock       [threading.Lock: metrics can be created by several tasks]
+    """
+    def __init__(self, enabled=True):
+        """ Initializes a new, empty Registry.
+        """
+        self.enabled = enabled
+        self._metrics = {}
+        self._order = []
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help, labels, create):
+        """ Method that returns the metric with a name and labels, creating it with create() if needed.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = (kind, help, {})
+                self._order.append(name)
+            series = self._metrics[name][2]
+            if key not in series:
+                series[key] = create()
+            return series[key]
+
+    def counter(self, name, help, labels={}):
+        """ Method that returns the Counter with a name and labels, creating it if needed.
+
+        Parameter: name   [String: metric name, e.g. 'serial_frames_received_total']
+        Parameter: help   [String: description of the metric]
+        Parameter: labels [Dictionary: label name -> value]
+        """
+        return self._get('counter', name, help, labels, Counter)
+
+    def histogram(self, name, help, labels={}, buckets=LATENCY_BUCKETS):
+        """ Method that returns the Histogram with a name and labels, creating it if needed.
+
+        Parameter: name    [String: metric name, e.g. 'phase_seconds']
+        Parameter: help    [String: description of the metric]
+        Parameter: labels  [Dictionary: label name -> value]
+        Parameter: buckets [Tuple of Numbers: upper bounds of the buckets, used if the histogram is created]
+        """
+        return self._get('histogram', name, help, labels, lambda: Histogram(buckets))
+
+    def series(self, name):
+        """ Method that returns every metric with a name.
+
+        Returns: dictionary of labels (a tuple of (name, value) tuples) -> Counter or Histogram
+        """
+        with self._lock:
+            if name not in self._metrics:
+                return {}
+            return dict(self._metrics[name][2])
+
+    def timer(self, phase):
+        """ Method that returns a context manager that adds the time its with block takes to the phase_seconds histogram.
+
+        Parameter: phase [String: name of the phase, e.g. 'cloud_sync']
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self.histogram('phase_seconds', 'Time spent in each phase of the system\'s work', {'phase': phase}, PHASE_BUCKETS))
+
+    def render(self):
+        """ Method that returns every metric in the Prometheus text format.
+        """
+        with self._lock:
+            metrics = [(name, self._metrics[name][0], self._metrics[name][1], list(self._metrics[name][2].items())) for name in self._order]
+        lines = []
+        for name, kind, help, series in metrics:
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for labels, metric in sorted(series, key=lambda item: item[0]):
+                if kind == 'counter':
+                    lines.append('%s%s %s' % (name, _labelString(labels), repr(metric.value())))
+                    continue
+                counts, total, count = metric.values()
+                cumulative = 0
+                for index in range(len(metric.buckets)):
+                    cumulative += counts[index]
+                    lines.append('%s_bucket%s %d' % (name, _labelString(labels + (('le', repr(metric.buckets[index])),)), cumulative))
+                lines.append('%s_bucket%s %d' % (name, _labelString(labels + (('le', '+Inf'),)), count))
+                lines.append('%s_sum%s %s' % (name, _labelString(labels), repr(total)))
+                lines.append('%s_count%s %d' % (name, _labelString(labels), count))
+        return '\n'.join(lines) + '\n'
+
+METRICS = Registry() # Shared by the whole system
+
+class MetricsServer:
+    """ Instance serves a Registry at /metrics over HTTP, on its own thread
+
+    Instance Attributes:
+
+        _server   [HTTPServer instance]
+        _thread   [threading.Thread running the server]
+    """
+    def __init__(self, registry=METRICS, address=METRICS_ADDRESS, port=METRICS_PORT):
+        """ Initializes a new MetricsServer and starts listening.
+
+        Parameter: registry [Registry to serve]
+        Parameter: address  [String: address to listen on (the Pi itself by default, '' for every interface)]
+        Parameter: port     [Int: port to listen on]
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Scrapes are not logged
+
+        self._server = HTTPServer((address, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """ Method that stops the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,238 @@
+# mutations.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" mutations module for Internet of Pi
+
+    This module provides the class MutationQueue, which collects the changes the system makes to Parse objects
+    (creates, updates and deletes) and sends them to Parse together with ParseBatcher.
+
+    update changes the cached objects that every task reads from Snapshots, so only the system's control task calls it
+    (other tasks hand their changes to the control task) - each object has a single writer.
+
+    Only the fields that changed are sent, and repeated changes to the same object are merged, so handling several
+    alarms or appliance changes in one cycle costs one batch request instead of one request per save or delete.
+
+    The pending changes can be written to the state file with the cached objects (see toJSON and restore), so changes
+    made while Parse was unreachable are still sent after the system restarts.
+
+"""
+
+import threading
+
+from parse_rest.connection import ParseBatcher
+from parse_rest.core import ParseBatchError
+from parse_rest.datatypes import ParseType
+
+BATCH_SIZE = 50 # Most requests that Parse allows in one batch
+
+# Kinds of mutations
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+
+def _updateMethod(obj, fields):
+    """ Function that returns a method for ParseBatcher.batch that saves only the given fields of an object.
+    """
+    def method(batch=True):
+        body = dict((name, ParseType.convert_to_parse(value)) for name, value in fields.items())
+        request = obj.__class__.PUT(obj._absolute_url, batch=True, **body)
+        def callback(response):
+            obj.updatedAt = response['updatedAt']
+        return request, callback
+    return method
+
+class MutationQueue:
+    """ Instance is the system's unit of work for Parse - changes are recorded here and flushed in batches
+
+    Instance Attributes:
+
+        _pending   [Dictionary: key -> [kind, object, fields], where key is the objectId (or id() for new objects)
+                    and fields is a dictionary of changed field names -> values for updates]
+        _order     [List of keys in _pending, in the order they were first changed]
+        _lock      [threading.Lock: changes are recorded by the control task while the cloud task flushes them]
+        _version   [Int: incremented every time the pending changes change]
+        _batcher   [ParseBatcher instance]
+    """
+    def __init__(self):
+        """ Initializes a new, empty MutationQueue.
+        """
+        self._pending = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._version = 0
+        self._batcher = ParseBatcher()
+
+    def _key(self, obj):
+        """ Method that returns the key an object's changes are stored under.
+        """
+        return getattr(obj, 'objectId', None) or id(obj)
+
+    def create(self, obj):
+        """ Method that records a new object to be saved to Parse.
+
+        Parameter: obj [Parse object without an objectId]
+        """
+        with self._lock:
+            key = self._key(obj)
+            if key not in self._pending:
+                self._order.append(key)
+            self._pending[key] = [CREATE, obj, None]
+            self._version += 1
+
+    def update(self, obj, **fields):
+        """ Method that changes fields of an object right away and records them to be saved to Parse.
+        Changes to an object that already has pending changes are merged with them.
+        Must only be called from the control task (or before the tasks start), which owns the cached objects.
+
+        Parameter: obj    [Parse object]
+        Parameter: fields [Field names and their new values]
+        """
+        with self._lock:
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            key = self._key(obj)
+            if key not in self._pending:
+                self._order.append(key)
+                self._pending[key] = [UPDATE, obj, dict(fields)]
+            elif self._pending[key][0] == UPDATE:
+                self._pending[key][2].update(fields)
+            # A pending create (or delete) already covers the new values
+            self._version += 1
+
+    def delete(self, obj):
+        """ Method that records an object to be deleted from Parse, replacing any pending changes to it.
+
+        Parameter: obj [Parse object]
+        """
+        with self._lock:
+            key = self._key(obj)
+            self._version += 1
+            if key in self._pending and self._pending[key][0] == CREATE: # The object never reached Parse
+                del self._pending[key]
+                self._order.remove(key)
+                return
+            if key not in self._pending:
+                self._order.append(key)
+            self._pending[key] = [DELETE, obj, None]
+
+    def applyTo(self, obj):
+        """ Method that applies pending changes to a copy of an object that was just fetched from Parse,
+        so older data from Parse does not undo changes that have not been flushed yet.
+
+        Parameter: obj [Parse object fetched from Parse]
+
+        Returns: False if the object is waiting to be deleted, True otherwise
+        """
+        with self._lock:
+            mutation = self._pending.get(self._key(obj))
+            if mutation is None:
+                return True
+            if mutation[0] == DELETE:
+                return False
+            for name, value in (mutation[2] or {}).items():
+                setattr(obj, name, value)
+            return True
+
+    def pending(self):
+        """ Method that returns the number of objects with changes waiting to be flushed.
+        """
+        with self._lock:
+            return len(self._order)
+
+    def version(self):
+        """ Method that returns a number that changes every time a change is recorded, flushed or put back after a failed flush.
+        """
+        with self._lock:
+            return self._version
+
+    def toJSON(self):
+        """ Method that returns the pending changes in a form that can be written to the state file.
+        Values are converted the way Parse returns them (objects become Pointers).
+
+        Returns: list of [kind, class name, objectId, fields] lists, in the order the changes were made - fields are
+                 the changed fields for updates, every field for creates, and None for deletes
+        """
+        changes = []
+        with self._lock:
+            for key in self._order:
+                kind, obj, fields = self._pending[key]
+                if kind == CREATE:
+                    fields = obj._editable_attrs
+                if fields is not None:
+                    fields = dict((name, ParseType.convert_to_parse(value, as_pointer=True)) for name, value in fields.items())
+                changes.append([kind, obj.__class__.__name__, getattr(obj, 'objectId', None), fields])
+        return changes
+
+    def restore(self, changes, find):
+        """ Method that records the changes returned by toJSON again, e.g. after they were loaded from the state file.
+
+        Parameter: changes [List of [kind, class name, objectId, fields] lists from toJSON]
+        Parameter: find    [Function(class name, objectId, fields) that returns the object a change is for - for creates,
+                            a new object with the given fields]
+        """
+        for kind, className, objectId, fields in changes:
+            obj = find(className, objectId, fields)
+            if obj is None:
+                continue
+            if kind == CREATE:
+                self.create(obj)
+            elif kind == UPDATE:
+                self.update(obj, **dict((name, ParseType.convert_from_parse(name, value)) for name, value in fields.items()))
+            else:
+                self.delete(obj)
+
+    def flush(self):
+        """ Method that sends every pending change to Parse, BATCH_SIZE changes per request.
+        If a request fails, the changes that were not sent are kept so they can be flushed again, and the error is raised.
+        Changes that Parse rejects (a ParseBatchError) are not retried.
+        """
+        with self._lock:
+            mutations = [self._pending[key] for key in self._order]
+            self._pending = {}
+            self._order = []
+            if len(mutations) > 0:
+                self._version += 1
+        for start in range(0, len(mutations), BATCH_SIZE):
+            methods = []
+            for kind, obj, fields in mutations[start:start + BATCH_SIZE]:
+                if kind == CREATE:
+                    methods.append(obj.save)
+                elif kind == UPDATE:
+                    methods.append(_updateMethod(obj, fields))
+                else:
+                    methods.append(obj.delete)
+            try:
+                self._batcher.batch(methods)
+            except ParseBatchError:
+                if start + BATCH_SIZE < len(mutations):
+                    self._requeue(mutations[start + BATCH_SIZE:])
+                raise
+            except Exception:
+                self._requeue(mutations[start:])
+                raise
+
+    def _requeue(self, mutations):
+        """ Method that puts changes that were not sent back in front of any changes recorded since the flush started.
+        """
+        with self._lock:
+            pending = self._pending
+            order = self._order
+            self._pending = {}
+            self._order = []
+            self._version += 1
+            for kind, obj, fields in mutations:
+                if kind == CREATE and getattr(obj, 'objectId', None) is not None:
+                    continue # Created before the error
+                key = self._key(obj)
+                self._order.append(key)
+                self._pending[key] = [kind, obj, fields]
+            for key in order:
+                newer = pending[key]
+                if key not in self._pending:
+                    self._order.append(key)
+                    self._pending[key] = newer
+                elif newer[0] == DELETE:
+                    self._pending[key] = newer
+                elif newer[0] == UPDATE and self._pending[key][0] == UPDATE:
+                    self._pending[key][2].update(newer[2])
+                # Otherwise the change that was not sent (a create or delete) already covers the newer one
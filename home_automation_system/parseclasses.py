@@ -25,4 +25,7 @@ class Settings(Object):
     pass
 
 class SensorData(Object):
+    pass
+
+class SensorRollup(Object):
     pass
\ No newline at end of file
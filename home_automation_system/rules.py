@@ -0,0 +1,90 @@
+# rules.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" rules module for Internet of Pi
+
+    This module provides the class ActionRules, which checks new sensor data against the system's Actions.
+    The Actions and thresholds are cached on the Raspberry Pi and indexed by event, so a sensor frame from
+    the Arduino can switch an appliance without waiting for the Parse Server.
+
+"""
+
+# Action events (the "event" column of the Action class)
+EVENT_DOOR_OPENED = 'Door Is Opened'
+EVENT_DOOR_CLOSED = 'Door Is Closed'
+EVENT_FOOT_SWITCH_PRESSED = 'Foot Switch Is Pressed'
+EVENT_LIGHT_EXCEEDS = 'Light Exceeds Threshold'
+EVENT_LIGHT_FALLS_BELOW = 'Light Falls Below Threshold'
+EVENT_TEMPERATURE_EXCEEDS = 'Temperature Exceeds Threshold'
+EVENT_TEMPERATURE_FALLS_BELOW = 'Temperature Falls Below Threshold'
+EVENT_HUMIDITY_EXCEEDS = 'Humidity Exceeds Threshold'
+EVENT_HUMIDITY_FALLS_BELOW = 'Humidity Falls Below Threshold'
+
+ACTION_COOLDOWN = 30 # Seconds that must pass after an action runs before actions are checked again
+
+# Each event is matched by a function of (sensorData, settings) - the same criteria that main.js used
+EVENT_CRITERIA = {
+    EVENT_DOOR_OPENED: lambda data, config: data.reedSwitch == 'OPENED',
+    EVENT_DOOR_CLOSED: lambda data, config: data.reedSwitch == 'CLOSED',
+    EVENT_FOOT_SWITCH_PRESSED: lambda data, config: data.footSwitch == 'PRESSED',
+    EVENT_LIGHT_EXCEEDS: lambda data, config: data.light >= config.lightThreshold,
+    EVENT_LIGHT_FALLS_BELOW: lambda data, config: data.light <= config.lightThreshold,
+    EVENT_TEMPERATURE_EXCEEDS: lambda data, config: data.temperature >= config.temperatureThreshold,
+    EVENT_TEMPERATURE_FALLS_BELOW: lambda data, config: data.temperature <= config.temperatureThreshold,
+    EVENT_HUMIDITY_EXCEEDS: lambda data, config: data.humidity >= config.humidityThreshold,
+    EVENT_HUMIDITY_FALLS_BELOW: lambda data, config: data.humidity <= config.humidityThreshold,
+}
+
+class ActionRules:
+    """ Instance is the local rule engine for the system's Actions
+
+    Instance Attributes:
+
+        _actionsByEvent  [Dictionary: event string -> list of (Action, Appliance) tuples for enabled actions]
+        _config          [Settings object: Source of the light, temperature and humidity thresholds]
+        _lastRan         [Float: time.time() when an action last changed an appliance's state]
+    """
+    def __init__(self):
+        """ Initializes a new ActionRules instance with no actions.
+        """
+        self._actionsByEvent = {}
+        self._config = None
+        self._lastRan = 0
+
+    def update(self, actions, appliances, config):
+        """ Method that rebuilds the event index from the latest Actions fetched from Parse.
+
+        Parameter: actions    [Iterable of enabled Action objects]
+        Parameter: appliances [Tuple of Appliance objects - actions are linked to these by objectId]
+        Parameter: config     [Settings object with the latest thresholds]
+        """
+        appliancesById = {}
+        for appliance in appliances:
+            appliancesById[appliance.objectId] = appliance
+        actionsByEvent = {}
+        for action in actions:
+            appliance = appliancesById.get(getattr(action.appliance, 'objectId', None))
+            if appliance is not None and action.event in EVENT_CRITERIA:
+                actionsByEvent.setdefault(action.event, []).append((action, appliance))
+        self._actionsByEvent = actionsByEvent
+        self._config = config
+
+    def evaluate(self, sensorData, now):
+        """ Method that checks the sensor data against the cached actions.
+
+        Parameter: sensorData [SensorData object with the newest readings]
+        Parameter: now        [Float: the current time.time()]
+
+        Returns: list of (Appliance, state) tuples for appliances whose state needs to change
+        """
+        changes = []
+        if self._config is None or now - self._lastRan <= ACTION_COOLDOWN:
+            return changes
+        for event, actions in self._actionsByEvent.items():
+            if EVENT_CRITERIA[event](sensorData, self._config):
+                for action, appliance in actions:
+                    if appliance.state != action.state:
+                        changes.append((appliance, action.state))
+        if len(changes) > 0:
+            self._lastRan = now
+        return changes
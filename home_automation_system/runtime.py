@@ -0,0 +1,101 @@
+# runtime.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" runtime module for Internet of Pi
+
+    This module provides the class Runtime, which runs each part of the system (serial input, serial output,
+    Parse syncing, the display, ...) as its own task on its own thread.  Tasks talk to each other through queues,
+    so a slow request to Parse does not hold up serial communication or button presses.
+
+"""
+
+import threading, time
+
+ERROR_DELAY = 5        # Seconds a task waits after an error before running again
+MAX_ERROR_DELAY = 300  # The wait doubles after each error in a row, up to this many seconds
+
+class Runtime:
+    """ Instance starts, runs and stops the system's tasks
+
+    Each task is a function that is called over and over on its own thread until the runtime stops.
+
+    Instance Attributes:
+
+        _tasks     [List of (name, step, interval, args) tuples: step(*args) is called, then the task waits interval seconds]
+        _threads   [List of threading.Thread objects, one per task once started]
+        _stopped   [threading.Event: Set when the runtime should stop]
+        _onError   [Function(err): called when a task raises an exception]
+    """
+    def __init__(self, onError):
+        """ Initializes a new Runtime instance with no tasks.
+
+        Parameter: onError [Function that takes an Exception raised by a task]
+        """
+        self._tasks = []
+        self._threads = []
+        self._stopped = threading.Event()
+        self._onError = onError
+
+    def addTask(self, name, step, interval=0, args=()):
+        """ Method that adds a task to the runtime.
+
+        Parameter: name     [String: name of the task's thread]
+        Parameter: step     [Function that does one unit of the task's work - it should block for at most about a second]
+        Parameter: interval [Number: seconds to wait between calls to step]
+        Parameter: args     [Tuple of arguments step is called with]
+        """
+        self._tasks.append((name, step, interval, args))
+
+    def start(self):
+        """ Method that starts every task on its own thread.
+        """
+        self._stopped.clear()
+        for name, step, interval, args in self._tasks:
+            thread = threading.Thread(target=self._runTask, name=name, args=(step, interval, args))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """ Method that tells every task to stop.
+        """
+        self._stopped.set()
+
+    def isRunning(self):
+        """ Method that returns True until the runtime is stopped.
+        """
+        return not self._stopped.is_set()
+
+    def wait(self, timeout):
+        """ Method that waits until the runtime stops or timeout seconds pass.
+
+        Returns: True if the runtime has stopped
+        """
+        self._stopped.wait(timeout)
+        return self._stopped.is_set()
+
+    def join(self):
+        """ Method that blocks until the runtime stops and every task's thread finishes.
+        """
+        while self.isRunning():
+            time.sleep(0.5) # Sleep in the main thread so KeyboardInterrupt is still delivered
+        for thread in self._threads:
+            thread.join(ERROR_DELAY)
+        self._threads = []
+
+    def _runTask(self, step, interval, args):
+        """ Method that runs a task's step until the runtime stops.
+        An error in one task is reported and only delays that task - for longer after each error in a row.
+        """
+        delay = ERROR_DELAY
+        while self.isRunning():
+            try:
+                step(*args)
+            except Exception as err:
+                self._onError(err)
+                self.wait(delay)
+                delay = min(delay * 2, MAX_ERROR_DELAY)
+                continue
+            delay = ERROR_DELAY
+            if interval > 0:
+                self.wait(interval)
@@ -0,0 +1,196 @@
+# scheduler.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" scheduler module for Internet of Pi
+
+    This module provides the class Scheduler, which starts and ends Schedules and sounds Alarms on the Raspberry Pi.
+    It replaces the processScheduling and processAlarms cloud functions in main.js.
+
+    Each Schedule stores arrays of start and end dates, and each Alarm stores an array of dates (one entry per day of the week).
+    Every entry is kept in a heap ordered by its next fire time.  A thread sleeps until the nearest entry is due, fires it,
+    and moves it one week ahead (the same way main.js did), so checking the schedule costs O(log n) per entry that fires.
+
+    The scheduler never changes the objects it is given - the dates an object's entries moved ahead to are passed to the
+    callbacks, and the control task records them in the MutationQueue (and the state file).
+
+"""
+
+import calendar, datetime, heapq, itertools, threading, time
+
+WEEK = 7 * 24 * 60 * 60 # Seconds that an entry moves ahead after it fires
+
+# Kinds of heap entries
+SCHEDULE_START = 'start'
+SCHEDULE_END = 'end'
+ALARM = 'when'
+
+def toTimestamp(value):
+    """ Function that converts a Parse Date (a datetime in UTC, or its dictionary form) into seconds since the epoch.
+    """
+    if isinstance(value, dict):
+        value = datetime.datetime.strptime(value['iso'], '%Y-%m-%dT%H:%M:%S.%fZ')
+    return calendar.timegm(value.timetuple()) + value.microsecond / 1000000.0
+
+def toParseDate(timestamp):
+    """ Function that converts seconds since the epoch into a Parse Date dictionary.
+    """
+    when = datetime.datetime.utcfromtimestamp(timestamp)
+    return {'__type': 'Date', 'iso': when.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (when.microsecond // 1000)}
+
+class Scheduler:
+    """ Instance keeps the next fire time of every Schedule and Alarm entry and fires each one on time
+
+    Instance Attributes:
+
+        _heap          [List of (time, sequence, generation, kind, object, index) tuples, a heap ordered by time]
+        _generation    [Int: Incremented by load, so that entries from an older set of objects are not rescheduled]
+        _advanced      [Dictionary: (objectId, kind, index) -> time that entry was moved ahead to, until the object reflects it]
+        _finished      [Set of objectIds of one-time schedules and alarms that have already ended]
+        _sequence      [itertools.count: Breaks ties between entries that fire at the same time]
+        _condition     [threading.Condition: Guards the heap and wakes the thread when entries change]
+        _running       [Boolean: True while the scheduler thread should keep running]
+        _thread        [threading.Thread running _run, or None if not started]
+        _onScheduleStart [Function(schedule, dates): called when a schedule starts]
+        _onScheduleEnd   [Function(schedule, dates): called when a schedule ends]
+        _onAlarm         [Function(alarm, dates): called when an alarm goes off]
+    """
+    def __init__(self, onScheduleStart, onScheduleEnd, onAlarm):
+        """ Initializes a new Scheduler instance with no entries.
+        Each callback also takes the new list of dates (start, end or when) for the object, with the entries that fired moved ahead.
+
+        Parameter: onScheduleStart [Function that takes the Schedule object that started, and its new start dates]
+        Parameter: onScheduleEnd   [Function that takes the Schedule object that ended, and its new end dates]
+        Parameter: onAlarm         [Function that takes the Alarm object that went off, and its new dates]
+        """
+        self._heap = []
+        self._generation = 0
+        self._advanced = {}
+        self._finished = set()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._onScheduleStart = onScheduleStart
+        self._onScheduleEnd = onScheduleEnd
+        self._onAlarm = onAlarm
+
+    def load(self, schedules, alarms):
+        """ Method that replaces the scheduler's entries with the latest enabled Schedules and Alarms.
+
+        Parameter: schedules [Iterable of enabled Schedule objects]
+        Parameter: alarms    [Iterable of enabled Alarm objects]
+        """
+        with self._condition:
+            self._generation += 1
+            heap = []
+            for schedule in schedules:
+                self._addEntries(heap, schedule, SCHEDULE_START)
+                self._addEntries(heap, schedule, SCHEDULE_END)
+            for alarm in alarms:
+                self._addEntries(heap, alarm, ALARM)
+            heapq.heapify(heap)
+            self._heap = heap
+            self._condition.notify()
+
+    def _addEntries(self, heap, obj, kind):
+        """ Method that adds one entry to heap for each date in one of an object's arrays.
+        """
+        if obj.objectId in self._finished:
+            return
+        dates = getattr(obj, kind, None) or []
+        for index in range(len(dates)):
+            when = toTimestamp(dates[index])
+            key = (obj.objectId, kind, index)
+            if key in self._advanced:
+                if self._advanced[key] > when: # Parse has not been updated yet with the time this entry moved ahead to
+                    when = self._advanced[key]
+                else:
+                    del self._advanced[key]
+            heap.append((when, next(self._sequence), self._generation, kind, obj, index))
+
+    def nextDeadline(self):
+        """ Method that returns the time the next entry fires, or None if there are no entries.
+        """
+        with self._condition:
+            return self._heap[0][0] if len(self._heap) > 0 else None
+
+    def start(self):
+        """ Method that starts the scheduler thread.
+        """
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='scheduler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ Method that stops the scheduler thread.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def _run(self):
+        """ Method that sleeps until the nearest entry is due, then fires every entry that is due.
+        """
+        while True:
+            with self._condition:
+                while self._running and (len(self._heap) == 0 or self._heap[0][0] > time.time()):
+                    if len(self._heap) == 0:
+                        self._condition.wait()
+                    else:
+                        self._condition.wait(self._heap[0][0] - time.time())
+                if not self._running:
+                    return
+                due = self._popDue(time.time())
+            for kind, obj, dates in due:
+                if kind == SCHEDULE_START:
+                    self._onScheduleStart(obj, dates)
+                elif kind == SCHEDULE_END:
+                    self._onScheduleEnd(obj, dates)
+                else:
+                    self._onAlarm(obj, dates)
+
+    def _popDue(self, now):
+        """ Method that removes every due entry from the heap and moves each one ahead by a week.
+        Entries from objects that are not recurring are dropped instead of being moved ahead.
+
+        Returns: list of [kind, object, dates] lists, one for each object that fires - dates is a new list of the
+                 object's dates of that kind, with every entry that was moved ahead (now or before) at its new time
+        """
+        due = []
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+            when, sequence, generation, kind, obj, index = heapq.heappop(self._heap)
+            if generation != self._generation or obj.objectId in self._finished:
+                continue
+            while when <= now: # Skip ahead past any weeks that were missed while the system was off
+                when += WEEK
+            self._advanced[(obj.objectId, kind, index)] = when
+            fired = [entry for entry in due if entry[0] == kind and entry[1] is obj]
+            if len(fired) == 0:
+                due.append([kind, obj, self._datesOf(obj, kind)])
+            else:
+                fired[0][2][index] = toParseDate(when)
+            if self._isRecurring(obj, kind):
+                heapq.heappush(self._heap, (when, next(self._sequence), generation, kind, obj, index))
+            else:
+                self._finished.add(obj.objectId)
+        return due
+
+    def _datesOf(self, obj, kind):
+        """ Method that returns a copy of one of an object's arrays of dates, with the entries that moved ahead at their new times.
+        """
+        dates = list(getattr(obj, kind))
+        for index in range(len(dates)):
+            when = self._advanced.get((obj.objectId, kind, index))
+            if when is not None and when > toTimestamp(dates[index]):
+                dates[index] = toParseDate(when)
+        return dates
+
+    def _isRecurring(self, obj, kind):
+        """ Method that returns False if an entry of this kind ends its object (a one-time schedule's end, or an alarm that doesn't repeat).
+        """
+        if kind == SCHEDULE_END:
+            return obj.recurring
+        elif kind == ALARM:
+            return obj.repeats
+        return True
@@ -6,14 +6,316 @@
     This module provides the class SerialComm, which interfaces with the Arduino Mega.
     The Arduino Mega controls the appliances and RGB Matrix, and reads data from sensors.
 
+    Messages use the text protocol found in home_automation_system.ino at 9600 baud, unless SerialComm.negotiate
+    switches the Arduino to the binary protocol at BINARY_BAUDRATE:
+        [0xA5][payload length][payload][CRC-16 high byte][CRC-16 low byte]
+     - the payload holds one or more commands, each a command id byte followed by its fields (see BINARY_COMMANDS)
+     - the CRC-16 (CCITT-FALSE) covers the length and payload bytes
+     - several queued messages are sent in one frame
+
+    The Arduino's serial port is found by its USB vendor and product ids (and optionally its serial number) in sysfs.
+
 """
-import subprocess, serial, datetime
+import os, serial, datetime, operator, struct, time
+from functools import reduce
 from parseclasses import *
+from metrics import *
+from tracefile import *
+
+try:
+    import Queue as queue # Python 2
+except ImportError:
+    import queue
 
 DISPLAY_IGNORE = 'IGNORE'
 DISPLAY_CLEAR_WHEN_DARK = 'CLEAR_WHEN_DARK'
 DISPLAY_DISABLE_WHEN_DARK = 'DISABLE_WHEN_DARK'
 
+SERIAL_PORT = None # Serial port of the Arduino (e.g. '/dev/ttyACM0'), its USB serial number, or None to find it
+
+SYSFS_TTY = '/sys/class/tty'
+# USB (vendor id, product id) of the Arduino Mega 2560 and common clones, as written in sysfs
+ARDUINO_USB_IDS = (('2341', '0010'), ('2341', '0042'), ('2a03', '0010'), ('2a03', '0042'), ('1a86', '7523'))
+READY_TIMEOUT = 5    # Seconds to wait for the Arduino to answer after its serial port is opened (opening it resets the Arduino)
+READY_POLL = 0.25    # Seconds between the sensor data requests sent while waiting
+
+TEXT_BAUDRATE = 9600      # Baud rate of the text protocol (the Arduino starts with it)
+BINARY_BAUDRATE = 115200  # Baud rate of the binary protocol (115200, 250000 or 500000), or None to only use the text protocol
+NEGOTIATE_TIMEOUT = 2     # Seconds to wait for the Arduino's answers while switching protocols
+
+SUBSCRIBE_REFRESH = 20  # Seconds between SUBSCRIBE messages once the Arduino pushes sensor data (they also keep the binary protocol alive)
+SUBSCRIBE_ATTEMPTS = 3  # SUBSCRIBE messages sent without an OK before deciding the Arduino's sketch can't push sensor data
+
+MAX_FRAME_LENGTH = 80 # Size of the Arduino's serial buffer - longer runs of bytes without a newline are noise
+
+FRAMES_RECEIVED = METRICS.counter('serial_frames_received_total', 'Messages received from the Arduino')
+FRAMES_SENT = METRICS.counter('serial_frames_sent_total', 'Messages sent to the Arduino')
+CHECKSUM_ERRORS = METRICS.counter('serial_checksum_errors_total', 'Messages from the Arduino dropped because their checksum did not match')
+
+BINARY_SYNC = 0xA5      # First byte of every binary frame
+BINARY_SYNC_BYTE = bytearray([BINARY_SYNC])
+MAX_BINARY_PAYLOAD = 60 # Size of the Arduino's binary payload buffer
+MATRIX_MODES = (DISPLAY_IGNORE, DISPLAY_CLEAR_WHEN_DARK, DISPLAY_DISABLE_WHEN_DARK) # ENABLE_MATRIX's field is an index in this
+
+def _bits(values, on):
+    """ Function that packs a list of values into the bits of an Int - bit n is set if values[n] == on.
+    """
+    return sum(1 << index for index in range(len(values)) if values[index] == on)
+
+# Binary commands: name -> (id, struct format of the fields, function(data) -> fields, function(fields) -> data)
+# data is the command's parameters as used by the text protocol (sensor values are decoded as numbers)
+BINARY_COMMANDS = {
+    'APP': (0x01, '<BB', lambda data: (len(data), _bits(data, '1')),   # Number of appliances, bit n set if appliance n is on
+            lambda fields: ['1' if fields[1] >> index & 1 else '0' for index in range(fields[0])]),
+    'SET_DATE_TIME': (0x02, '<HBBBBB', lambda data: [int(value) for value in data],
+                      lambda fields: [str(value) for value in fields]),
+    'SET_FORMATTING': (0x03, '<B', lambda data: (_bits(data, '1'),),   # Bit 0 use12HourFormat, bit 1 useFahrenheit
+                       lambda fields: ['1' if fields[0] >> index & 1 else '0' for index in range(2)]),
+    'SET_LIGHT_THRESHOLD': (0x04, '<B', lambda data: (max(0, min(255, int(float(data[0])))),),
+                            lambda fields: [str(fields[0])]),
+    'ENABLE_MATRIX': (0x05, '<B', lambda data: (MATRIX_MODES.index(data[0]),),
+                      lambda fields: [MATRIX_MODES[fields[0]]]),
+    'DISABLE_MATRIX': (0x06, '', lambda data: (), lambda fields: []),
+    'GET_SENSOR': (0x07, '', lambda data: (), lambda fields: []),
+    'SUBSCRIBE': (0x08, '<HHHH', lambda data: [int(value) for value in data], # Interval in seconds, temperature, humidity and light deadbands
+                  lambda fields: [str(value) for value in fields]),
+    'SENSOR': (0x81, '<hHHB', # Temperature and humidity x100, light, bit 0 door opened, bit 1 foot switch pressed
+               lambda data: (int(round(float(data[0]) * 100)), int(round(float(data[1]) * 100)), int(data[2]),
+                             (1 if data[3] == 'OPENED' else 0) | (2 if data[4] == 'PRESSED' else 0)),
+               lambda fields: [fields[0] / 100.0, fields[1] / 100.0, fields[2],
+                               'OPENED' if fields[3] & 1 else 'CLOSED', 'PRESSED' if fields[3] & 2 else 'RELEASED']),
+    'OK': (0x82, '<B', lambda data: (BINARY_COMMANDS[data[0]][0],),   # Id of the command that succeeded
+           lambda fields: [BINARY_COMMAND_NAMES.get(fields[0], str(fields[0]))]),
+    'ERROR': (0x83, '<B', lambda data: (int(data[0]),), lambda fields: [str(fields[0])]), # 1: checksum mismatch, 2: bad command
+}
+BINARY_COMMAND_NAMES = dict((command[0], name) for name, command in BINARY_COMMANDS.items()) # Id -> name
+
+def _readSysfs(directory, name):
+    """ Function that returns the stripped contents of a sysfs attribute file, or None if it can't be read.
+    """
+    try:
+        with open(os.path.join(directory, name)) as attribute:
+            return attribute.read().strip()
+    except (IOError, OSError):
+        return None
+
+def findArduinoPorts(serialNumber=None):
+    """ Function that finds the serial ports of the Arduinos plugged in over USB, using sysfs.
+
+    Parameter: serialNumber [String: only find the Arduino with this USB serial number, or None for any Arduino]
+
+    Returns: sorted list of Strings, e.g. ['/dev/ttyACM0']
+    """
+    ports = []
+    names = os.listdir(SYSFS_TTY) if os.path.isdir(SYSFS_TTY) else []
+    for name in sorted(names):
+        if not name.startswith('ttyACM') and not name.startswith('ttyUSB'):
+            continue
+        device = os.path.realpath(os.path.join(SYSFS_TTY, name, 'device'))
+        for level in range(3): # The USB device is the parent of the tty's interface (or of its usb-serial port)
+            device = os.path.dirname(device)
+            vendor = _readSysfs(device, 'idVendor')
+            if vendor is not None:
+                if (vendor, _readSysfs(device, 'idProduct')) in ARDUINO_USB_IDS and \
+                        (serialNumber is None or _readSysfs(device, 'serial') == serialNumber):
+                    ports.append('/dev/' + name)
+                break
+    return ports
+
+def checksum(sentence):
+    """ Function that returns the XOR of every byte in sentence (a bytearray).
+    """
+    return reduce(operator.xor, sentence, 0)
+
+def encodeFrame(command, data):
+    """ Function that builds a complete serial message according to the protocol found in home_automation_system.ino
+
+    Parameter: command [String: the command, e.g. 'APP']
+    Parameter: data    [List of Strings: the command's parameters]
+
+    Returns: bytes of the message, ready to be written in one call
+    """
+    sentence = (command + '!' + '%X' % len(data) + '@' + ','.join(data)).encode('ascii')
+    return b'$' + sentence + b'*' + ('%X\n' % checksum(bytearray(sentence))).encode('ascii')
+
+def crc16(data):
+    """ Function that returns the CRC-16 (CCITT-FALSE: polynomial 0x1021, initial value 0xFFFF) of data (a bytearray).
+    """
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFF00) ^ _CRC16_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+def _crc16Table():
+    """ Function that returns the table crc16 uses to process a byte at a time.
+    """
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for bit in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+_CRC16_TABLE = _crc16Table()
+
+def encodeBinaryFrames(messages):
+    """ Function that packs messages into as few binary frames as possible
+
+    Parameter: messages [List of (command, data) tuples, as for encodeFrame]
+
+    Returns: bytes of the frames, ready to be written in one call
+    """
+    frames = []
+    payload = bytearray()
+    for command, data in messages:
+        commandId, layout, toFields, fromFields = BINARY_COMMANDS[command]
+        record = bytearray(struct.pack('<B' + layout[1:], commandId, *toFields(data)))
+        if len(payload) + len(record) > MAX_BINARY_PAYLOAD:
+            frames.append(_binaryFrame(payload))
+            payload = bytearray()
+        payload.extend(record)
+    if len(payload) > 0:
+        frames.append(_binaryFrame(payload))
+    return b''.join(frames)
+
+def _binaryFrame(payload):
+    """ Function that adds the sync byte, length and CRC-16 to a payload.
+    """
+    body = bytearray([len(payload)]) + payload
+    return bytes(bytearray([BINARY_SYNC]) + body + bytearray(struct.pack('>H', crc16(body))))
+
+class FrameDecoder:
+    """ Instance pulls every complete message out of the bytes received from the Arduino
+
+    Bytes are added to a buffer as they arrive, so a message split across reads is decoded once the rest arrives,
+    and a burst of messages is decoded all at once.
+
+    Instance Attributes:
+
+        _buffer          [bytearray: bytes received after the last complete message]
+        checksumErrors   [Int: number of messages dropped because their checksum did not match]
+    """
+    def __init__(self):
+        """ Initializes a new FrameDecoder with an empty buffer.
+        """
+        self._buffer = bytearray()
+        self.checksumErrors = 0
+
+    def feed(self, data):
+        """ Method that adds received bytes to the buffer and decodes every complete message.
+
+        Parameter: data [bytes read from the serial port]
+
+        Returns: list of (command, data) tuples - command is a String and data is a list of Strings
+        """
+        self._buffer.extend(data)
+        frames = []
+        start = 0
+        end = self._buffer.find(b'\n')
+        while end != -1:
+            frame = self._decode(start, end)
+            if frame is not None:
+                frames.append(frame)
+            start = end + 1
+            end = self._buffer.find(b'\n', start)
+        del self._buffer[:start]
+        if len(self._buffer) > MAX_FRAME_LENGTH:
+            del self._buffer[:]
+        return frames
+
+    def _decode(self, start, end):
+        """ Method that decodes the message between start and end (the index of its newline) in the buffer.
+
+        Returns: (command, data) tuple, or None if the message is incomplete or its checksum does not match
+        """
+        begin = self._buffer.rfind(b'$', start, end) # The last '$' is used, like the Arduino does, in case of noise
+        star = self._buffer.rfind(b'*', begin + 1, end)
+        if begin == -1 or star == -1:
+            return None
+        try:
+            received = int(bytes(self._buffer[star + 1:end]).strip(), 16)
+        except ValueError:
+            received = -1
+        if received != checksum(self._buffer[begin + 1:star]):
+            self.checksumErrors += 1
+            CHECKSUM_ERRORS.inc()
+            return None
+        FRAMES_RECEIVED.inc()
+        sentence = bytes(self._buffer[begin + 1:star]).decode('ascii', 'replace')
+        command, separator, rest = sentence.partition('!')
+        return command, rest.partition('@')[2].split(',')
+
+class BinaryFrameDecoder:
+    """ Instance pulls every command out of the binary frames received from the Arduino
+
+    Instance Attributes:
+
+        _buffer          [bytearray: bytes received after the last complete frame]
+        checksumErrors   [Int: number of frames dropped because their CRC-16 did not match]
+    """
+    def __init__(self):
+        """ Initializes a new BinaryFrameDecoder with an empty buffer.
+        """
+        self._buffer = bytearray()
+        self.checksumErrors = 0
+
+    def feed(self, data):
+        """ Method that adds received bytes to the buffer and decodes every command in the complete frames.
+
+        Parameter: data [bytes read from the serial port]
+
+        Returns: list of (command, data) tuples, like FrameDecoder.feed
+        """
+        self._buffer.extend(data)
+        messages = []
+        start = 0
+        buffer = self._buffer
+        while True:
+            start = buffer.find(BINARY_SYNC_BYTE, start)
+            if start == -1:
+                start = len(buffer)
+                break
+            if start + 2 > len(buffer):
+                break
+            length = buffer[start + 1]
+            if length > MAX_BINARY_PAYLOAD: # Not a frame - look for the next sync byte
+                start += 1
+                continue
+            end = start + length + 4
+            if end > len(buffer):
+                break
+            if crc16(buffer[start + 1:end - 2]) != (buffer[end - 2] << 8 | buffer[end - 1]):
+                self.checksumErrors += 1
+                CHECKSUM_ERRORS.inc()
+                start += 1
+                continue
+            messages.extend(self._decode(buffer[start + 2:end - 2]))
+            start = end
+        del self._buffer[:start]
+        return messages
+
+    def _decode(self, payload):
+        """ Method that decodes the commands in a frame's payload.
+
+        Returns: list of (command, data) tuples - decoding stops at an unknown command id
+        """
+        messages = []
+        index = 0
+        while index < len(payload):
+            name = BINARY_COMMAND_NAMES.get(payload[index])
+            if name is None:
+                break
+            commandId, layout, toFields, fromFields = BINARY_COMMANDS[name]
+            size = struct.calcsize(layout) if layout else 0
+            if index + 1 + size > len(payload):
+                break
+            fields = struct.unpack(layout, bytes(payload[index + 1:index + 1 + size])) if layout else ()
+            messages.append((name, fromFields(fields)))
+            FRAMES_RECEIVED.inc()
+            index += 1 + size
+        return messages
+
 class SerialComm:
     """ Instance is Raspberry Pi's way of communicating with the Arduino Mega.
 
@@ -24,28 +326,47 @@ class SerialComm:
         _latestSensorData    [Parse Class - SensorData: The most recent sensor data]
         _reedSwitch          [String: The value of the reed switch]
         _footSwitch          [String: The value of the foot switch]
+        _txQueue             [Queue of (command, data) tuples: messages waiting to be written by the serial output task]
+        _decoder             [FrameDecoder or BinaryFrameDecoder instance: decodes the bytes received from the Arduino]
+        _binary              [Boolean: True once the Arduino has switched to the binary protocol]
+        port                 [String: the Arduino's serial port]
+        _subscribed          [Boolean: True once the Arduino has agreed to push sensor data]
+        _subscribeAttempts   [Int: SUBSCRIBE messages sent before the Arduino agreed]
+        _lastSubscribe       [Float: time.time() when SUBSCRIBE was last sent]
+        lastReceived         [Float: time.time() when readFromSerial last received anything (or when the port was opened)]
+        trace                [TraceRecorder instance that every byte read and written is recorded to, or None]
     """
-    def __init__(self):
+    def __init__(self, port=None):
         """ Initializes a new SerialComm instance.
 
         Establishes Serial connection to Arduino Mega and sets instance attributes to initial values.
 
+        Parameter: port [String: the Arduino's serial port, its USB serial number, or None to find it]
         """
         self._applianceStates = []
         self._currentSettings = None
         self._latestSensorData = None
         self._reedSwitch = 'CLOSED'
         self._footSwitch = 'RELEASED'
-        # Finding the serial port
-        port = subprocess.check_output("dmesg | grep 'cdc_acm 1.1' | tail -1", shell=True).split(':')
-        if port == ['']:
-            raise Exception('Could not find serial port')
-        port = '/dev/' + port[2].strip()
+        self._txQueue = queue.Queue()
+        self._decoder = FrameDecoder()
+        self._binary = False
+        self._subscribed = False
+        self._subscribeAttempts = 0
+        self._lastSubscribe = 0
+        self.lastReceived = time.time()
+        self.trace = None
+        if port is None or not port.startswith('/'): # Finding the serial port
+            ports = findArduinoPorts(port)
+            if len(ports) == 0:
+                raise Exception('Could not find serial port')
+            port = ports[0]
+        self.port = port
 
         try:
             self._ser = serial.Serial(
                 port=port,
-                baudrate=9600,
+                baudrate=TEXT_BAUDRATE,
                 timeout=1
             )
         except NameError:
@@ -53,46 +374,104 @@ class SerialComm:
 
 
     def _sendSerialMessage(self, command, data):
-        """ Method that sends serial messages according to the protocol found in home_automation_system.ino
+        """ Method that queues a serial message to be written by writePending.
         """
-        sentence = command + '!' + str(len(data)) + '@' + ','.join(data)
-        CRC = 0
+        self._txQueue.put((command, data))
 
-        for s in sentence:
-            CRC ^= ord(s)
-
-        self._ser.write('$')
-        self._ser.write(sentence)
-        self._ser.write('*')
-        self._ser.write(hex(CRC))
-        self._ser.write('\n')
 
+    def writePending(self, timeout=1):
+        """ Method that writes every queued serial message, waiting up to timeout seconds for the first one.
+        All of the messages are sent in a single write.
+        """
+        try:
+            messages = [self._txQueue.get(timeout=timeout)]
+        except queue.Empty:
+            return
+        while True:
+            try:
+                messages.append(self._txQueue.get_nowait())
+            except queue.Empty:
+                break
+        data = encodeBinaryFrames(messages) if self._binary else b''.join(encodeFrame(*message) for message in messages)
+        if self.trace is not None:
+            self.trace.record(TRACE_TX, data)
+        self._ser.write(data)
+        FRAMES_SENT.inc(len(messages))
+
+
+    def waitUntilReady(self, timeout=READY_TIMEOUT):
+        """ Method that waits for the Arduino to start after its serial port is opened, by asking for sensor data
+        every READY_POLL seconds until it answers.
+
+        Parameter: timeout [Number: seconds to wait]
+
+        Returns: True if the Arduino answered, False if time ran out
+        """
+        deadline = time.time() + timeout
+        self._ser.timeout = READY_POLL
+        try:
+            while time.time() < deadline:
+                self._ser.write(encodeFrame('GET_SENSOR', []))
+                if self._waitFor(FrameDecoder(), 'SENSOR', READY_POLL):
+                    return True
+            return False
+        finally:
+            self._ser.timeout = 1
 
-    def _handleSerialMessage(self, sentence):
-        """ Method that decodes the provided serial message.
 
-        Parameter: sentence [String: Original serial message]
+    def negotiate(self, baudrate=BINARY_BAUDRATE):
+        """ Method that asks the Arduino to switch to the binary protocol at a higher baud rate.
+        Should be called before the serial input and output tasks start.
 
-        Returns: command (String) and related data
-        """
-        if sentence.find('$') != -1 and sentence.find('*') != -1:
-            received_checksum = int(sentence[sentence.find('*') + 1:], 16)
-            sentence = sentence[sentence.find('$') + 1:sentence.find('*')]
-            CRC = 0
-            for s in sentence:
-                CRC ^= ord(s)
+        If the Arduino's sketch doesn't know the BAUD command (it answers with an error), or doesn't answer in binary
+        at the new baud rate, the text protocol at TEXT_BAUDRATE is kept.
 
-            if received_checksum != CRC:
-                raise Exception('Checksum mismatch')
+        Parameter: baudrate [Int: baud rate of the binary protocol, or None to keep the text protocol]
 
-            return sentence[:sentence.find('!')], sentence[sentence.find('@') + 1:].split(',')
+        Returns: True if the binary protocol is being used
+        """
+        if baudrate is None:
+            return False
+        self._ser.reset_input_buffer()
+        self._ser.write(encodeFrame('BAUD', [str(baudrate)]))
+        if not self._waitFor(FrameDecoder(), 'OK', param='BAUD'):
+            return False
+        self._ser.flush()
+        self._ser.baudrate = baudrate
+        self._ser.write(encodeBinaryFrames([('GET_SENSOR', [])]))
+        if not self._waitFor(BinaryFrameDecoder(), 'SENSOR'):
+            self._ser.baudrate = TEXT_BAUDRATE # The Arduino also goes back to the text protocol when it doesn't hear binary frames
+            return False
+        self._decoder = BinaryFrameDecoder()
+        self._binary = True
+        return True
+
+
+    def _waitFor(self, decoder, command, timeout=NEGOTIATE_TIMEOUT, param=None):
+        """ Method that reads from the Arduino until it sends a message, for up to timeout seconds.
+
+        Parameter: decoder [FrameDecoder or BinaryFrameDecoder for the protocol being used]
+        Parameter: command [String: the command of the message]
+        Parameter: timeout [Number: seconds to wait]
+        Parameter: param   [String: the message's first parameter, or None for any]
+
+        Returns: True if the message was received, False if an ERROR was received or time ran out
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            for received, data in decoder.feed(self._ser.read(max(1, self._ser.in_waiting))):
+                if received == command and (param is None or data[0] == param):
+                    return True
+                if received == 'ERROR':
+                    return False
+        return False
 
 
     def updateAppliances(self, appliances):
         """ Method that compares the current appliance states with those states store on Parse.
         Sends a serial message with new appliance states if the above two are different.
 
-        Parameter: appliances [Queryset of type Appliance]
+        Parameter: appliances [Tuple of type Appliance, ordered by applianceId]
         """
         states = []
         for appliance in appliances:
@@ -102,17 +481,18 @@ class SerialComm:
             self._applianceStates = states
 
 
-    def syncSettings(self, settings):
+    def syncSettings(self, settings, force=False):
         """ Method that compares the current system settings with the newly provided system settings.
         Sends a serial message with new settings if the above two are different.
 
         Parameter: settings [Parse Class - Settings: the newest settings]
+        Parameter: force    [Boolean: True to send every setting, e.g. after the Arduino was reconnected]
         """
-        if self._currentSettings is not None:
-            if self._currentSettings.useFahrenheit != settings.useFahrenheit or self._currentSettings.use12HourFormat != settings.use12HourFormat:
+        if self._currentSettings is not None or force:
+            if force or self._currentSettings.useFahrenheit != settings.useFahrenheit or self._currentSettings.use12HourFormat != settings.use12HourFormat:
                 formattingData = ['1' if settings.use12HourFormat else '0', '1' if settings.useFahrenheit else '0']
                 self._sendSerialMessage('SET_FORMATTING', formattingData)
-            if self._currentSettings.lightThreshold != settings.lightThreshold:
+            if force or self._currentSettings.lightThreshold != settings.lightThreshold:
                 self._sendSerialMessage('SET_LIGHT_THRESHOLD', [str(settings.lightThreshold)])
         self._currentSettings = settings
 
@@ -134,25 +514,57 @@ class SerialComm:
 
     def readFromSerial(self):
         """ Method that handles serial messages coming from the Arduino.
-        Processes latest sensor data and uploads to Parse
-        """
-        reading = self._ser.readline().decode()
-        if reading != '':
-            command, data = self._handleSerialMessage(reading)
-            if command == 'SENSOR':
-                temperature = float(data[0])
-                humidity = float(data[1])
-                light = int(data[2])
-                reedSwitch = data[3]
-                footSwitch = data[4]
-                self._latestSensorData = SensorData(temperature = temperature, humidity = humidity, light = light, reedSwitch = reedSwitch, footSwitch = footSwitch)
-                self._latestSensorData.save()
+        Processes latest sensor data (HomeAutomationSystem checks it against the actions and uploads it to Parse)
 
+        Waits up to the serial timeout for data, then decodes everything the Arduino has sent so far.
 
-    def requestSensorData(self):
-        """ Method that asks Arduino for latest sensor data.
+        Returns: list of SensorData objects, one for each sensor message received
+        """
+        received = self._ser.read(1)
+        sensorData = []
+        if len(received) == 0:
+            return sensorData
+        self.lastReceived = time.time()
+        with METRICS.timer('serial_read'):
+            waiting = self._ser.in_waiting
+            if waiting > 0:
+                received += self._ser.read(waiting)
+            if self.trace is not None:
+                self.trace.record(TRACE_RX, received)
+            for command, data in self._decoder.feed(received):
+                if command == 'OK' and len(data) == 1 and data[0] == 'SUBSCRIBE':
+                    self._subscribed = True
+                elif command == 'SENSOR' and len(data) == 5:
+                    temperature = float(data[0])
+                    humidity = float(data[1])
+                    light = int(data[2])
+                    reedSwitch = data[3]
+                    footSwitch = data[4]
+                    self._latestSensorData = SensorData(temperature = temperature, humidity = humidity, light = light, reedSwitch = reedSwitch, footSwitch = footSwitch)
+                    sensorData.append(self._latestSensorData)
+        return sensorData
+
+
+    def requestSensorData(self, pushInterval=None, deadbands=(0, 0, 0)):
+        """ Method that asks Arduino for latest sensor data, or to push it.
+
+        With a pushInterval, the Arduino is asked to push sensor data (SUBSCRIBE) and is only polled until it agrees;
+        after that, SUBSCRIBE is sent again every SUBSCRIBE_REFRESH seconds in case the Arduino restarted.
+        If its sketch doesn't agree after SUBSCRIBE_ATTEMPTS, it is polled from then on.
+
+        Parameter: pushInterval [Int: longest number of seconds between pushes, or None to poll]
+        Parameter: deadbands    [Tuple: changes in temperature (degrees), humidity (%) and light that are pushed right away]
         """
-        self._sendSerialMessage('GET_SENSOR', [])
+        if pushInterval is None or (not self._subscribed and self._subscribeAttempts >= SUBSCRIBE_ATTEMPTS):
+            self._sendSerialMessage('GET_SENSOR', [])
+            return
+        if not self._subscribed:
+            self._subscribeAttempts += 1
+            self._sendSerialMessage('GET_SENSOR', [])
+        if not self._subscribed or time.time() - self._lastSubscribe >= SUBSCRIBE_REFRESH:
+            self._sendSerialMessage('SUBSCRIBE', [str(int(pushInterval)), str(int(round(deadbands[0] * 100))),
+                                                  str(int(round(deadbands[1] * 100))), str(int(deadbands[2]))])
+            self._lastSubscribe = time.time()
 
 
     def getLastSensorData(self):
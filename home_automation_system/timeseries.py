@@ -0,0 +1,154 @@
+# timeseries.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" timeseries module for Internet of Pi
+
+    This module provides the class SensorSeries, which keeps recent sensor data in fixed-size arrays (a ring buffer, one
+    array per column) instead of one object per sample, so its memory use stays the same no matter how long the system runs.
+
+    SensorSeries also keeps per-minute and per-hour minimum/maximum/mean values of the temperature, humidity and light,
+    updated as each sample arrives.  When a minute or hour ends, its values are returned as a Rollup, which can be
+    uploaded to Parse in place of every sample.
+
+"""
+
+from array import array
+
+SERIES_CAPACITY = 21600 # Samples kept (one day of samples taken every 4 seconds)
+ROLLUP_PERIODS = (60, 3600) # Seconds covered by each rollup - one minute and one hour
+
+# Bits of the switches column
+DOOR_OPENED = 1
+FOOT_SWITCH_PRESSED = 2
+
+def switchBits(reedSwitch, footSwitch):
+    """ Function that packs the reed switch and foot switch values into the bits of one byte.
+    """
+    return (DOOR_OPENED if reedSwitch == 'OPENED' else 0) | (FOOT_SWITCH_PRESSED if footSwitch == 'PRESSED' else 0)
+
+class Rollup:
+    """ Instance holds the minimum, maximum and mean sensor values over one period
+
+    Instance Attributes:
+
+        period       [Int: seconds covered by the rollup]
+        start        [Number: time.time() when the period started (a multiple of period)]
+        count        [Int: number of samples in the period]
+        minimum      [List of Numbers: minimum temperature, humidity and light]
+        maximum      [List of Numbers: maximum temperature, humidity and light]
+        total        [List of Numbers: sum of the temperatures, humidities and light values]
+    """
+    __slots__ = ('period', 'start', 'count', 'minimum', 'maximum', 'total')
+
+    def __init__(self, period, start):
+        """ Initializes a new, empty Rollup for the period starting at start.
+        """
+        self.period = period
+        self.start = start
+        self.count = 0
+        self.minimum = [None, None, None]
+        self.maximum = [None, None, None]
+        self.total = [0, 0, 0]
+
+    def add(self, values):
+        """ Method that adds a sample's (temperature, humidity, light) to the rollup.
+        """
+        self.count += 1
+        for index in range(3):
+            value = values[index]
+            if self.minimum[index] is None or value < self.minimum[index]:
+                self.minimum[index] = value
+            if self.maximum[index] is None or value > self.maximum[index]:
+                self.maximum[index] = value
+            self.total[index] += value
+
+    def mean(self):
+        """ Method that returns the mean temperature, humidity and light.
+        """
+        return [total / float(self.count) for total in self.total]
+
+class SensorSeries:
+    """ Instance is a ring buffer of recent sensor data with rolling per-minute and per-hour rollups
+
+    Instance Attributes:
+
+        _times        [array of doubles: time.time() of each sample]
+        _temperature  [array of floats]
+        _humidity     [array of floats]
+        _light        [array of longs]
+        _switches     [array of bytes: DOOR_OPENED and FOOT_SWITCH_PRESSED bits]
+        _next         [Int: index the next sample is written to]
+        _size         [Int: number of samples stored (at most the capacity)]
+        _rollups      [List of Rollup objects, one in progress for each of ROLLUP_PERIODS]
+    """
+    __slots__ = ('_times', '_temperature', '_humidity', '_light', '_switches', '_next', '_size', '_rollups')
+
+    def __init__(self, capacity=SERIES_CAPACITY):
+        """ Initializes a new, empty SensorSeries.
+
+        Parameter: capacity [Int: number of samples kept - older samples are overwritten]
+        """
+        self._times = array('d', [0.0]) * capacity
+        self._temperature = array('f', [0.0]) * capacity
+        self._humidity = array('f', [0.0]) * capacity
+        self._light = array('l', [0]) * capacity
+        self._switches = array('B', [0]) * capacity
+        self._next = 0
+        self._size = 0
+        self._rollups = [None] * len(ROLLUP_PERIODS)
+
+    def append(self, timestamp, sensorData):
+        """ Method that adds a sample to the series and its rollups.
+
+        Parameter: timestamp  [Number: time.time() when the sample was received]
+        Parameter: sensorData [SensorData object from SerialComm]
+
+        Returns: (rollups, switched) - a list of Rollup objects for periods that ended before this sample,
+                 and True if the reed switch or foot switch changed (or this is the first sample)
+        """
+        switches = switchBits(sensorData.reedSwitch, sensorData.footSwitch)
+        switched = self._size == 0 or switches != self._switches[self._next - 1]
+        index = self._next
+        self._times[index] = timestamp
+        self._temperature[index] = sensorData.temperature
+        self._humidity[index] = sensorData.humidity
+        self._light[index] = sensorData.light
+        self._switches[index] = switches
+        self._next = (index + 1) % len(self._times)
+        self._size = min(self._size + 1, len(self._times))
+
+        finished = []
+        values = (sensorData.temperature, sensorData.humidity, sensorData.light)
+        for index in range(len(ROLLUP_PERIODS)):
+            period = ROLLUP_PERIODS[index]
+            start = timestamp - timestamp % period
+            rollup = self._rollups[index]
+            if rollup is None or rollup.start != start:
+                if rollup is not None:
+                    finished.append(rollup)
+                rollup = self._rollups[index] = Rollup(period, start)
+            rollup.add(values)
+        return finished, switched
+
+    def __len__(self):
+        """ Method that returns the number of samples stored.
+        """
+        return self._size
+
+    def current(self, period):
+        """ Method that returns the Rollup in progress for one of ROLLUP_PERIODS, or None if there have been no samples.
+        """
+        return self._rollups[ROLLUP_PERIODS.index(period)]
+
+    def samples(self, since=0):
+        """ Method that returns the stored samples received after since, oldest first.
+
+        Returns: list of (time, temperature, humidity, light, switches) tuples
+        """
+        result = []
+        capacity = len(self._times)
+        for offset in range(self._size):
+            index = (self._next - self._size + offset) % capacity
+            if self._times[index] > since:
+                result.append((self._times[index], self._temperature[index], self._humidity[index], self._light[index], self._switches[index]))
+        return result
@@ -0,0 +1,97 @@
+# tracefile.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" tracefile module for Internet of Pi
+
+    This module provides the class TraceRecorder, which records the system's serial and Parse traffic to a trace file:
+    every chunk of bytes read from or written to the Arduino, and every request to Parse with its response.
+    Each record has the seconds since recording started (from a monotonic clock), so the traffic can be replayed
+    later with the same timing (see benchmark/replay.py).
+
+    The trace file is only ever appended to - each time the system starts, a new session begins with a start record.
+    Each record is one line of JSON: [seconds, kind, ...], with bytes stored as Latin-1 strings.
+
+"""
+
+import json, threading, time
+
+# Kinds of records
+TRACE_START = 'start'    # [seconds, 'start', {'apiRoot': PARSE_API_ROOT, 'time': time.time()}]
+TRACE_RX = 'rx'          # [seconds, 'rx', bytes read from the Arduino]
+TRACE_TX = 'tx'          # [seconds, 'tx', bytes written to the Arduino]
+TRACE_REQUEST = 'req'    # [seconds, 'req', id, method, path, body or None]
+TRACE_RESPONSE = 'res'   # [seconds, 'res', id, status (or None if the request failed), body (or the error)]
+
+monotonic = getattr(time, 'monotonic', time.time) # time.monotonic is not available in Python 2
+
+def _text(data):
+    """ Function that stores bytes as a Latin-1 string, which JSON can hold and which decodes back to the same bytes.
+    """
+    if data is None or not isinstance(data, (bytes, bytearray)):
+        return data
+    return bytes(data).decode('latin-1')
+
+def traceBytes(text):
+    """ Function that turns a string stored by TraceRecorder back into bytes.
+    """
+    return text.encode('latin-1')
+
+class TraceRecorder:
+    """ Instance appends the system's serial and Parse traffic to a trace file
+
+    Instance Attributes:
+
+        _file      [File object opened for appending]
+        _start     [Float: monotonic time when recording started]
+        _lock      [threading.Lock: traffic is recorded by several tasks]
+    """
+    def __init__(self, path, apiRoot):
+        """ Initializes a new TraceRecorder, starting a new session in the trace file.
+
+        Parameter: path    [String: location of the trace file]
+        Parameter: apiRoot [String: PARSE_API_ROOT, stored so the trace can be replayed]
+        """
+        self._file = open(path, 'ab')
+        self._start = monotonic()
+        self._lock = threading.Lock()
+        self.record(TRACE_START, {'apiRoot': apiRoot, 'time': time.time()})
+
+    def record(self, kind, *fields):
+        """ Method that appends a record to the trace file.
+
+        Parameter: kind   [String: one of the TRACE_ constants]
+        Parameter: fields [the record's values - bytes are stored as Latin-1 strings]
+        """
+        line = json.dumps([round(monotonic() - self._start, 6), kind] + [_text(field) for field in fields], separators=(',', ':'))
+        with self._lock:
+            self._file.write(line.encode('utf-8') + b'\n')
+            self._file.flush()
+
+    def close(self):
+        """ Method that closes the trace file.
+        """
+        with self._lock:
+            self._file.close()
+
+def readTrace(path, session=-1):
+    """ Function that reads one session of a trace file.
+
+    Parameter: path    [String: location of the trace file]
+    Parameter: session [Int: index of the session (the first is 0, the last is -1)]
+
+    Returns: (start, records) - start is the dictionary from the session's start record, records is a list of the rest
+    """
+    sessions = []
+    with open(path, 'rb') as traceFile:
+        for line in traceFile:
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except ValueError:
+                continue # A line cut off when the system stopped
+            if record[1] == TRACE_START:
+                sessions.append((record[2], []))
+            elif len(sessions) > 0:
+                sessions[-1][1].append(record)
+    if len(sessions) == 0:
+        raise Exception('No sessions in trace file ' + path)
+    return sessions[session]
@@ -0,0 +1,271 @@
+# transport.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" transport module for Internet of Pi
+
+    This module provides the class ParseTransport, which sends the requests made by ParsePy over persistent
+    (keep-alive) connections to the Parse Server instead of opening a new connection for every request.
+
+    ParseTransport replaces ParsePy's ParseBase.execute when installed, so the Parse classes, queries and ParseBatcher
+    work as before.  Each thread keeps its own connection, every request has a timeout, and the latency of every
+    endpoint is recorded in a Histogram (in the METRICS registry, as parse_request_seconds).  Requests can also be run concurrently on a small pool of worker threads.
+
+    Every request goes through a CircuitBreaker (see breaker.py): while the Parse Server is down (requests time out,
+    fail to connect, or get a 5xx response), requests raise CircuitOpenError right away instead of being sent.
+
+"""
+
+import json, datetime, socket, threading, time, itertools
+
+from parse_rest import connection as parse_connection
+from parse_rest import core
+from metrics import *
+from tracefile import *
+from breaker import *
+
+try:
+    import Queue as queue # Python 2
+    import httplib as http_client
+    from urllib import urlencode
+    from urlparse import urlparse
+except ImportError:
+    import queue
+    import http.client as http_client
+    from urllib.parse import urlencode, urlparse
+
+REQUEST_TIMEOUT = 10 # Seconds before a request to Parse times out
+WORKERS = 4          # Threads available for running requests concurrently
+
+RETRIES = METRICS.counter('parse_request_retries_total', 'Requests to Parse resent after a kept-alive connection went stale')
+
+# Exceptions ParsePy raises for HTTP error codes
+ERRORS = {
+    400: core.ResourceRequestBadRequest,
+    401: core.ResourceRequestLoginRequired,
+    403: core.ResourceRequestForbidden,
+    404: core.ResourceRequestNotFound,
+}
+
+def _dateHandler(obj):
+    """ Function used by json.dumps for values it can't serialize (dates).
+    """
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError(repr(obj) + ' is not JSON serializable')
+
+def endpointName(method, path):
+    """ Function that returns the name latency is recorded under for a request - the method and path,
+    with any objectId replaced by ':id' (e.g. 'PUT /classes/Appliance/:id').
+    """
+    parts = path.split('?', 1)[0].strip('/').split('/')
+    if 'classes' in parts:
+        index = parts.index('classes')
+        if len(parts) > index + 2:
+            parts[index + 2] = ':id'
+    return method + ' /' + '/'.join(parts)
+
+class ParseTransport:
+    """ Instance sends requests to the Parse Server over keep-alive connections and records their latency
+
+    Instance Attributes:
+
+        _apiRoot    [String: URL of the Parse Server's API (PARSE_API_ROOT)]
+        _https      [Boolean: True if the server uses HTTPS]
+        _netloc     [String: host (and port) of the server]
+        _basePath   [String: path of the API on the server, e.g. '/parse']
+        _timeout    [Number: seconds before a request times out]
+        _local      [threading.local: each thread's connection]
+        _latency    [Dictionary: endpoint name -> Histogram of latencies in seconds]
+        _lock       [threading.Lock: guards _latency]
+        _requests   [Queue of (function, results, index, done) tuples for the worker threads]
+        breaker     [CircuitBreaker instance: refuses requests while the server is down]
+        trace       [TraceRecorder instance that every request and response is recorded to, or None]
+        _traceIds   [itertools.count: ids that match each traced request with its response]
+    """
+    def __init__(self, apiRoot, timeout=REQUEST_TIMEOUT, workers=WORKERS):
+        """ Initializes a new ParseTransport and starts its worker threads.
+        Raises ValueError if apiRoot isn't an http:// or https:// URL with a host.
+
+        Parameter: apiRoot [String: URL of the Parse Server's API]
+        Parameter: timeout [Number: seconds before a request times out]
+        Parameter: workers [Int: number of threads for concurrent requests]
+        """
+        url = urlparse(apiRoot or '')
+        if url.scheme not in ('http', 'https') or not url.netloc:
+            raise ValueError('PARSE_API_ROOT must be the URL of the Parse Server\'s API, e.g. https://example.com/parse (got %r)' % (apiRoot,))
+        self._apiRoot = apiRoot
+        self._https = url.scheme == 'https'
+        self._netloc = url.netloc
+        self._basePath = url.path.rstrip('/')
+        self._timeout = timeout
+        self._local = threading.local()
+        self._latency = {}
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self.breaker = CircuitBreaker('parse')
+        self.trace = None
+        self._traceIds = itertools.count()
+        for x in range(workers):
+            worker = threading.Thread(target=self._work, name='parse-worker-' + str(x))
+            worker.daemon = True
+            worker.start()
+
+    def install(self):
+        """ Method that makes ParsePy send every request through this transport.
+        """
+        transport = self
+        def execute(cls, uri, http_verb, extra_headers=None, batch=False, _body=None, **kw):
+            return transport.execute(cls, uri, http_verb, extra_headers, batch, _body, **kw)
+        parse_connection.ParseBase.execute = classmethod(execute)
+
+    def execute(self, cls, uri, http_verb, extra_headers=None, batch=False, _body=None, **kw):
+        """ Method that sends a request the same way ParsePy's ParseBase.execute does.
+
+        Returns: the decoded JSON response (or, for batch=True, the request to include in a batch)
+        - raises CircuitOpenError without sending the request while the circuit breaker is open
+        """
+        if batch:
+            request = {'method': http_verb, 'path': uri.split(self._netloc, 1)[1]}
+            if kw:
+                request['body'] = kw
+            return request
+
+        keys = parse_connection.ACCESS_KEYS
+        if not ('app_id' in keys and 'rest_key' in keys):
+            raise core.ParseError('Missing connection credentials')
+
+        url = uri if uri.startswith(self._apiRoot) else cls.ENDPOINT_ROOT + uri
+        path = url.split(self._netloc, 1)[1]
+        if http_verb == 'GET':
+            if kw:
+                path += '?' + urlencode(kw)
+            data = None
+        else:
+            data = _body if _body is not None else json.dumps(kw, default=_dateHandler)
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+
+        headers = {
+            'Content-type': 'application/json',
+            'X-Parse-Application-Id': keys.get('app_id'),
+            'X-Parse-REST-API-Key': keys.get('rest_key'),
+        }
+        headers.update(extra_headers or {})
+        if keys.get('session_token'):
+            headers['X-Parse-Session-Token'] = keys.get('session_token')
+        elif keys.get('master_key'):
+            headers['X-Parse-Master-Key'] = keys.get('master_key')
+
+        if not self.breaker.allow():
+            raise CircuitOpenError('Parse Server is unavailable (circuit breaker open)')
+        start = time.time()
+        try:
+            if self.trace is None:
+                status, body = self._send(http_verb, path, data, headers)
+            else:
+                status, body = self._tracedSend(http_verb, path, data, headers)
+        except Exception:
+            self.breaker.failure()
+            raise
+        self._histogram(endpointName(http_verb, path[len(self._basePath):])).observe(time.time() - start)
+        if status >= 500: # The server answered, but isn't working - other errors are the request's fault
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        if status >= 400:
+            raise ERRORS.get(status, core.ParseError)(body)
+        return json.loads(body.decode('utf-8'))
+
+    def _send(self, method, path, data, headers):
+        """ Method that sends a request on this thread's connection, reconnecting once if the server closed it.
+
+        Returns: (status, body) of the response
+        """
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            reused = connection is not None
+            if connection is None:
+                if self._https:
+                    connection = http_client.HTTPSConnection(self._netloc, timeout=self._timeout)
+                else:
+                    connection = http_client.HTTPConnection(self._netloc, timeout=self._timeout)
+                self._local.connection = connection
+            try:
+                connection.request(method, path, data, headers)
+                response = connection.getresponse()
+                body = response.read() # The whole response is read so the connection can be reused
+                return response.status, body
+            except (http_client.HTTPException, socket.error):
+                connection.close()
+                self._local.connection = None
+                if not reused or attempt == 1: # Only a kept-alive connection that went stale is retried
+                    raise
+                RETRIES.inc()
+
+    def _tracedSend(self, method, path, data, headers):
+        """ Method that sends a request, recording it and its response (or error) to the trace.
+        """
+        trace = self.trace
+        requestId = next(self._traceIds)
+        trace.record(TRACE_REQUEST, requestId, method, path, data)
+        try:
+            status, body = self._send(method, path, data, headers)
+        except Exception as err:
+            trace.record(TRACE_RESPONSE, requestId, None, str(err))
+            raise
+        trace.record(TRACE_RESPONSE, requestId, status, body)
+        return status, body
+
+    def _histogram(self, endpoint):
+        """ Method that returns the latency Histogram of an endpoint, creating it if needed.
+        """
+        with self._lock:
+            if endpoint not in self._latency:
+                self._latency[endpoint] = METRICS.histogram('parse_request_seconds', 'Latency of requests to Parse', {'endpoint': endpoint})
+            return self._latency[endpoint]
+
+    def latency(self):
+        """ Method that returns the latency Histogram of every endpoint requested so far.
+
+        Returns: dictionary of endpoint name -> Histogram
+        """
+        with self._lock:
+            return dict(self._latency)
+
+    def concurrent(self, functions):
+        """ Method that calls functions (which make requests) at the same time on the worker threads.
+        Each worker keeps its own connection, so the requests are not serialized on one connection.
+
+        Parameter: functions [List of functions that take no parameters]
+
+        Returns: list of the functions' results, in order - if any function raised an exception, the first one is raised
+        """
+        results = [None] * len(functions)
+        done = []
+        for index in range(len(functions)):
+            event = threading.Event()
+            done.append(event)
+            self._requests.put((functions[index], results, index, event))
+        for event in done:
+            event.wait()
+        for result in results:
+            if isinstance(result, _Failure):
+                raise result.error
+        return results
+
+    def _work(self):
+        """ Method run by each worker thread - calls functions passed to concurrent.
+        """
+        while True:
+            function, results, index, event = self._requests.get()
+            try:
+                results[index] = function()
+            except Exception as err:
+                results[index] = _Failure(err)
+            event.set()
+
+class _Failure:
+    """ Instance wraps an exception raised by a function run by ParseTransport.concurrent
+    """
+    def __init__(self, error):
+        self.error = error
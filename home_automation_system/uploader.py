@@ -0,0 +1,143 @@
+# uploader.py
+# Alex Strandberg (https://github.com/alexstrandberg)
+# October 17, 2026
+""" uploader module for Internet of Pi
+
+    This module provides the class SensorUploader, which stores sensor data in a SQLite database on the Raspberry Pi
+    and uploads it to Parse in batches.  Samples are kept on disk until Parse accepts them, so sensor history survives
+    when the Parse Server is unreachable or the system restarts, and only one request is made per batch of samples.
+
+    Rollups of the sensor data (see timeseries.py) are queued and uploaded the same way, as SensorRollup objects.
+
+"""
+
+import datetime, sqlite3, threading, time
+
+from parseclasses import *
+from parse_rest.connection import ParseBatcher
+
+UPLOAD_DATABASE = '/home/pi/home_automation_system/sensordata.db'
+
+BATCH_SIZE = 50          # Most requests that Parse allows in one batch
+UPLOAD_INTERVAL = 30     # Seconds to wait for more samples once everything has been uploaded
+MIN_BACKOFF = 5          # Seconds to wait after the first failed upload
+MAX_BACKOFF = 300        # Longest wait between failed uploads
+MAX_PENDING = 500000     # Most samples kept on disk - the oldest are dropped after a very long outage
+
+# Upload modes
+UPLOAD_RAW = 'raw'         # Every sample is uploaded as a SensorData object
+UPLOAD_ROLLUPS = 'rollups' # Per-minute and per-hour SensorRollup objects are uploaded, plus a SensorData object
+                           # only when the reed switch or foot switch changes
+
+class SensorUploader:
+    """ Instance is a persistent queue of sensor data waiting to be uploaded to Parse
+
+    Instance Attributes:
+
+        _connection   [sqlite3 Connection to the queue's database (in WAL mode)]
+        _lock         [threading.Lock: the connection is shared by the control and upload tasks]
+        _batcher      [ParseBatcher instance: uploads a batch of samples in one request]
+        _backoff      [Number: seconds to wait after the next failed upload]
+        _nextUpload   [Float: time.time() when the next upload should be attempted]
+    """
+    def __init__(self, path=UPLOAD_DATABASE):
+        """ Initializes a new SensorUploader, creating its database if needed.
+
+        Parameter: path [String: location of the SQLite database file]
+        """
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS sensorData (id INTEGER PRIMARY KEY AUTOINCREMENT, sampledAt REAL, '
+                                 'temperature REAL, humidity REAL, light INTEGER, reedSwitch TEXT, footSwitch TEXT)')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS sensorRollup (id INTEGER PRIMARY KEY AUTOINCREMENT, period INTEGER, start REAL, count INTEGER, '
+                                 'temperatureMin REAL, temperatureMax REAL, temperatureMean REAL, humidityMin REAL, humidityMax REAL, '
+                                 'humidityMean REAL, lightMin REAL, lightMax REAL, lightMean REAL)')
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._batcher = ParseBatcher()
+        self._backoff = MIN_BACKOFF
+        self._nextUpload = 0
+
+    def enqueue(self, sensorData, sampledAt):
+        """ Method that adds a sample to the queue.
+
+        Parameter: sensorData [SensorData object from SerialComm]
+        Parameter: sampledAt  [Float: time.time() when the sample was received]
+        """
+        with self._lock:
+            self._connection.execute('INSERT INTO sensorData (sampledAt, temperature, humidity, light, reedSwitch, footSwitch) VALUES (?, ?, ?, ?, ?, ?)',
+                                     (sampledAt, sensorData.temperature, sensorData.humidity, sensorData.light, sensorData.reedSwitch, sensorData.footSwitch))
+            self._connection.execute('DELETE FROM sensorData WHERE id <= (SELECT MAX(id) FROM sensorData) - ?', (MAX_PENDING,))
+            self._connection.commit()
+
+    def enqueueRollup(self, rollup):
+        """ Method that adds a rollup to the queue.
+
+        Parameter: rollup [Rollup object from SensorSeries]
+        """
+        temperature, humidity, light = rollup.mean()
+        with self._lock:
+            self._connection.execute('INSERT INTO sensorRollup (period, start, count, temperatureMin, temperatureMax, temperatureMean, '
+                                     'humidityMin, humidityMax, humidityMean, lightMin, lightMax, lightMean) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                     (rollup.period, rollup.start, rollup.count, rollup.minimum[0], rollup.maximum[0], temperature,
+                                      rollup.minimum[1], rollup.maximum[1], humidity, rollup.minimum[2], rollup.maximum[2], light))
+            self._connection.execute('DELETE FROM sensorRollup WHERE id <= (SELECT MAX(id) FROM sensorRollup) - ?', (MAX_PENDING,))
+            self._connection.commit()
+
+    def pending(self):
+        """ Method that returns the number of samples and rollups waiting to be uploaded.
+        """
+        with self._lock:
+            return (self._connection.execute('SELECT COUNT(*) FROM sensorData').fetchone()[0] +
+                    self._connection.execute('SELECT COUNT(*) FROM sensorRollup').fetchone()[0])
+
+    def delay(self):
+        """ Method that returns the number of seconds until the next upload should be attempted.
+        """
+        return max(0, self._nextUpload - time.time())
+
+    def upload(self):
+        """ Method that uploads the oldest batch of samples (and rollups, if the batch isn't full), then removes them from the queue.
+        After a failed upload, the time until the next attempt doubles (up to MAX_BACKOFF) and the error is raised.
+
+        Returns: number of samples and rollups uploaded
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT id, sampledAt, temperature, humidity, light, reedSwitch, footSwitch FROM sensorData '
+                                            'ORDER BY id LIMIT ?', (BATCH_SIZE,)).fetchall()
+            rollupRows = self._connection.execute('SELECT id, period, start, count, temperatureMin, temperatureMax, temperatureMean, humidityMin, '
+                                                  'humidityMax, humidityMean, lightMin, lightMax, lightMean FROM sensorRollup ORDER BY id LIMIT ?',
+                                                  (BATCH_SIZE - len(rows),)).fetchall()
+        uploaded = len(rows) + len(rollupRows)
+        if uploaded > 0:
+            objects = []
+            for row in rows:
+                objects.append(SensorData(sampledAt=datetime.datetime.utcfromtimestamp(row[1]), temperature=row[2], humidity=row[3],
+                                          light=row[4], reedSwitch=row[5], footSwitch=row[6]))
+            for row in rollupRows:
+                objects.append(SensorRollup(period=row[1], start=datetime.datetime.utcfromtimestamp(row[2]), count=row[3],
+                                            temperatureMin=row[4], temperatureMax=row[5], temperatureMean=row[6],
+                                            humidityMin=row[7], humidityMax=row[8], humidityMean=row[9],
+                                            lightMin=row[10], lightMax=row[11], lightMean=row[12]))
+            try:
+                self._batcher.batch_save(objects)
+            except Exception:
+                self._nextUpload = time.time() + self._backoff
+                self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+                raise
+            with self._lock:
+                if len(rows) > 0:
+                    self._connection.execute('DELETE FROM sensorData WHERE id <= ?', (rows[-1][0],))
+                if len(rollupRows) > 0:
+                    self._connection.execute('DELETE FROM sensorRollup WHERE id <= ?', (rollupRows[-1][0],))
+                self._connection.commit()
+        self._backoff = MIN_BACKOFF
+        self._nextUpload = time.time() + (0 if uploaded == BATCH_SIZE else UPLOAD_INTERVAL)
+        return uploaded
+
+    def close(self):
+        """ Method that closes the queue's database.
+        """
+        with self._lock:
+            self._connection.close()
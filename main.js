@@ -155,71 +155,4 @@ Parse.Cloud.beforeSave("Action", function(req, res) {
         appliance.save();
     }
     res.success();
-});
-
-Parse.Cloud.beforeSave("SensorData", function(req, res) {
-    // Function that checks if any action's criteria are met, and update appliance states accordingly.
-    var now = new Date();
-    var settingsQuery = new Parse.Query("Settings");
-    settingsQuery.find().then(function (settings) {
-        var actionLastRan = settings[0].get("actionLastRan");
-        if (now - actionLastRan > 30000) { // If at least 30 seconds have passed since the last action event, can check for events
-            var lightThreshold = settings[0].get("lightThreshold");
-            var temperatureThreshold = settings[0].get("temperatureThreshold");
-            var humidityThreshold = settings[0].get("humidityThreshold");
-            var actionsQuery = new Parse.Query("Action");
-            actionsQuery.equalTo("enabled", true);
-            actionsQuery.include("appliance");
-            actionsQuery.find().then(function(actions) {
-                actions.forEach(function(action) {
-                    var matchesCriteria = false;
-                    switch (action.get("event")) {
-                        case "Door Is Opened":
-                            if (req.object.get("reedSwitch") == "OPENED") matchesCriteria = true;
-                            break;
-                        case "Door Is Closed":
-                            if (req.object.get("reedSwitch") == "CLOSED") matchesCriteria = true;
-                            break;
-                        case "Foot Switch Is Pressed":
-                            if (req.object.get("footSwitch") == "PRESSED") matchesCriteria = true;
-                            break;
-                        case "Light Exceeds Threshold":
-                            if (req.object.get("light") >= lightThreshold) matchesCriteria = true;
-                            break;
-                        case "Light Falls Below Threshold":
-                            if (req.object.get("light") <= lightThreshold) matchesCriteria = true;
-                            break;
-                        case "Temperature Exceeds Threshold":
-                            if (req.object.get("temperature") >= temperatureThreshold) matchesCriteria = true;
-                            break;
-                        case "Temperature Falls Below Threshold":
-                            if (req.object.get("temperature") <= temperatureThreshold) matchesCriteria = true;
-                            break;
-                        case "Humidity Exceeds Threshold":
-                            if (req.object.get("humidity") >= humidityThreshold) matchesCriteria = true;
-                            break;
-                        case "Humidity Falls Below Threshold":
-                            if (req.object.get("humidity") <= humidityThreshold) matchesCriteria = true;
-                            break;
-                    }
-                    if (matchesCriteria) { // Matching event has happened, check if appliance's state needs to be updated
-                        var appliance = action.get("appliance");
-                        if (appliance.get("state") != action.get("state")) {
-                            appliance.set("state", action.get("state"));
-                            action.save();
-                            settings[0].set("actionLastRan", now);
-                            settings[0].save();
-                        }
-                    }
-                }, function (err) {
-                    res.error(err);
-                });
-            }, function (err) {
-                res.error(err);
-            });
-        }
-    }, function (err) {
-        res.error(err);
-    });
-    res.success();
 });
\ No newline at end of file